@@ -5,9 +5,13 @@ from fastapi import APIRouter
 from app.api.transcribe import router as transcribe_router
 from app.api.translate import router as translate_router
 from app.api.stats import router as stats_router
+from app.api.usage import router as usage_router
+from app.api.admin import router as admin_router
 
 api_router = APIRouter()
 
 api_router.include_router(transcribe_router, prefix="/api/v1", tags=["transcribe"])
 api_router.include_router(translate_router, prefix="/api/v1", tags=["translate"])
 api_router.include_router(stats_router, prefix="/api/v1", tags=["stats"])
+api_router.include_router(usage_router, prefix="/api/v1", tags=["usage"])
+api_router.include_router(admin_router, prefix="/api/v1", tags=["admin"])
@@ -0,0 +1,181 @@
+"""
+SpeechMate Admin Diagnostics API
+"""
+import asyncio
+from datetime import datetime
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from loguru import logger
+from app.config import config, ASR_MODELS
+from app.loop_monitor import loop_monitor
+from app.profiling import sample_stacks, format_collapsed, save_report, memory_snapshots, memory_monitor
+from app.tuning import cpu_tuner
+from app.model_benchmark import model_benchmarker, benchmark_summary
+
+router = APIRouter()
+
+
+def _verify_admin(x_api_key: str):
+    if x_api_key != config.admin_api_key:
+        raise HTTPException(status_code=401, detail="Invalid admin API key")
+
+
+@router.post("/admin/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(
+    seconds: float = Query(10, gt=0, le=120, description="How long to sample"),
+    interval_ms: float = Query(5, ge=1, le=100, description="Sampling interval in milliseconds"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Sample the stacks of every thread in the API process
+
+    Returns collapsed stacks (one `frame;frame;... count` line per stack)
+    that flamegraph.pl, speedscope or inferno render directly.
+    """
+    _verify_admin(x_api_key)
+
+    logger.info(f"CPU profile requested: {seconds}s at {interval_ms}ms")
+    try:
+        stacks = await asyncio.to_thread(sample_stacks, seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    collapsed = format_collapsed(stacks)
+    filename = save_report(f"cpu-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.collapsed", collapsed)
+
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.post("/admin/profile/memory")
+async def snapshot_memory(
+    limit: int = Query(25, ge=1, le=500, description="Allocation sites to return"),
+    group_by: str = Query("lineno", pattern="^(lineno|filename|traceback)$", description="lineno, filename or traceback"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Take a tracemalloc snapshot of the API process
+
+    The first call starts tracing, so it only sees allocations made from then
+    on. Each later call also returns the difference from the previous snapshot,
+    largest growth first.
+    """
+    _verify_admin(x_api_key)
+
+    result = await asyncio.to_thread(memory_snapshots.take, limit, group_by)
+    result["breakdown"] = memory_monitor.breakdown()
+    return result
+
+
+@router.delete("/admin/profile/memory")
+async def stop_memory_profile(
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """Drop the stored snapshot and stop tracemalloc (unless per-request memory is enabled)"""
+    _verify_admin(x_api_key)
+
+    memory_snapshots.reset()
+    return {"success": True}
+
+
+@router.get("/admin/memory")
+async def memory_breakdown(
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """Current RSS split into loaded models, traced Python allocations and the rest"""
+    _verify_admin(x_api_key)
+
+    return memory_monitor.breakdown()
+
+
+@router.get("/admin/loop")
+async def event_loop_stalls(
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """Recent event loop stalls with the stack that was blocking, newest first"""
+    _verify_admin(x_api_key)
+
+    return loop_monitor.to_dict()
+
+
+@router.post("/admin/tune/cpu", status_code=202)
+async def tune_cpu(
+    model: Optional[str] = Query(None, description="ASR model to tune (default: the configured model)"),
+    compute_type: Optional[str] = Query(None, description="Compute type (default: the configured one)"),
+    target_latency_ms: Optional[float] = Query(None, gt=0, description="Latency a setting must meet"),
+    apply: bool = Query(True, description="Save the best setting and reload the model with it"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Re-run CPU thread/worker tuning in the background
+
+    Benchmarks cpu_threads/num_workers combinations that fit the CPU budget
+    (cores, affinity and cgroup quota) on synthetic audio. Poll
+    GET /admin/tune/cpu for the result.
+    """
+    _verify_admin(x_api_key)
+
+    if model is not None and model not in ASR_MODELS:
+        raise HTTPException(status_code=400, detail=f"Unknown ASR model: {model}")
+    if not cpu_tuner.start(apply, model_name=model, compute_type=compute_type, target_latency_ms=target_latency_ms):
+        raise HTTPException(status_code=409, detail="CPU tuning is already running")
+
+    logger.info(f"CPU tuning requested for {model or config.model.asr_model}")
+    return {"success": True, "status": "running"}
+
+
+@router.get("/admin/tune/cpu")
+async def cpu_tuning_status(
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """CPU budget, the settings in use, saved tuning results and the last run"""
+    _verify_admin(x_api_key)
+
+    return await asyncio.to_thread(cpu_tuner.to_dict)
+
+
+@router.post("/admin/benchmark/models", status_code=202)
+async def benchmark_models(
+    models: Optional[str] = Query(None, description="Comma-separated ASR models (default: every cached model)"),
+    compute_types: Optional[str] = Query(None, description="Comma-separated compute types (default: int8,int8_float16,float32 on CPU)"),
+    device: str = Query("cpu", pattern="^(cpu|cuda)$"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Measure load time, real-time factor and peak RSS per model and compute type
+
+    Each combination runs in its own process, one after another, so results
+    are not skewed by models already loaded here. Poll
+    GET /admin/benchmark/models for progress; stored results appear in
+    /api/v1/info.
+    """
+    _verify_admin(x_api_key)
+
+    model_list = [name.strip() for name in models.split(",") if name.strip()] if models else None
+    for name in model_list or ():
+        if name not in ASR_MODELS:
+            raise HTTPException(status_code=400, detail=f"Unknown ASR model: {name}")
+    compute_type_list = [name.strip() for name in compute_types.split(",") if name.strip()] if compute_types else None
+
+    if not model_benchmarker.start(models=model_list, compute_types=compute_type_list, device=device):
+        raise HTTPException(status_code=409, detail="A model benchmark is already running")
+
+    logger.info(f"Model benchmark requested on {device}: {models or 'all cached models'}")
+    return {"success": True, "status": "running"}
+
+
+@router.get("/admin/benchmark/models")
+async def model_benchmark_status(
+    device: Optional[str] = Query(None, pattern="^(cpu|cuda)$"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """Progress of the current run plus the stored results and recommendation"""
+    _verify_admin(x_api_key)
+
+    summary = await asyncio.to_thread(benchmark_summary, device)
+    return {**model_benchmarker.to_dict(), **summary}
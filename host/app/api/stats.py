@@ -7,7 +7,10 @@ from typing import Optional, List
 from datetime import datetime
 
 from loguru import logger
-from app.database import get_stats, get_all_api_keys, create_api_key, delete_api_key, toggle_api_key
+from app.database import (
+    get_stats, get_latency_stats, get_all_api_keys_async, create_api_key, delete_api_key, toggle_api_key,
+    set_api_key_limits
+)
 from app.config import config
 
 router = APIRouter()
@@ -23,6 +26,14 @@ class APIKeyInfo(BaseModel):
     last_used_at: Optional[str] = None
 
 
+class APIKeyLimits(BaseModel):
+    """Per-key limits; null restores the server default, 0 means unlimited"""
+    requests_per_minute: Optional[int] = None
+    audio_seconds_per_minute: Optional[float] = None
+    daily_audio_quota: Optional[float] = None
+    monthly_audio_quota: Optional[float] = None
+
+
 class DailyStats(BaseModel):
     """Daily statistics"""
     date: str
@@ -39,6 +50,10 @@ class APIKeyStats(BaseModel):
     daily_stats: List[DailyStats] = []
     total_transcribe: int = 0
     total_translate: int = 0
+    total_audio_seconds: float = 0.0
+    total_processing_seconds: float = 0.0
+    total_failures: int = 0
+    total_degraded: int = 0  # Requests served by the fallback model under load
 
 
 class StatsResponse(BaseModel):
@@ -65,7 +80,7 @@ async def get_statistics(
 
     try:
         # Get all API keys
-        keys = get_all_api_keys()
+        keys = await get_all_api_keys_async()
 
         # Get stats for all keys
         all_stats = get_stats(days=days)
@@ -94,7 +109,11 @@ async def get_statistics(
                 is_active=key_info["is_active"],
                 daily_stats=daily_stats,
                 total_transcribe=stats_data.get("total_transcribe", 0),
-                total_translate=stats_data.get("total_translate", 0)
+                total_translate=stats_data.get("total_translate", 0),
+                total_audio_seconds=stats_data.get("total_audio_seconds", 0.0),
+                total_processing_seconds=stats_data.get("total_processing_seconds", 0.0),
+                total_failures=stats_data.get("total_failures", 0),
+                total_degraded=stats_data.get("total_degraded", 0)
             ))
 
         return StatsResponse(success=True, api_keys=result)
@@ -104,6 +123,39 @@ async def get_statistics(
         return StatsResponse(success=False, error=str(e))
 
 
+@router.get("/stats/latency")
+async def get_latency_statistics(
+    days: int = Query(7, ge=1, le=365, description="Number of days to include"),
+    api_key_id: Optional[int] = Query(None, description="Only include this API key"),
+    endpoint: Optional[str] = Query(None, description="transcribe or translate"),
+    model: Optional[str] = Query(None, description="ASR model name"),
+    per_day: bool = Query(False, description="Break results down by day"),
+    per_key: bool = Query(False, description="Break results down by API key"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Get processing time and real-time factor percentiles (p50/p90/p95/p99)
+
+    Results are grouped by endpoint and model, optionally also by day and API key.
+    """
+    if x_api_key != config.admin_api_key:
+        raise HTTPException(status_code=401, detail="Invalid admin API key")
+
+    try:
+        latency = get_latency_stats(
+            days=days,
+            api_key_id=api_key_id,
+            endpoint=endpoint,
+            model=model,
+            per_day=per_day,
+            per_key=per_key
+        )
+        return {"success": True, "latency": latency}
+    except Exception as e:
+        logger.error(f"Failed to get latency stats: {e}")
+        return {"success": False, "error": str(e)}
+
+
 @router.get("/api-keys")
 async def list_api_keys(
     x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
@@ -112,7 +164,7 @@ async def list_api_keys(
     if x_api_key != config.admin_api_key:
         raise HTTPException(status_code=401, detail="Invalid admin API key")
 
-    keys = get_all_api_keys()
+    keys = await get_all_api_keys_async()
     return {"success": True, "api_keys": keys}
 
 
@@ -165,3 +217,23 @@ async def toggle_key(
     except Exception as e:
         logger.error(f"Failed to toggle API key: {e}")
         return {"success": False, "error": str(e)}
+
+
+@router.patch("/api-keys/{key_id}/limits")
+async def update_key_limits(
+    key_id: int,
+    limits: APIKeyLimits,
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """Set rate limits and audio quotas for an API key (only the fields sent are changed)"""
+    if x_api_key != config.admin_api_key:
+        raise HTTPException(status_code=401, detail="Invalid admin API key")
+
+    try:
+        key = set_api_key_limits(key_id, limits.model_dump(exclude_unset=True))
+        if key is None:
+            return {"success": False, "error": "API key not found"}
+        return {"success": True, "api_key": key}
+    except Exception as e:
+        logger.error(f"Failed to update API key limits: {e}")
+        return {"success": False, "error": str(e)}
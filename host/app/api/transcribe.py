@@ -2,20 +2,32 @@
 SpeechMate Transcribe API
 """
 import time
+import json
+import asyncio
 import tempfile
 import os
-from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Form
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException, Form, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Optional
 from pydantic import BaseModel
 
 from loguru import logger
-from models.asr_model import transcribe_audio, get_audio_duration
-from app.database import verify_api_key, log_usage
+from app.database import verify_api_key_async, log_usage
 from app.config import config
+from app.metrics import record_asr
+from app.tracing import span
+from app.profiling import request_peak_memory
+from app.rate_limit import rate_limiter
+from app.degradation import degradation_policy
+from app.inference import inference_pool
+from app.refine import refine_manager, RefineJob
 
 router = APIRouter()
 
+# How often refinement waiters check for progress, and how long a stream stays open
+REFINE_POLL_INTERVAL = 0.05
+REFINE_STREAM_TIMEOUT = 300
+
 
 class TranscribeResponse(BaseModel):
     """Transcribe API response"""
@@ -24,6 +36,10 @@ class TranscribeResponse(BaseModel):
     language: str = ""
     duration: float = 0.0
     processing_time: float = 0.0
+    model: str = ""  # ASR model that served the request
+    degraded: bool = False  # Served by the smaller fallback model because of load
+    draft: bool = False  # Fast first pass; the refined text follows via refine_id
+    refine_id: str = ""
     error: str = ""
 
 
@@ -31,6 +47,7 @@ class TranscribeResponse(BaseModel):
 async def transcribe(
     audio: UploadFile = File(..., description="Audio file (wav/mp3/m4a)"),
     language: Optional[str] = Form(None, description="Language code (zh/en)"),
+    refine: bool = Form(False, description="Return a fast draft now and refine it in the background"),
     x_api_key: str = Header(..., alias="X-API-Key", description="API Key")
 ):
     """
@@ -38,69 +55,143 @@ async def transcribe(
 
     - **audio**: Audio file to transcribe
     - **language**: Optional language code (zh for Chinese, en for English)
+    - **refine**: Two-pass mode (when enabled on the server): the response is a
+      draft from a small model, and the refined result is fetched with
+      GET /transcribe/refine/{refine_id} or streamed from .../stream
     - **X-API-Key**: Your API key
     """
+    # Model modules pull in heavy inference libraries; import on first use
+    from models.asr_model import transcribe_audio, get_audio_duration
+    from app.vad import trim_silence
+
     # Verify API key
-    api_key_obj = verify_api_key(x_api_key)
+    with span("auth", stage=True):
+        api_key_obj = await verify_api_key_async(x_api_key)
     if not api_key_obj:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
+    limited = rate_limiter.check_request(api_key_obj)
+    if limited:
+        raise HTTPException(status_code=429, detail=limited.detail, headers=limited.headers)
+
     start_time = time.time()
     tmp_path = None
+    audio_charged = 0.0
+    asr_model, degraded = config.model.asr_model, False
 
     try:
         # Save uploaded file temporarily
-        suffix = os.path.splitext(audio.filename)[1] or ".wav"
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
-            content = await audio.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        with span("upload", stage=True):
+            suffix = os.path.splitext(audio.filename)[1] or ".wav"
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
+                content = await audio.read()
+                tmp_file.write(content)
+                tmp_path = tmp_file.name
 
         # Get audio duration
-        audio_duration = get_audio_duration(tmp_path)
+        with span("decode", stage=True):
+            audio_duration = get_audio_duration(tmp_path)
 
-        logger.info(f"Processing transcription request: {audio.filename}, duration: {audio_duration:.2f}s")
+        limited = rate_limiter.check_audio(api_key_obj, audio_duration)
+        if limited:
+            raise HTTPException(status_code=429, detail=limited.detail, headers=limited.headers)
+        audio_charged = audio_duration
 
-        # Run transcription
-        text, detected_lang, processing_time = transcribe_audio(
-            tmp_path,
-            model_name=config.model.asr_model,
-            device=config.model.asr_device,
-            language=language
-        )
+        # Trim silence; clips without speech skip ASR entirely
+        with span("vad", stage=True):
+            speech = trim_silence(tmp_path, audio_duration, "transcribe")
+        if speech.audio_path != tmp_path:
+            os.unlink(tmp_path)
+            tmp_path = speech.audio_path
+
+        two_pass = speech.speech and refine and config.two_pass.enabled and refine_manager.accepting() \
+            and config.two_pass.draft_model != (config.two_pass.refine_model or config.model.asr_model)
+        if not speech.speech:
+            asr_model = ""
+        elif two_pass:
+            asr_model = config.two_pass.draft_model
+        else:
+            asr_model, degraded = degradation_policy.choose_model(speech.duration, "transcribe")
+
+        if speech.speech:
+            logger.info(
+                f"Processing transcription request: {audio.filename}, duration: {audio_duration:.2f}s"
+                f" ({speech.removed:.2f}s silence removed)"
+            )
+
+            # Run transcription
+            with span("asr", stage=True, model=asr_model):
+                asr_start = time.perf_counter()
+                text, detected_lang, processing_time = await inference_pool.run(
+                    transcribe_audio,
+                    tmp_path,
+                    model_name=asr_model,
+                    device=config.model.asr_device,
+                    language=language
+                )
+            record_asr("transcribe", asr_model, speech.duration, time.perf_counter() - asr_start)
+        else:
+            text, detected_lang = "", language or ""
 
         total_time = time.time() - start_time
+        degradation_policy.observe(asr_model, total_time)
+
+        refine_id = ""
+        if two_pass:
+            # The refinement job takes over the temporary file
+            job = refine_manager.submit(
+                api_key_obj["id"], tmp_path, speech.duration, language,
+                draft={"text": text, "language": detected_lang, "model": asr_model, "processing_time": total_time},
+                request_start=start_time
+            )
+            refine_id, tmp_path = job.id, None
 
         # Log usage
-        log_usage(
-            api_key_id=api_key_obj["id"],
-            endpoint="transcribe",
-            audio_duration=audio_duration,
-            processing_time=total_time,
-            source_lang=detected_lang,
-            success=True
-        )
+        with span("db", stage=True):
+            log_usage(
+                api_key_id=api_key_obj["id"],
+                endpoint="transcribe",
+                audio_duration=audio_duration,
+                processing_time=total_time,
+                source_lang=detected_lang,
+                success=True,
+                model=asr_model or None,
+                degraded=degraded,
+                peak_memory_bytes=request_peak_memory()
+            )
 
         return TranscribeResponse(
             success=True,
             text=text,
             language=detected_lang,
             duration=audio_duration,
-            processing_time=total_time
+            processing_time=total_time,
+            model=asr_model,
+            degraded=degraded,
+            draft=bool(refine_id),
+            refine_id=refine_id
         )
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         logger.error(f"Transcription error: {e}")
         total_time = time.time() - start_time
+        rate_limiter.refund_audio(api_key_obj, audio_charged)
 
         # Log failed usage
-        log_usage(
-            api_key_id=api_key_obj["id"],
-            endpoint="transcribe",
-            processing_time=total_time,
-            success=False,
-            error_message=str(e)
-        )
+        with span("db", stage=True):
+            log_usage(
+                api_key_id=api_key_obj["id"],
+                endpoint="transcribe",
+                processing_time=total_time,
+                success=False,
+                error_message=str(e),
+                model=asr_model or None,
+                degraded=degraded,
+                peak_memory_bytes=request_peak_memory()
+            )
 
         return TranscribeResponse(
             success=False,
@@ -114,3 +205,68 @@ async def transcribe(
                 os.unlink(tmp_path)
             except:
                 pass
+
+
+async def _refine_job(job_id: str, x_api_key: str) -> RefineJob:
+    api_key_obj = await verify_api_key_async(x_api_key)
+    if not api_key_obj:
+        raise HTTPException(status_code=401, detail="Invalid API key")
+    job = refine_manager.get(job_id)
+    if job is None or job.api_key_id != api_key_obj["id"]:
+        raise HTTPException(status_code=404, detail="Refinement not found or expired")
+    return job
+
+
+@router.get("/transcribe/refine/{job_id}")
+async def get_refinement(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the refinement to finish"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="API Key")
+):
+    """
+    Poll the refined result of a two-pass transcription
+
+    Includes the draft, both models and their timings, and the word error
+    rate of the draft measured against the refined text.
+    """
+    job = await _refine_job(job_id, x_api_key)
+
+    deadline = time.monotonic() + wait
+    while not job.finished and time.monotonic() < deadline:
+        await asyncio.sleep(REFINE_POLL_INTERVAL)
+
+    return {"success": job.status != "failed", **job.to_dict()}
+
+
+@router.get("/transcribe/refine/{job_id}/stream")
+async def stream_refinement(
+    job_id: str,
+    x_api_key: str = Header(..., alias="X-API-Key", description="API Key")
+):
+    """
+    Stream a refinement as server-sent events
+
+    A `segment` event is sent for each refined segment as it is decoded,
+    then one `result` (or `error`) event with the same body as the poll
+    endpoint.
+    """
+    job = await _refine_job(job_id, x_api_key)
+
+    async def events():
+        sent = 0
+        deadline = time.monotonic() + REFINE_STREAM_TIMEOUT
+        while True:
+            finished = job.finished
+            for segment in job.segments_since(sent):
+                yield f"event: segment\ndata: {json.dumps(segment, ensure_ascii=False)}\n\n"
+                sent += 1
+            if finished:
+                event = "result" if job.status == "done" else "error"
+                yield f"event: {event}\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+                return
+            if time.monotonic() > deadline:
+                yield "event: timeout\ndata: {}\n\n"
+                return
+            await asyncio.sleep(REFINE_POLL_INTERVAL)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
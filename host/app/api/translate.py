@@ -10,10 +10,14 @@ from typing import Optional
 from pydantic import BaseModel
 
 from loguru import logger
-from models.asr_model import transcribe_audio, get_audio_duration
-from models.translation_model import translate_text
-from app.database import verify_api_key, log_usage
+from app.database import verify_api_key_async, log_usage
 from app.config import config
+from app.metrics import record_asr
+from app.tracing import span
+from app.profiling import request_peak_memory
+from app.rate_limit import rate_limiter
+from app.degradation import degradation_policy
+from app.inference import inference_pool
 
 router = APIRouter()
 
@@ -27,6 +31,8 @@ class TranslateResponse(BaseModel):
     target_lang: str = ""
     duration: float = 0.0
     processing_time: float = 0.0
+    model: str = ""  # ASR model that served the request
+    degraded: bool = False  # Served by the smaller fallback model because of load
     error: str = ""
 
 
@@ -49,11 +55,21 @@ async def translate_audio(
     - Chinese to English: source_lang=zh, target_lang=en
     - English to Chinese: source_lang=en, target_lang=zh
     """
+    # Model modules pull in heavy inference libraries; import on first use
+    from models.asr_model import transcribe_audio, get_audio_duration
+    from models.translation_model import translate_text
+    from app.vad import trim_silence
+
     # Verify API key
-    api_key_obj = verify_api_key(x_api_key)
+    with span("auth", stage=True):
+        api_key_obj = await verify_api_key_async(x_api_key)
     if not api_key_obj:
         raise HTTPException(status_code=401, detail="Invalid API key")
 
+    limited = rate_limiter.check_request(api_key_obj)
+    if limited:
+        raise HTTPException(status_code=429, detail=limited.detail, headers=limited.headers)
+
     # Validate languages
     valid_langs = ["zh", "en"]
     if source_lang not in valid_langs:
@@ -65,59 +81,82 @@ async def translate_audio(
 
     start_time = time.time()
     tmp_path = None
+    audio_charged = 0.0
+    asr_model, degraded = config.model.asr_model, False
 
     try:
         # Save uploaded file temporarily
-        suffix = os.path.splitext(audio.filename)[1] or ".wav"
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
-            content = await audio.read()
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
+        with span("upload", stage=True):
+            suffix = os.path.splitext(audio.filename)[1] or ".wav"
+            with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp_file:
+                content = await audio.read()
+                tmp_file.write(content)
+                tmp_path = tmp_file.name
 
         # Get audio duration
-        audio_duration = get_audio_duration(tmp_path)
+        with span("decode", stage=True):
+            audio_duration = get_audio_duration(tmp_path)
+
+        limited = rate_limiter.check_audio(api_key_obj, audio_duration)
+        if limited:
+            raise HTTPException(status_code=429, detail=limited.detail, headers=limited.headers)
+        audio_charged = audio_duration
+
+        # Trim silence; clips without speech skip ASR and translation
+        with span("vad", stage=True):
+            speech = trim_silence(tmp_path, audio_duration, "translate")
+        if speech.audio_path != tmp_path:
+            os.unlink(tmp_path)
+            tmp_path = speech.audio_path
+
+        if speech.speech:
+            asr_model, degraded = degradation_policy.choose_model(speech.duration, "translate")
+
+            logger.info(f"Processing translation request: {audio.filename}, {source_lang}->{target_lang}")
+
+            # Step 1: Transcribe audio
+            with span("asr", stage=True, model=asr_model):
+                asr_start = time.perf_counter()
+                original_text, detected_lang, trans_time = await inference_pool.run(
+                    transcribe_audio,
+                    tmp_path,
+                    model_name=asr_model,
+                    device=config.model.asr_device,
+                    language=source_lang
+                )
+            record_asr("translate", asr_model, speech.duration, time.perf_counter() - asr_start)
+        else:
+            asr_model, original_text = "", ""
+
+        # Step 2: Translate text (nothing to translate when no speech was recognized)
+        translated_text = ""
+        if original_text.strip():
+            with span("translation", stage=True):
+                translated_text, translate_time = await inference_pool.run(
+                    translate_text,
+                    original_text,
+                    source_lang=source_lang,
+                    target_lang=target_lang
+                )
 
-        logger.info(f"Processing translation request: {audio.filename}, {source_lang}->{target_lang}")
-
-        # Step 1: Transcribe audio
-        original_text, detected_lang, trans_time = transcribe_audio(
-            tmp_path,
-            model_name=config.model.asr_model,
-            device=config.model.asr_device,
-            language=source_lang
-        )
+        total_time = time.time() - start_time
+        degradation_policy.observe(asr_model, total_time)
 
-        if not original_text.strip():
-            return TranslateResponse(
-                success=True,
-                original_text="",
-                translated_text="",
+        # Log usage
+        with span("db", stage=True):
+            log_usage(
+                api_key_id=api_key_obj["id"],
+                endpoint="translate",
+                audio_duration=audio_duration,
+                processing_time=total_time,
                 source_lang=source_lang,
                 target_lang=target_lang,
-                duration=audio_duration,
-                processing_time=time.time() - start_time
+                success=True,
+                model=asr_model or None,
+                degraded=degraded,
+                peak_memory_bytes=request_peak_memory()
             )
 
-        # Step 2: Translate text
-        translated_text, translate_time = translate_text(
-            original_text,
-            source_lang=source_lang,
-            target_lang=target_lang
-        )
-
-        total_time = time.time() - start_time
-
-        # Log usage
-        log_usage(
-            api_key_id=api_key_obj["id"],
-            endpoint="translate",
-            audio_duration=audio_duration,
-            processing_time=total_time,
-            source_lang=source_lang,
-            target_lang=target_lang,
-            success=True
-        )
-
         return TranslateResponse(
             success=True,
             original_text=original_text,
@@ -125,23 +164,33 @@ async def translate_audio(
             source_lang=source_lang,
             target_lang=target_lang,
             duration=audio_duration,
-            processing_time=total_time
+            processing_time=total_time,
+            model=asr_model,
+            degraded=degraded
         )
 
+    except HTTPException:
+        raise
+
     except Exception as e:
         logger.error(f"Translation error: {e}")
         total_time = time.time() - start_time
+        rate_limiter.refund_audio(api_key_obj, audio_charged)
 
         # Log failed usage
-        log_usage(
-            api_key_id=api_key_obj["id"],
-            endpoint="translate",
-            processing_time=total_time,
-            source_lang=source_lang,
-            target_lang=target_lang,
-            success=False,
-            error_message=str(e)
-        )
+        with span("db", stage=True):
+            log_usage(
+                api_key_id=api_key_obj["id"],
+                endpoint="translate",
+                processing_time=total_time,
+                source_lang=source_lang,
+                target_lang=target_lang,
+                success=False,
+                error_message=str(e),
+                model=asr_model or None,
+                degraded=degraded,
+                peak_memory_bytes=request_peak_memory()
+            )
 
         return TranslateResponse(
             success=False,
@@ -0,0 +1,107 @@
+"""
+SpeechMate Usage Export API
+"""
+import io
+import csv
+import json
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.database import USAGE_LOG_COLUMNS, iter_usage_log_pages
+from app.config import config
+
+router = APIRouter()
+
+EXPORT_PAGE_SIZE = 1000
+
+
+def _parse_day(value: Optional[str], name: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {name}: {value} (expected YYYY-MM-DD)")
+
+
+def _iter_rows(api_key_id, start_day, end_day, include_archived):
+    """Yield pages of archived rows (optional) followed by live rows"""
+    if include_archived:
+        from app.retention import iter_archived_rows
+
+        page = []
+        for row in iter_archived_rows(
+            start_day.strftime("%Y-%m-%d") if start_day else None,
+            end_day.strftime("%Y-%m-%d") if end_day else None
+        ):
+            if api_key_id and row["api_key_id"] != api_key_id:
+                continue
+            page.append(row)
+            if len(page) >= EXPORT_PAGE_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    yield from iter_usage_log_pages(
+        api_key_id=api_key_id,
+        start=start_day,
+        end=end_day + timedelta(days=1) if end_day else None,
+        page_size=EXPORT_PAGE_SIZE
+    )
+
+
+def _csv_stream(pages):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=USAGE_LOG_COLUMNS, extrasaction="ignore")
+    writer.writeheader()
+    for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _ndjson_stream(pages):
+    for page in pages:
+        yield "".join(json.dumps(row, ensure_ascii=False) + "\n" for row in page)
+
+
+@router.get("/usage/export")
+def export_usage(
+    format: str = Query("csv", pattern="^(csv|ndjson)$", description="csv or ndjson"),
+    api_key_id: Optional[int] = Query(None, description="Only export this API key"),
+    start_date: Optional[str] = Query(None, description="First day to include (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="Last day to include (YYYY-MM-DD)"),
+    include_archived: bool = Query(False, description="Also export archived usage logs"),
+    x_api_key: str = Header(..., alias="X-API-Key", description="Admin API Key")
+):
+    """
+    Stream raw usage logs for billing
+
+    Rows are read in pages of 1000 by id, so memory use does not depend on
+    the size of the export.
+    """
+    if x_api_key != config.admin_api_key:
+        raise HTTPException(status_code=401, detail="Invalid admin API key")
+
+    start_day = _parse_day(start_date, "start_date")
+    end_day = _parse_day(end_date, "end_date")
+
+    pages = _iter_rows(api_key_id, start_day, end_day, include_archived)
+    filename = f"usage_{datetime.utcnow().strftime('%Y%m%d%H%M%S')}.{format}"
+
+    if format == "csv":
+        body, media_type = _csv_stream(pages), "text/csv"
+    else:
+        body, media_type = _ndjson_stream(pages), "application/x-ndjson"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -2,7 +2,9 @@
 SpeechMate Host Server Configuration
 """
 import os
+import time
 import secrets
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 from pydantic import BaseModel
@@ -21,6 +23,11 @@ LOGS_DIR = BASE_DIR / "logs"
 for dir_path in [DATA_DIR, MODELS_DIR, LOGS_DIR]:
     dir_path.mkdir(parents=True, exist_ok=True)
 
+# Set by start_server.py for each API worker: how many share the port, and
+# the file naming the one worker that runs the usage log retention
+API_WORKERS = max(1, int(os.environ.get("SPEECHMATE_API_WORKERS", "1")))
+RETENTION_OWNER_FILE = os.environ.get("SPEECHMATE_RETENTION_FILE")
+
 
 class ServerConfig(BaseModel):
     """Server configuration"""
@@ -29,17 +36,77 @@ class ServerConfig(BaseModel):
     web_host: str = "0.0.0.0"
     web_port: int = 5000
     debug: bool = False
+    warmup_enabled: bool = True  # Run warmup inferences before reporting ready
 
 
-def detect_gpu() -> tuple:
-    """Detect if CUDA GPU is available and return optimal settings"""
+DEVICE_PROBE_FILE = DATA_DIR / "device_probe.json"
+
+
+def _probe_fingerprint() -> dict:
+    """Describe the runtime the device probe result depends on"""
+    import sys
+    from importlib import metadata
+
+    versions = {}
+    for package in ("ctranslate2", "torch"):
+        try:
+            versions[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            versions[package] = None
+
+    return {
+        "python": sys.executable,
+        "cuda_visible_devices": os.getenv("CUDA_VISIBLE_DEVICES"),
+        **versions
+    }
+
+
+def _probe_cuda() -> bool:
+    """Check for a CUDA device, preferring CTranslate2 over importing torch"""
+    try:
+        import ctranslate2
+        return ctranslate2.get_cuda_device_count() > 0
+    except ImportError:
+        pass
     try:
         import torch
-        if torch.cuda.is_available():
-            return "cuda", "float16"  # GPU optimal settings
+        return torch.cuda.is_available()
     except ImportError:
+        return False
+
+
+@lru_cache(maxsize=1)
+def detect_gpu() -> tuple:
+    """Detect if CUDA GPU is available and return optimal settings
+
+    The result is cached in DATA_DIR so later starts skip the probe unless
+    the Python environment or visible devices change.
+    """
+    import json
+
+    fingerprint = _probe_fingerprint()
+    try:
+        cached = json.loads(DEVICE_PROBE_FILE.read_text(encoding="utf-8"))
+        if cached.get("fingerprint") == fingerprint:
+            return cached["device"], cached["compute_type"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    if _probe_cuda():
+        result = ("cuda", "float16")  # GPU optimal settings
+    else:
+        result = ("cpu", "int8")  # CPU default settings
+
+    try:
+        DEVICE_PROBE_FILE.write_text(json.dumps({
+            "fingerprint": fingerprint,
+            "device": result[0],
+            "compute_type": result[1]
+        }), encoding="utf-8")
+    except OSError:
         pass
-    return "cpu", "int8"  # CPU default settings
+
+    return result
 
 
 # Auto-detect GPU on startup
@@ -50,7 +117,9 @@ class ModelConfig(BaseModel):
     """Model configuration"""
     asr_model: str = "small"
     asr_device: str = _default_device  # cpu or cuda (auto-detected)
-    asr_compute_type: str = _default_compute_type  # float16 (GPU), int8 (CPU)
+    asr_compute_type: str = _default_compute_type  # float16 (GPU), int8 (CPU), see COMPUTE_TYPES
+    asr_cpu_threads: int = 0  # Threads per inference on CPU (0 = autotuned value or engine default)
+    asr_num_workers: int = 0  # Transcriptions one model runs in parallel (0 = autotuned value or 1)
     translation_model_zh_en: str = "Helsinki-NLP/opus-mt-zh-en"
     translation_model_en_zh: str = "Helsinki-NLP/opus-mt-en-zh"
 
@@ -58,6 +127,96 @@ class ModelConfig(BaseModel):
 class DatabaseConfig(BaseModel):
     """Database configuration"""
     db_path: str = str(DATA_DIR / "speechmate.db")
+    usage_db_path: Optional[str] = None  # Separate file for usage_logs, e.g. data/usage.db
+    busy_timeout_ms: int = 5000  # Wait this long for a write lock before failing
+    cache_size_kb: int = 16384  # SQLite page cache per connection
+    mmap_size_mb: int = 64
+    pool_size: int = 5
+    pool_max_overflow: int = 10
+    pool_timeout: float = 30.0
+    key_cache_ttl: float = 30.0  # Seconds a verified API key stays cached
+    last_used_flush_interval: float = 5.0  # Seconds between last_used_at batch writes
+    usage_log_batch_size: int = 200  # Usage logs per bulk insert
+    usage_log_flush_ms: int = 500  # Max delay before queued usage logs are written
+    usage_log_queue_size: int = 10000  # Queued usage logs before log_usage blocks
+    usage_log_retention_days: int = 90  # Older usage logs move to the archive (0 disables)
+    retention_batch_size: int = 5000  # Rows archived and deleted per transaction
+    retention_interval_hours: float = 24.0
+    vacuum_pages: int = 2000  # Pages freed per incremental VACUUM
+
+
+class TracingConfig(BaseModel):
+    """Request tracing configuration"""
+    export_enabled: bool = True  # Write sampled traces to logs/traces
+    file_retention_days: int = 7  # Daily trace files older than this are deleted (0 keeps them)
+    file_max_mb: int = 20  # A day's trace file stops growing at this size (0 for no limit)
+    sample_rate: float = 0.01  # Fraction of ordinary requests exported
+    slow_threshold_ms: float = 5000  # Always export requests slower than this (0 disables)
+    otlp_endpoint: Optional[str] = None  # e.g. http://localhost:4318/v1/traces
+
+
+class RateLimitConfig(BaseModel):
+    """Per-key rate limit and quota defaults (API keys can override each limit)"""
+    enabled: bool = False  # Opt in; limits and quotas apply only while enabled
+    requests_per_minute: int = 60  # 0 disables the request limit
+    request_burst: int = 10  # Requests allowed back to back before the rate applies
+    audio_seconds_per_minute: float = 600  # 0 disables the audio rate limit
+    daily_audio_quota: float = 0  # Seconds of audio per UTC day (0 = unlimited)
+    monthly_audio_quota: float = 0  # Seconds of audio per UTC month (0 = unlimited)
+    quota_sync_interval: int = 60  # Seconds between reloading quota usage from usage_daily
+
+
+class ProfilingConfig(BaseModel):
+    """Profiling and diagnostics configuration"""
+    request_memory: bool = False  # Trace allocations and record peak memory per inference request
+    tracemalloc_frames: int = 1  # Stack depth kept per allocation (deeper is slower)
+    memory_report_interval: int = 300  # Seconds between RSS breakdown log lines (0 disables)
+    loop_monitor: bool = True  # Measure event loop lag and log what blocks it
+    loop_check_interval_ms: float = 100  # How often the loop is probed
+    loop_block_threshold_ms: float = 250  # Lag above which the blocking stack is logged
+
+
+class TuningConfig(BaseModel):
+    """CPU thread/worker autotuning configuration"""
+    autotune_on_start: bool = False  # Tune during warmup when no saved result matches this machine
+    target_latency_ms: float = 1500  # Latency SLO for one clip, used to pick CPU settings and recommend models
+    sample_seconds: float = 5.0  # Length of the synthetic clip (a typical dictation)
+    rounds: int = 3  # Clips per measurement
+    concurrency: int = 0  # Clips in flight for the throughput test (0 = what the server runs: num_workers, plus two-pass refine workers)
+
+
+class DegradationConfig(BaseModel):
+    """Load-adaptive fallback to a smaller ASR model"""
+    enabled: bool = False
+    fallback_model: str = "tiny"  # Kept loaded next to asr_model while enabled
+    queue_depth_threshold: int = 4  # Inference requests in flight that start degradation
+    latency_threshold_ms: float = 0  # p90 request latency on asr_model that starts degradation (0 disables)
+    latency_window_seconds: float = 30  # Requests considered for the latency threshold
+    recover_queue_depth: int = 1  # Return to asr_model once in-flight requests drop to this
+    min_degraded_seconds: float = 10  # Stay degraded at least this long to avoid flapping
+    max_audio_seconds: float = 30  # Only clips up to this long (interactive requests) are degraded
+
+
+class TwoPassConfig(BaseModel):
+    """Draft-then-refine transcription, requested per call with refine=true"""
+    enabled: bool = False
+    draft_model: str = "tiny"  # Answers immediately; loaded during warmup while enabled
+    refine_model: Optional[str] = None  # Refines in the background (None = model.asr_model)
+    workers: int = 1  # Refinements run at the same time
+    max_pending: int = 8  # Queued refinements before new requests get a final answer instead
+    result_ttl: int = 300  # Seconds a refined result stays available to poll
+
+
+class VadConfig(BaseModel):
+    """Energy-based silence removal before ASR"""
+    enabled: bool = True
+    frame_ms: float = 30  # Analysis frame length
+    threshold_db: float = -50  # Frames quieter than this (dBFS) are never speech
+    noise_margin_db: float = 10  # Speech must be this much louder than the clip's noise floor
+    min_speech_ms: float = 120  # Shorter bursts (key clicks) are not speech
+    padding_ms: float = 200  # Silence kept on each side of speech
+    max_pause_ms: float = 1000  # Pauses longer than this are shortened to twice padding_ms
+    min_saving_ms: float = 300  # Audio is only rewritten when at least this much is removed
 
 
 class Config(BaseModel):
@@ -65,6 +224,13 @@ class Config(BaseModel):
     server: ServerConfig = ServerConfig()
     model: ModelConfig = ModelConfig()
     database: DatabaseConfig = DatabaseConfig()
+    tracing: TracingConfig = TracingConfig()
+    rate_limit: RateLimitConfig = RateLimitConfig()
+    profiling: ProfilingConfig = ProfilingConfig()
+    tuning: TuningConfig = TuningConfig()
+    degradation: DegradationConfig = DegradationConfig()
+    two_pass: TwoPassConfig = TwoPassConfig()
+    vad: VadConfig = VadConfig()
 
     # Admin settings
     admin_api_key: str = os.getenv("ADMIN_API_KEY", secrets.token_hex(16))
@@ -75,10 +241,17 @@ class Config(BaseModel):
 config = Config()
 
 
-# Available ASR models
+# Compute types the ASR engines accept
+COMPUTE_TYPES = ("float16", "int8", "int8_float16", "float32")
+
+
+# Available ASR models. "backend" names the engine in models.backends (or maps
+# device -> engine), "model_id" the engine's own model name (default: the key),
+# and "options" extra engine settings such as batch_size or cpu_threads.
 ASR_MODELS = {
     "tiny": {
         "name": "faster-whisper-tiny",
+        "backend": "faster-whisper",
         "size": "39MB",
         "speed": "极快",
         "accuracy": "一般",
@@ -86,6 +259,7 @@ ASR_MODELS = {
     },
     "base": {
         "name": "faster-whisper-base",
+        "backend": "faster-whisper",
         "size": "74MB",
         "speed": "快",
         "accuracy": "较好",
@@ -93,6 +267,7 @@ ASR_MODELS = {
     },
     "small": {
         "name": "faster-whisper-small",
+        "backend": "faster-whisper",
         "size": "244MB",
         "speed": "中等",
         "accuracy": "好",
@@ -100,6 +275,7 @@ ASR_MODELS = {
     },
     "medium": {
         "name": "faster-whisper-medium",
+        "backend": "faster-whisper",
         "size": "769MB",
         "speed": "较慢",
         "accuracy": "很好",
@@ -107,10 +283,29 @@ ASR_MODELS = {
     },
     "large-v3": {
         "name": "faster-whisper-large-v3",
+        "backend": "faster-whisper",
         "size": "1.5GB",
         "speed": "慢",
         "accuracy": "最好",
         "description": "最高精度的模型"
+    },
+    "base-cpp": {
+        "name": "whisper.cpp-base",
+        "backend": "whisper-cpp",
+        "model_id": "base",
+        "size": "142MB",
+        "speed": "快",
+        "accuracy": "较好",
+        "description": "轻量 CPU 引擎，适合没有 GPU 的低配机器"
+    },
+    "small-cpp": {
+        "name": "whisper.cpp-small",
+        "backend": "whisper-cpp",
+        "model_id": "small",
+        "size": "466MB",
+        "speed": "中等",
+        "accuracy": "好",
+        "description": "轻量 CPU 引擎的推荐选择"
     }
 }
 
@@ -120,34 +315,70 @@ def get_base_url() -> str:
     return f"http://{get_local_ip()}:{config.server.api_port}"
 
 
+# Local IP cache: (ip, resolved_at)
+LOCAL_IP_TTL = 300
+_local_ip_cache = None
+
+
 def get_local_ip() -> str:
-    """Get local IP address"""
+    """Get local IP address (cached for LOCAL_IP_TTL seconds)"""
+    global _local_ip_cache
+    now = time.monotonic()
+    if _local_ip_cache and now - _local_ip_cache[1] < LOCAL_IP_TTL:
+        return _local_ip_cache[0]
+
     import socket
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.connect(("8.8.8.8", 80))
         ip = s.getsockname()[0]
         s.close()
-        return ip
     except Exception:
-        return "127.0.0.1"
+        ip = "127.0.0.1"
+
+    _local_ip_cache = (ip, now)
+    return ip
+
+
+CONFIG_FILE = DATA_DIR / "config.yaml"
 
 
 def save_config():
     """Save configuration to file"""
     import yaml
-    config_path = DATA_DIR / "config.yaml"
-    with open(config_path, "w", encoding="utf-8") as f:
+    with open(CONFIG_FILE, "w", encoding="utf-8") as f:
         yaml.dump(config.model_dump(), f, default_flow_style=False, allow_unicode=True)
 
 
-def load_config_from_file():
-    """Load configuration from file"""
+def load_config_from_file(config_path: Path = None) -> bool:
+    """Apply saved settings to the global config in place; returns whether a file was loaded
+
+    Modules hold references to config, so its fields are replaced rather
+    than the object. ADMIN_API_KEY and JWT_SECRET from the environment win
+    over saved values. An unreadable file leaves the defaults in place.
+    """
+    config_path = config_path or CONFIG_FILE
+    if not config_path.exists():
+        return False
+
     import yaml
-    config_path = DATA_DIR / "config.yaml"
-    if config_path.exists():
+    from loguru import logger
+
+    try:
         with open(config_path, "r", encoding="utf-8") as f:
-            data = yaml.safe_load(f)
-            if data:
-                global config
-                config = Config(**data)
+            data = yaml.safe_load(f) or {}
+        for name in ("admin_api_key", "jwt_secret"):
+            if os.getenv(name.upper()):
+                data.pop(name, None)
+        loaded = Config(**{**config.model_dump(), **data})
+    except Exception as e:
+        logger.error(f"Ignoring {config_path}: {e}")
+        return False
+
+    for name in Config.model_fields:
+        setattr(config, name, getattr(loaded, name))
+    return True
+
+
+# Saved settings (web admin, POST /api/v1/config/model or edited by hand) apply at startup
+load_config_from_file()
@@ -1,14 +1,23 @@
 """
 SpeechMate Database Module
 """
+import os
+import time
+import queue
+import threading
 from datetime import datetime, timedelta
 from typing import Optional, List
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, Float, Text
+from importlib.util import find_spec
+from sqlalchemy import create_engine, event, inspect, text, select, func, Column, Integer, String, DateTime, Boolean, Float, Text, update, case, insert
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import sessionmaker, Session
-from contextlib import contextmanager
+from contextlib import contextmanager, asynccontextmanager
 
-from app.config import config
+from loguru import logger
+
+from app.config import config, DATA_DIR
+from app.sketch import LatencySketch
 
 Base = declarative_base()
 
@@ -23,6 +32,15 @@ class APIKey(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     last_used_at = Column(DateTime, nullable=True)
+    # Per-key limits; NULL uses the rate_limit config default, 0 means unlimited
+    requests_per_minute = Column(Integer, nullable=True)
+    audio_seconds_per_minute = Column(Float, nullable=True)
+    daily_audio_quota = Column(Float, nullable=True)  # Seconds of audio per UTC day
+    monthly_audio_quota = Column(Float, nullable=True)  # Seconds of audio per UTC month
+
+
+# Limit columns an admin can set per API key
+API_KEY_LIMITS = ("requests_per_minute", "audio_seconds_per_minute", "daily_audio_quota", "monthly_audio_quota")
 
 
 class UsageLog(Base):
@@ -39,6 +57,35 @@ class UsageLog(Base):
     target_lang = Column(String(10), nullable=True)
     success = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
+    model = Column(String(50), nullable=True)
+    peak_memory_bytes = Column(Integer, nullable=True)  # Only recorded when profiling.request_memory is on
+    degraded = Column(Boolean, nullable=True)  # Served by the fallback model under load
+
+
+class UsageDaily(Base):
+    """Daily usage rollup, maintained as usage logs are written"""
+    __tablename__ = "usage_daily"
+
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+    api_key_id = Column(Integer, primary_key=True)
+    endpoint = Column(String(50), primary_key=True)
+    request_count = Column(Integer, default=0, nullable=False)
+    audio_seconds = Column(Float, default=0.0, nullable=False)
+    processing_seconds = Column(Float, default=0.0, nullable=False)
+    failure_count = Column(Integer, default=0, nullable=False)
+    degraded_count = Column(Integer, default=0)  # Nullable: added to existing tables by ALTER TABLE
+
+
+class UsageLatency(Base):
+    """Latency sketches per day, key, endpoint, model and metric"""
+    __tablename__ = "usage_latency"
+
+    day = Column(String(10), primary_key=True)  # YYYY-MM-DD (UTC)
+    api_key_id = Column(Integer, primary_key=True)
+    endpoint = Column(String(50), primary_key=True)
+    model = Column(String(50), primary_key=True)
+    metric = Column(String(20), primary_key=True)  # processing_time, rtf
+    sketch = Column(Text, nullable=False)  # LatencySketch JSON
 
 
 class ModelConfigDB(Base):
@@ -51,14 +98,113 @@ class ModelConfigDB(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
-# Create engine
-engine = create_engine(f"sqlite:///{config.database.db_path}", echo=False)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Applied to every new SQLite connection. WAL lets the API and web admin
+# processes read while the other writes; busy_timeout makes writers wait
+# for the lock instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "auto_vacuum": "INCREMENTAL",  # Only takes effect on new database files
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": config.database.busy_timeout_ms,
+    "cache_size": -config.database.cache_size_kb,
+    "temp_store": "MEMORY",
+    "mmap_size": config.database.mmap_size_mb * 1024 * 1024
+}
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def _engine_options() -> dict:
+    return {
+        "echo": False,
+        "pool_size": config.database.pool_size,
+        "max_overflow": config.database.pool_max_overflow,
+        "pool_timeout": config.database.pool_timeout,
+        "connect_args": {
+            "check_same_thread": False,
+            "timeout": config.database.busy_timeout_ms / 1000
+        }
+    }
+
+
+def _create_sqlite_engine(db_path: str):
+    db_engine = create_engine(f"sqlite:///{db_path}", **_engine_options())
+    event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return db_engine
+
+
+# Create engines; usage logs optionally live in their own database file
+engine = _create_sqlite_engine(config.database.db_path)
+usage_engine = (
+    _create_sqlite_engine(config.database.usage_db_path)
+    if config.database.usage_db_path else engine
+)
+
+SESSION_BINDS = {APIKey: engine, ModelConfigDB: engine, UsageLog: usage_engine,
+                 UsageDaily: usage_engine, UsageLatency: usage_engine}
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, binds=SESSION_BINDS)
+
+# Async engines are created on first use (requires aiosqlite and greenlet)
+ASYNC_DB_AVAILABLE = find_spec("aiosqlite") is not None and find_spec("greenlet") is not None
+_AsyncSessionLocal = None
+
+
+def _get_async_sessionmaker():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+        def create_async_sqlite_engine(db_path: str):
+            options = _engine_options()
+            async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", **options)
+            event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+            return async_engine
+
+        async_engine = create_async_sqlite_engine(config.database.db_path)
+        async_usage_engine = (
+            create_async_sqlite_engine(config.database.usage_db_path)
+            if config.database.usage_db_path else async_engine
+        )
+        _AsyncSessionLocal = async_sessionmaker(
+            autoflush=False,
+            expire_on_commit=False,
+            binds={
+                APIKey: async_engine,
+                ModelConfigDB: async_engine,
+                UsageLog: async_usage_engine,
+                UsageDaily: async_usage_engine,
+                UsageLatency: async_usage_engine
+            }
+        )
+    return _AsyncSessionLocal
+
+
+def _add_missing_columns(db_engine, model):
+    """Add columns introduced after a table was first created"""
+    existing = {column["name"] for column in inspect(db_engine).get_columns(model.__tablename__)}
+    with db_engine.begin() as conn:
+        for column in model.__table__.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=db_engine.dialect)
+                conn.execute(text(f"ALTER TABLE {model.__tablename__} ADD COLUMN {column.name} {column_type}"))
+                logger.info(f"Added column {model.__tablename__}.{column.name}")
 
 
 def init_db():
     """Initialize database"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=engine, tables=[APIKey.__table__, ModelConfigDB.__table__])
+    Base.metadata.create_all(
+        bind=usage_engine,
+        tables=[UsageLog.__table__, UsageDaily.__table__, UsageLatency.__table__]
+    )
+    _add_missing_columns(engine, APIKey)
+    _add_missing_columns(usage_engine, UsageLog)
+    _add_missing_columns(usage_engine, UsageDaily)
 
     # Create default API key if not exists
     with get_session() as session:
@@ -73,6 +219,15 @@ def init_db():
             session.commit()
             print(f"Created default API key: {default_key.key}")
 
+    # Build the rollup for databases created before it existed
+    with get_session() as session:
+        needs_backfill = (
+            session.query(UsageDaily).first() is None
+            and session.query(UsageLog).first() is not None
+        )
+    if needs_backfill:
+        rebuild_usage_daily()
+
 
 @contextmanager
 def get_session():
@@ -88,32 +243,420 @@ def get_session():
         session.close()
 
 
+@asynccontextmanager
+async def get_async_session():
+    """Get async database session"""
+    session = _get_async_sessionmaker()()
+    try:
+        yield session
+        await session.commit()
+    except Exception:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
+
+
+# Touched whenever API keys change so other processes drop their caches
+KEY_VERSION_FILE = DATA_DIR / "api_keys.version"
+
+
+class APIKeyCache:
+    """In-process cache of verified API keys with a TTL"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries = {}  # key -> (info, expires_at)
+        self._lock = threading.Lock()
+        self._version = self._read_version()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _read_version() -> int:
+        try:
+            return os.stat(KEY_VERSION_FILE).st_mtime_ns
+        except OSError:
+            return 0
+
+    def get(self, api_key: str) -> Optional[dict]:
+        """Return cached key info, or None on a miss or expiry"""
+        info = self._lookup(api_key)
+        if info is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return info
+
+    def _lookup(self, api_key: str) -> Optional[dict]:
+        version = self._read_version()
+        if version != self._version:
+            # Keys were changed by another process (e.g. the web admin)
+            with self._lock:
+                self._entries.clear()
+                self._version = version
+            return None
+
+        entry = self._entries.get(api_key)
+        if entry is None:
+            return None
+        info, expires_at = entry
+        if time.monotonic() >= expires_at:
+            with self._lock:
+                self._entries.pop(api_key, None)
+            return None
+        return info
+
+    def put(self, api_key: str, info: dict):
+        with self._lock:
+            self._entries[api_key] = (info, time.monotonic() + self.ttl)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class LastUsedWriter:
+    """Coalesces last_used_at updates and writes them in one batch statement"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._pending = {}  # key_id -> last used datetime
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark(self, key_id: int):
+        with self._lock:
+            self._pending[key_id] = datetime.utcnow()
+
+    def flush(self):
+        """Write all pending last_used_at values"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        try:
+            with get_session() as session:
+                session.execute(
+                    update(APIKey)
+                    .where(APIKey.id.in_(list(pending)))
+                    .values(last_used_at=case(pending, value=APIKey.id))
+                )
+        except Exception as e:
+            logger.error(f"Failed to flush last_used_at updates: {e}")
+            # Keep the values for the next attempt unless newer ones arrived
+            with self._lock:
+                for key_id, used_at in pending.items():
+                    self._pending.setdefault(key_id, used_at)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="last-used-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and flush remaining updates"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+        self.flush()
+
+
+api_key_cache = APIKeyCache(ttl=config.database.key_cache_ttl)
+last_used_writer = LastUsedWriter(interval=config.database.last_used_flush_interval)
+
+
+def invalidate_api_key_cache():
+    """Drop cached API keys in this and every other process"""
+    api_key_cache.clear()
+    try:
+        KEY_VERSION_FILE.touch()
+    except OSError as e:
+        logger.warning(f"Failed to update API key version file: {e}")
+
+
+def _key_info(key_obj: APIKey) -> dict:
+    return {
+        "id": key_obj.id,
+        "key": key_obj.key,
+        "name": key_obj.name,
+        "is_active": key_obj.is_active,
+        **{name: getattr(key_obj, name) for name in API_KEY_LIMITS}
+    }
+
+
 def verify_api_key(api_key: str) -> Optional[dict]:
     """Verify API key and return the key info if valid"""
+    key_info = api_key_cache.get(api_key)
+
+    if key_info is None:
+        with get_session() as session:
+            key_obj = session.query(APIKey).filter(
+                APIKey.key == api_key,
+                APIKey.is_active == True
+            ).first()
+            if not key_obj:
+                return None
+            key_info = _key_info(key_obj)
+        api_key_cache.put(api_key, key_info)
+
+    # Update last used time in the next batch
+    last_used_writer.mark(key_info["id"])
+
+    return dict(key_info)
+
+
+async def verify_api_key_async(api_key: str) -> Optional[dict]:
+    """Verify API key without blocking the event loop on a cache miss"""
+    key_info = api_key_cache.get(api_key)
+
+    if key_info is None:
+        if not ASYNC_DB_AVAILABLE:
+            import asyncio
+            return await asyncio.to_thread(verify_api_key, api_key)
+
+        async with get_async_session() as session:
+            result = await session.execute(
+                select(APIKey).where(APIKey.key == api_key, APIKey.is_active == True)
+            )
+            key_obj = result.scalars().first()
+            if not key_obj:
+                return None
+            key_info = _key_info(key_obj)
+        api_key_cache.put(api_key, key_info)
+
+    last_used_writer.mark(key_info["id"])
+
+    return dict(key_info)
+
+
+# A batch that fails to commit (e.g. SQLITE_BUSY past busy_timeout) is retried
+# after 0.5s, 1s, 2s... up to 8s, and only dropped after this many attempts
+USAGE_WRITE_ATTEMPTS = 6
+USAGE_RETRY_BACKOFF = 0.5
+USAGE_RETRY_BACKOFF_MAX = 8.0
+
+
+class UsageLogWriter:
+    """Collects usage records in a bounded queue and bulk-inserts them
+
+    A batch that fails to write is retried with backoff before new records
+    are taken from the queue, which keeps filling (and eventually blocks
+    submitters) meanwhile.
+    """
+
+    def __init__(self, batch_size: int, flush_interval: float, max_queue: int):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self.batches_written = 0
+        self.records_written = 0
+        self.records_dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def submit(self, record: dict):
+        """Queue a record; blocks only when the queue is full"""
+        self._queue.put(record)
+
+    def _write(self, records: List[dict]) -> bool:
+        """Write one batch; returns whether it was committed"""
+        from app.rate_limit import rate_limiter
+
+        try:
+            with get_session() as session:
+                write_usage_logs(session, records)
+        except Exception as e:
+            logger.error(f"Failed to write {len(records)} usage logs: {e}")
+            return False
+        self.batches_written += 1
+        self.records_written += len(records)
+        # Only committed charges stop being counted as pending by the rate limiter
+        rate_limiter.usage_flushed(records)
+        return True
+
+    def _write_with_retry(self, records: List[dict]):
+        """Write a batch, retrying with backoff; drops it only after the last attempt"""
+        for attempt in range(USAGE_WRITE_ATTEMPTS):
+            if self._write(records):
+                return
+            if attempt + 1 < USAGE_WRITE_ATTEMPTS:
+                # Shutting down cuts the waits short but still makes every attempt
+                self._stop.wait(min(USAGE_RETRY_BACKOFF * 2 ** attempt, USAGE_RETRY_BACKOFF_MAX))
+        self.records_dropped += len(records)
+        logger.error(f"Dropped {len(records)} usage logs after {USAGE_WRITE_ATTEMPTS} attempts")
+
+    def _drain(self, first: Optional[dict] = None) -> List[dict]:
+        """Collect up to batch_size records, waiting at most flush_interval"""
+        batch = [first] if first is not None else []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        from app.rate_limit import rate_limiter
+
+        while not self._stop.is_set():
+            rate_limiter.sync_quotas()  # Between writes, so a reload never races this thread's commits
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+            self._write_with_retry(self._drain(first))
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-log-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background thread and write everything still queued"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+
+    def flush(self):
+        """Write all queued records from the calling thread"""
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write_with_retry(batch)
+
+
+def write_usage_logs(session: Session, records: List[dict]):
+    """Insert usage records and fold them into the daily rollup"""
+    session.execute(insert(UsageLog), records)
+
+    rollup = {}
+    for record in records:
+        group = (record["timestamp"].strftime("%Y-%m-%d"), record["api_key_id"], record["endpoint"])
+        row = rollup.setdefault(group, {
+            "day": group[0],
+            "api_key_id": group[1],
+            "endpoint": group[2],
+            "request_count": 0,
+            "audio_seconds": 0.0,
+            "processing_seconds": 0.0,
+            "failure_count": 0,
+            "degraded_count": 0
+        })
+        row["request_count"] += 1
+        row["audio_seconds"] += record["audio_duration"] or 0.0
+        row["processing_seconds"] += record["processing_time"] or 0.0
+        row["failure_count"] += 0 if record["success"] else 1
+        row["degraded_count"] += 1 if record.get("degraded") else 0
+
+    stmt = sqlite_insert(UsageDaily).values(list(rollup.values()))
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[UsageDaily.day, UsageDaily.api_key_id, UsageDaily.endpoint],
+        set_={
+            "request_count": UsageDaily.request_count + stmt.excluded.request_count,
+            "audio_seconds": UsageDaily.audio_seconds + stmt.excluded.audio_seconds,
+            "processing_seconds": UsageDaily.processing_seconds + stmt.excluded.processing_seconds,
+            "failure_count": UsageDaily.failure_count + stmt.excluded.failure_count,
+            "degraded_count": func.coalesce(UsageDaily.degraded_count, 0) + stmt.excluded.degraded_count
+        }
+    ))
+
+    update_latency_sketches(session, records)
+
+
+def update_latency_sketches(session: Session, records: List[dict]):
+    """Merge successful requests into the persisted latency sketches"""
+    sketches = {}
+    for record in records:
+        if not record["success"]:
+            continue
+        group = (
+            record["timestamp"].strftime("%Y-%m-%d"),
+            record["api_key_id"],
+            record["endpoint"],
+            record.get("model") or ""
+        )
+        processing_time = record["processing_time"] or 0.0
+        sketches.setdefault(group + ("processing_time",), LatencySketch()).add(processing_time)
+        if record["audio_duration"]:
+            rtf = processing_time / record["audio_duration"]
+            sketches.setdefault(group + ("rtf",), LatencySketch()).add(rtf)
+
+    if not sketches:
+        return
+
+    # Merge with what is already stored for the same groups
+    days = {group[0] for group in sketches}
+    key_ids = {group[1] for group in sketches}
+    existing = session.query(UsageLatency).filter(
+        UsageLatency.day.in_(days),
+        UsageLatency.api_key_id.in_(key_ids)
+    ).all()
+    for row in existing:
+        group = (row.day, row.api_key_id, row.endpoint, row.model, row.metric)
+        if group in sketches:
+            sketches[group].merge(LatencySketch.from_json(row.sketch))
+
+    session.execute(
+        sqlite_insert(UsageLatency).prefix_with("OR REPLACE"),
+        [
+            {"day": day, "api_key_id": key_id, "endpoint": endpoint,
+             "model": model, "metric": metric, "sketch": sketch.to_json()}
+            for (day, key_id, endpoint, model, metric), sketch in sketches.items()
+        ]
+    )
+
+
+def rebuild_usage_daily() -> int:
+    """Rebuild the daily rollup from raw and archived usage logs; returns the number of rows"""
+    from app.retention import aggregate_usage
+
+    rows = aggregate_usage()
     with get_session() as session:
-        key_obj = session.query(APIKey).filter(
-            APIKey.key == api_key,
-            APIKey.is_active == True
-        ).first()
-        if key_obj:
-            # Get all needed attributes before modifying
-            key_id = key_obj.id
-            key_key = key_obj.key
-            key_name = key_obj.name
-            key_active = key_obj.is_active
-
-            # Update last used time
-            key_obj.last_used_at = datetime.utcnow()
-            session.commit()
+        session.query(UsageDaily).delete()
+        for i in range(0, len(rows), 500):
+            session.execute(insert(UsageDaily), rows[i:i + 500])
+    logger.info(f"Rebuilt usage_daily rollup ({len(rows)} rows)")
+    return len(rows)
 
-            # Return a dict with pre-fetched values
-            return {
-                "id": key_id,
-                "key": key_key,
-                "name": key_name,
-                "is_active": key_active
-            }
-        return None
+
+usage_log_writer = UsageLogWriter(
+    batch_size=config.database.usage_log_batch_size,
+    flush_interval=config.database.usage_log_flush_ms / 1000,
+    max_queue=config.database.usage_log_queue_size
+)
 
 
 def log_usage(
@@ -124,87 +667,199 @@ def log_usage(
     source_lang: str = None,
     target_lang: str = None,
     success: bool = True,
-    error_message: str = None
+    error_message: str = None,
+    model: str = None,
+    peak_memory_bytes: int = None,
+    degraded: bool = False
 ):
-    """Log API usage"""
-    with get_session() as session:
-        log = UsageLog(
-            api_key_id=api_key_id,
-            endpoint=endpoint,
-            audio_duration=audio_duration,
-            processing_time=processing_time,
-            source_lang=source_lang,
-            target_lang=target_lang,
-            success=success,
-            error_message=error_message
-        )
-        session.add(log)
+    """Log API usage (queued for a batched write when the writer is running)"""
+    record = {
+        "api_key_id": api_key_id,
+        "endpoint": endpoint,
+        "timestamp": datetime.utcnow(),
+        "audio_duration": audio_duration,
+        "processing_time": processing_time,
+        "source_lang": source_lang,
+        "target_lang": target_lang,
+        "success": success,
+        "error_message": error_message,
+        "model": model,
+        "peak_memory_bytes": peak_memory_bytes,
+        "degraded": degraded
+    }
+
+    if usage_log_writer.running:
+        usage_log_writer.submit(record)
+    else:
+        from app.rate_limit import rate_limiter
+
+        with get_session() as session:
+            write_usage_logs(session, [record])
+        rate_limiter.usage_flushed([record])
 
 
 def get_stats(api_key_id: Optional[int] = None, days: int = 30) -> dict:
-    """Get usage statistics"""
+    """Get usage statistics from the daily rollup"""
     with get_session() as session:
-        from sqlalchemy import func
+        start_day = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
 
-        start_date = datetime.utcnow() - timedelta(days=days)
-
-        query = session.query(
-            UsageLog.api_key_id,
-            UsageLog.endpoint,
-            func.date(UsageLog.timestamp).label("date"),
-            func.count().label("count")
-        ).filter(
-            UsageLog.timestamp >= start_date
-        )
+        query = session.query(UsageDaily).filter(UsageDaily.day >= start_day)
 
         if api_key_id:
-            query = query.filter(UsageLog.api_key_id == api_key_id)
-
-        results = query.group_by(
-            UsageLog.api_key_id,
-            UsageLog.endpoint,
-            func.date(UsageLog.timestamp)
-        ).all()
+            query = query.filter(UsageDaily.api_key_id == api_key_id)
 
         # Organize stats
         stats = {}
-        for row in results:
+        for row in query.all():
             key_id = row.api_key_id
             if key_id not in stats:
                 stats[key_id] = {
                     "daily": {},
                     "total_transcribe": 0,
-                    "total_translate": 0
+                    "total_translate": 0,
+                    "total_audio_seconds": 0.0,
+                    "total_processing_seconds": 0.0,
+                    "total_failures": 0,
+                    "total_degraded": 0
                 }
+            key_stats = stats[key_id]
 
-            date_str = str(row.date)
-            if date_str not in stats[key_id]["daily"]:
-                stats[key_id]["daily"][date_str] = {"transcribe": 0, "translate": 0}
+            if row.day not in key_stats["daily"]:
+                key_stats["daily"][row.day] = {"transcribe": 0, "translate": 0}
 
-            stats[key_id]["daily"][date_str][row.endpoint] = row.count
+            key_stats["daily"][row.day][row.endpoint] = row.request_count
             if row.endpoint == "transcribe":
-                stats[key_id]["total_transcribe"] += row.count
+                key_stats["total_transcribe"] += row.request_count
             else:
-                stats[key_id]["total_translate"] += row.count
+                key_stats["total_translate"] += row.request_count
+            key_stats["total_audio_seconds"] += row.audio_seconds
+            key_stats["total_processing_seconds"] += row.processing_seconds
+            key_stats["total_failures"] += row.failure_count
+            key_stats["total_degraded"] += row.degraded_count or 0
 
         return stats
 
 
+# Column order used by exports and the usage archive
+USAGE_LOG_COLUMNS = [
+    "id", "api_key_id", "endpoint", "timestamp", "audio_duration", "processing_time",
+    "source_lang", "target_lang", "success", "error_message", "model", "peak_memory_bytes", "degraded"
+]
+
+
+def iter_usage_log_pages(
+    api_key_id: Optional[int] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    page_size: int = 1000
+):
+    """Yield usage logs as lists of dicts, one page at a time
+
+    Uses keyset pagination on id with a short session per page, so memory
+    stays constant and no read transaction is held open between pages.
+    """
+    columns = [getattr(UsageLog, name) for name in USAGE_LOG_COLUMNS]
+    last_id = 0
+    while True:
+        with get_session() as session:
+            query = session.query(*columns).filter(UsageLog.id > last_id)
+            if api_key_id:
+                query = query.filter(UsageLog.api_key_id == api_key_id)
+            if start:
+                query = query.filter(UsageLog.timestamp >= start)
+            if end:
+                query = query.filter(UsageLog.timestamp < end)
+            rows = query.order_by(UsageLog.id).limit(page_size).all()
+
+        if not rows:
+            return
+        last_id = rows[-1].id
+
+        page = []
+        for row in rows:
+            record = dict(zip(USAGE_LOG_COLUMNS, row))
+            if record["timestamp"]:
+                record["timestamp"] = record["timestamp"].isoformat()
+            page.append(record)
+        yield page
+
+
+def get_latency_stats(
+    days: int = 7,
+    api_key_id: Optional[int] = None,
+    endpoint: Optional[str] = None,
+    model: Optional[str] = None,
+    per_day: bool = False,
+    per_key: bool = False
+) -> List[dict]:
+    """Merge stored latency sketches and return percentile summaries"""
+    start_day = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    with get_session() as session:
+        query = session.query(UsageLatency).filter(UsageLatency.day >= start_day)
+        if api_key_id:
+            query = query.filter(UsageLatency.api_key_id == api_key_id)
+        if endpoint:
+            query = query.filter(UsageLatency.endpoint == endpoint)
+        if model:
+            query = query.filter(UsageLatency.model == model)
+        rows = query.all()
+
+        groups = {}
+        for row in rows:
+            group = (
+                row.day if per_day else None,
+                row.api_key_id if per_key else None,
+                row.endpoint,
+                row.model
+            )
+            metrics = groups.setdefault(group, {})
+            sketch = LatencySketch.from_json(row.sketch)
+            if row.metric in metrics:
+                metrics[row.metric].merge(sketch)
+            else:
+                metrics[row.metric] = sketch
+
+    result = []
+    for (day, key_id, group_endpoint, group_model), metrics in sorted(
+        groups.items(), key=lambda item: tuple(str(part) for part in item[0])
+    ):
+        entry = {"endpoint": group_endpoint, "model": group_model or None}
+        if per_day:
+            entry["day"] = day
+        if per_key:
+            entry["api_key_id"] = key_id
+        entry["processing_time"] = metrics["processing_time"].summary() if "processing_time" in metrics else None
+        entry["real_time_factor"] = metrics["rtf"].summary() if "rtf" in metrics else None
+        result.append(entry)
+
+    return result
+
+
+def _key_details(key: APIKey) -> dict:
+    return {
+        **_key_info(key),
+        "created_at": key.created_at.isoformat() if key.created_at else None,
+        "last_used_at": key.last_used_at.isoformat() if key.last_used_at else None
+    }
+
+
 def get_all_api_keys() -> List[dict]:
     """Get all API keys with stats"""
     with get_session() as session:
         keys = session.query(APIKey).all()
-        result = []
-        for key in keys:
-            result.append({
-                "id": key.id,
-                "key": key.key,
-                "name": key.name,
-                "is_active": key.is_active,
-                "created_at": key.created_at.isoformat() if key.created_at else None,
-                "last_used_at": key.last_used_at.isoformat() if key.last_used_at else None
-            })
-        return result
+        return [_key_details(key) for key in keys]
+
+
+async def get_all_api_keys_async() -> List[dict]:
+    """Get all API keys without blocking the event loop"""
+    if not ASYNC_DB_AVAILABLE:
+        import asyncio
+        return await asyncio.to_thread(get_all_api_keys)
+
+    async with get_async_session() as session:
+        result = await session.execute(select(APIKey))
+        return [_key_details(key) for key in result.scalars().all()]
 
 
 def create_api_key(name: str) -> str:
@@ -214,24 +869,58 @@ def create_api_key(name: str) -> str:
         key = secrets.token_hex(16)
         new_key = APIKey(key=key, name=name)
         session.add(new_key)
-        return key
+    invalidate_api_key_cache()
+    return key
 
 
 def delete_api_key(key_id: int) -> bool:
     """Delete API key"""
     with get_session() as session:
         key = session.query(APIKey).filter(APIKey.id == key_id).first()
-        if key:
-            session.delete(key)
-            return True
-        return False
+        if not key:
+            return False
+        session.delete(key)
+    invalidate_api_key_cache()
+    return True
 
 
 def toggle_api_key(key_id: int) -> bool:
     """Toggle API key active status"""
     with get_session() as session:
         key = session.query(APIKey).filter(APIKey.id == key_id).first()
-        if key:
-            key.is_active = not key.is_active
-            return key.is_active
-        return False
+        if not key:
+            return False
+        key.is_active = not key.is_active
+        is_active = key.is_active
+    invalidate_api_key_cache()
+    return is_active
+
+
+def set_api_key_limits(key_id: int, limits: dict) -> Optional[dict]:
+    """Update the per-key limits given in limits (None restores the default)"""
+    with get_session() as session:
+        key = session.query(APIKey).filter(APIKey.id == key_id).first()
+        if not key:
+            return None
+        for name, value in limits.items():
+            if name in API_KEY_LIMITS:
+                setattr(key, name, value)
+        result = _key_details(key)
+    invalidate_api_key_cache()
+    return result
+
+
+def get_audio_usage_totals(day: str, month_start: str) -> dict:
+    """Audio seconds per API key for the given day and since month_start
+
+    Returns {api_key_id: (day_seconds, month_seconds)} from the daily rollup.
+    """
+    with get_session() as session:
+        rows = session.query(
+            UsageDaily.api_key_id,
+            func.sum(case((UsageDaily.day == day, UsageDaily.audio_seconds), else_=0.0)),
+            func.sum(UsageDaily.audio_seconds)
+        ).filter(
+            UsageDaily.day >= month_start
+        ).group_by(UsageDaily.api_key_id).all()
+    return {key_id: (day_seconds or 0.0, month_seconds or 0.0) for key_id, day_seconds, month_seconds in rows}
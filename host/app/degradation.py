@@ -0,0 +1,115 @@
+"""
+SpeechMate Load-Adaptive Model Degradation
+"""
+import math
+import time
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.metrics import degraded_requests
+from app.readiness import readiness
+
+
+class DegradationPolicy:
+    """Routes short requests to a smaller resident model while the server is overloaded
+
+    Degradation starts when in-flight inference requests reach
+    queue_depth_threshold, or when the p90 latency of recent requests on the
+    configured model exceeds latency_threshold_ms. It ends once the queue has
+    drained to recover_queue_depth and latency is back under the threshold,
+    but not before min_degraded_seconds have passed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque()  # (monotonic time, seconds) of requests on the configured model
+        self.degraded = False
+        self.changed_at: Optional[float] = None
+        self.episodes = 0
+
+    def _recent_p90(self, now: float) -> Optional[float]:
+        window = config.degradation.latency_window_seconds
+        while self._latencies and now - self._latencies[0][0] > window:
+            self._latencies.popleft()
+        if not self._latencies:
+            return None
+        values = sorted(seconds for _, seconds in self._latencies)
+        return values[min(len(values) - 1, math.ceil(0.9 * len(values)) - 1)]
+
+    def observe(self, model: str, seconds: float):
+        """Record the latency of a request served by the configured model"""
+        if not config.degradation.enabled or model != config.model.asr_model:
+            return
+        with self._lock:
+            self._latencies.append((time.monotonic(), seconds))
+
+    def _update(self, now: float):
+        settings = config.degradation
+        depth = readiness.in_flight
+        p90 = self._recent_p90(now)
+        slow = bool(settings.latency_threshold_ms) and p90 is not None and p90 * 1000 > settings.latency_threshold_ms
+
+        if not self.degraded:
+            if depth >= settings.queue_depth_threshold or slow:
+                self.degraded = True
+                self.changed_at = now
+                self.episodes += 1
+                p90_text = f"{p90 * 1000:.0f}ms" if p90 is not None else "n/a"
+                logger.warning(
+                    f"Degrading short requests to {settings.fallback_model} (in flight: {depth}, p90: {p90_text})"
+                )
+        elif now - self.changed_at >= settings.min_degraded_seconds \
+                and depth <= settings.recover_queue_depth and not slow:
+            self.degraded = False
+            self.changed_at = now
+            logger.info(f"Load dropped, serving with {config.model.asr_model} again (in flight: {depth})")
+
+    def choose_model(self, audio_duration: float, endpoint: str) -> Tuple[str, bool]:
+        """Model to serve a request with, and whether that is a degradation"""
+        primary = config.model.asr_model
+        settings = config.degradation
+        if not settings.enabled or settings.fallback_model == primary:
+            return primary, False
+
+        with self._lock:
+            self._update(time.monotonic())
+            degraded = self.degraded
+
+        if not degraded or audio_duration > settings.max_audio_seconds or not self.fallback_resident():
+            return primary, False
+
+        degraded_requests.inc(labels=(endpoint, settings.fallback_model))
+        return settings.fallback_model, True
+
+    @staticmethod
+    def fallback_resident() -> bool:
+        """Only a loaded fallback model is used; loading one under load would make things worse"""
+        from models.asr_model import loaded_models
+
+        key = (config.degradation.fallback_model, config.model.asr_device, config.model.asr_compute_type)
+        return key in loaded_models()
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self.degraded = False
+            self.changed_at = None
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            p90 = self._recent_p90(time.monotonic())
+            return {
+                "enabled": config.degradation.enabled,
+                "degraded": self.degraded,
+                "fallback_model": config.degradation.fallback_model,
+                "episodes": self.episodes,
+                "recent_p90_ms": round(p90 * 1000, 1) if p90 is not None else None
+            }
+
+
+# Global degradation policy
+degradation_policy = DegradationPolicy()
@@ -0,0 +1,91 @@
+"""
+SpeechMate Inference Dispatch
+"""
+import asyncio
+import threading
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from app.config import config
+from app.profiling import current_request_profiler
+
+
+class InferencePool:
+    """Threads that run ASR and translation for request handlers
+
+    Handlers await inference here instead of running it on the event loop,
+    so requests queue while every slot is busy and readiness.in_flight
+    measures real queue depth. The pool has as many threads as the
+    configured ASR model is loaded with num_workers (tuned or configured),
+    which is how many decodes the engine runs in parallel.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._size_key: Optional[Tuple[str, str, str]] = None
+        self.size = 0
+
+    @staticmethod
+    def workers() -> int:
+        """num_workers of the configured ASR model"""
+        from app.tuning import cpu_options
+        from models.asr_model import resolve_backend
+
+        model_name = config.model.asr_model
+        device = config.model.asr_device
+        _, _, options = resolve_backend(model_name, device)
+        options.update(cpu_options(model_name, device, config.model.asr_compute_type))
+        return max(1, int(options.get("num_workers") or 1))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        key = (config.model.asr_model, config.model.asr_device, config.model.asr_compute_type)
+        if self._executor is not None and key == self._size_key:
+            return self._executor
+
+        with self._lock:
+            if self._executor is None or key != self._size_key:
+                self._resize(self.workers(), key)
+            return self._executor
+
+    def _resize(self, size: int, key: Tuple[str, str, str]):
+        self._size_key = key
+        if self._executor is not None and size == self.size:
+            return
+        previous = self._executor
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="inference")
+        self.size = size
+        if previous is not None:
+            previous.shutdown(wait=False)  # Calls already running finish on the old threads
+        logger.info(f"Inference pool: {size} threads")
+
+    def refresh(self):
+        """Pick up a changed num_workers, e.g. after tuning reloaded the model"""
+        with self._lock:
+            self._size_key = None
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking inference call in the pool and wait for it"""
+        call = partial(func, *args, **kwargs)
+        profiler = current_request_profiler()
+        if profiler is not None:
+            call = partial(profiler.profile_call, call)
+        context = contextvars.copy_context()  # Keeps the request's trace for spans opened inside
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), context.run, call)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+            self._executor = None
+            self._size_key = None
+            self.size = 0
+
+
+# Global inference pool
+inference_pool = InferencePool()
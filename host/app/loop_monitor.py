@@ -0,0 +1,142 @@
+"""
+SpeechMate Event Loop Monitor
+"""
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from loguru import logger
+
+from app.config import config
+from app.metrics import event_loop_lag, event_loop_blocks
+
+# Code under host/ is reported as the blocking site in preference to libraries
+HOST_DIR = str(Path(__file__).parent.parent)
+
+# Innermost frames included in the warning; /api/v1/admin/loop has the full stack
+LOGGED_FRAMES = 12
+
+
+def blocking_site(frame) -> str:
+    """Innermost frame in our own code, falling back to the innermost frame"""
+    innermost = frame
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(HOST_DIR) and not filename.endswith("loop_monitor.py"):
+            return f"{Path(filename).relative_to(HOST_DIR)}:{frame.f_code.co_name}"
+        frame = frame.f_back
+    if innermost is None:
+        return "unknown"
+    return f"{Path(innermost.f_code.co_filename).name}:{innermost.f_code.co_name}"
+
+
+class LoopMonitor:
+    """Measures event loop scheduling delay and catches whatever blocks the loop
+
+    A task on the loop sleeps for a fixed interval and records how late it
+    wakes up. A watchdog thread checks that the task keeps beating; when it
+    is overdue by more than the threshold, the loop thread's stack is
+    captured while it is still blocked and logged.
+    """
+
+    def __init__(self, interval: float, threshold: float, history: int = 50):
+        self.interval = interval
+        self.threshold = threshold
+        self.stalls = deque(maxlen=history)
+        self.max_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._stall: Optional[dict] = None
+        self._loop_thread_id = None
+        self._task = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+
+            lag = max(0.0, now - expected)
+            event_loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+            if lag >= self.threshold:
+                stall, self._stall = self._stall, None
+                if stall is not None:
+                    stall["duration_ms"] = round(lag * 1000, 1)
+                event_loop_blocks.inc(labels=(stall["site"] if stall else "unknown",))
+
+    def _overdue(self) -> float:
+        return time.monotonic() - self._last_beat - self.interval
+
+    def _watch(self):
+        while not self._stop.wait(self.threshold / 2):
+            if self._stall is not None or self._overdue() < self.threshold:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame) if frame is not None else []
+            overdue = self._overdue()
+            if overdue < self.threshold:
+                continue  # The loop recovered while the stack was captured
+
+            stall = {
+                "detected_at": datetime.utcnow().isoformat(),
+                "site": blocking_site(frame),
+                "blocked_ms": round(overdue * 1000, 1),
+                "duration_ms": None,
+                "stack": stack
+            }
+            self._stall = stall
+            self.stalls.append(stall)
+            logger.warning(
+                f"Event loop blocked for {stall['blocked_ms']:.0f}ms+ in {stall['site']}\n" + "".join(stack[-LOGGED_FRAMES:])
+            )
+
+    def start(self):
+        """Start monitoring the running event loop"""
+        if not config.profiling.loop_monitor or self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._beat())
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def to_dict(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "stalls": list(reversed(self.stalls))
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=config.profiling.loop_check_interval_ms / 1000,
+    threshold=config.profiling.loop_block_threshold_ms / 1000
+)
@@ -3,12 +3,13 @@ SpeechMate Host Server - FastAPI Main Entry
 """
 import os
 import sys
+import time
 from pathlib import Path
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 
 from loguru import logger
@@ -16,9 +17,26 @@ from loguru import logger
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.config import config, ASR_MODELS, get_base_url, get_local_ip, save_config
-from app.database import init_db
+from app.config import config, ASR_MODELS, COMPUTE_TYPES, API_WORKERS, get_base_url, get_local_ip, save_config
+from app.database import init_db, last_used_writer, usage_log_writer
 from app.api import api_router
+from app.readiness import readiness, start_warmup
+from app.retention import retention_worker
+from app.loop_monitor import loop_monitor
+from app.degradation import degradation_policy
+from app.refine import refine_manager
+from app.inference import inference_pool
+from app.tracing import span_exporter, start_trace, finish_trace, new_request_id, current_trace
+from app.profiling import (
+    RequestProfiler, save_report, memory_monitor, measure_request_memory, start_memory_tracing
+)
+from app.metrics import (
+    CONTENT_TYPE, http_requests, http_request_duration, in_flight_requests,
+    model_unloads, register_callback_gauge, render_metrics
+)
+
+# Endpoints that run model inference and count towards queue depth
+INFERENCE_PATHS = ("/api/v1/transcribe", "/api/v1/translate")
 
 
 @asynccontextmanager
@@ -26,19 +44,41 @@ async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
     logger.info("SpeechMate Host Server starting...")
+    if API_WORKERS > 1 and config.two_pass.enabled:
+        # Refinement jobs live in the worker that made them; polls reaching another worker would 404
+        raise RuntimeError("two_pass needs a single API worker; disable it or run one worker")
 
     # Initialize database
     init_db()
     logger.info("Database initialized")
+    last_used_writer.start()
+    usage_log_writer.start()
+    retention_worker.start()
+    span_exporter.start()
+    if config.profiling.request_memory:
+        start_memory_tracing()
+    memory_monitor.start()
+    loop_monitor.start()
 
     # Print server info
     logger.info(f"API Server: http://{get_local_ip()}:{config.server.api_port}")
     logger.info(f"Admin API Key: {config.admin_api_key}")
 
+    # Warm up models in the background; /health/ready reports progress
+    start_warmup()
+
     yield
 
     # Shutdown
     logger.info("SpeechMate Host Server shutting down...")
+    refine_manager.stop()
+    inference_pool.shutdown()
+    loop_monitor.stop()
+    memory_monitor.stop()
+    retention_worker.stop()
+    span_exporter.stop()
+    usage_log_writer.stop()
+    last_used_writer.stop()
 
 
 # Create FastAPI app
@@ -59,6 +99,106 @@ app.add_middleware(
 )
 
 
+# Scrape-time gauges for queues owned by other modules
+register_callback_gauge(
+    "speechmate_inference_queue_depth", "Transcribe/translate requests in flight",
+    lambda: readiness.in_flight
+)
+register_callback_gauge(
+    "speechmate_degraded", "1 while short requests are served by the fallback model",
+    lambda: float(degradation_policy.degraded)
+)
+register_callback_gauge(
+    "speechmate_usage_log_queue_depth", "Usage logs waiting to be written",
+    lambda: usage_log_writer.queue_depth
+)
+
+
+def _route_label(request: Request) -> str:
+    """Path with parameter values replaced by their names, to bound label cardinality"""
+    if "route" not in request.scope:
+        return "unmatched"
+    segments = request.url.path.split("/")
+    for name, value in request.scope.get("path_params", {}).items():
+        segments = [f"{{{name}}}" if segment == str(value) else segment for segment in segments]
+    return "/".join(segments)
+
+
+# Per-request cProfile, enabled with X-Profile: 1 plus X-Admin-Key
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if request.headers.get("X-Profile", "") not in ("1", "true") \
+            or request.headers.get("X-Admin-Key") != config.admin_api_key:
+        return await call_next(request)
+
+    with RequestProfiler() as profiler:
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    if not profiler.active:
+        headers["X-Profile-Report"] = "busy"
+        return Response(content=body, status_code=response.status_code, headers=headers)
+
+    trace = current_trace()
+    request_id = trace.request_id if trace else new_request_id()
+    report = profiler.report()
+    headers["X-Profile-Report"] = save_report(f"request-{request_id}.txt", report)
+
+    # Attach the report to JSON object responses
+    if response.headers.get("content-type", "").startswith("application/json"):
+        import json
+        try:
+            data = json.loads(body)
+            if isinstance(data, dict):
+                data["profile"] = {"request_id": request_id, "report": report}
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        except ValueError:
+            pass
+
+    return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+def _request_id(request: Request) -> str:
+    """Reuse a sane client-supplied X-Request-ID, otherwise generate one"""
+    request_id = request.headers.get("X-Request-ID", "")
+    if 0 < len(request_id) <= 64 and all(c.isalnum() or c in "-_." for c in request_id):
+        return request_id
+    return new_request_id()
+
+
+# Request metrics, tracing and in-flight tracking for readiness reporting
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    path = request.url.path
+    is_inference = path in INFERENCE_PATHS
+    in_flight_label = (path if is_inference else "other",)
+
+    trace = start_trace(_request_id(request), f"{request.method} {path}", **{"http.method": request.method, "http.target": path})
+    trace.force_sample = request.headers.get("X-Trace-Sample", "") in ("1", "true")
+
+    start = time.perf_counter()
+    status = 500
+    in_flight_requests.inc(labels=in_flight_label)
+    try:
+        if is_inference:
+            with readiness.track_request(), measure_request_memory():
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        response.headers["X-Request-ID"] = trace.request_id
+        response.headers["Server-Timing"] = trace.server_timing()
+        return response
+    finally:
+        in_flight_requests.dec(labels=in_flight_label)
+        route_path = _route_label(request)
+        http_requests.inc(labels=(route_path, request.method, str(status)))
+        http_request_duration.observe(time.perf_counter() - start, (route_path,))
+        trace.root.attributes["http.route"] = route_path
+        finish_trace(trace, status)
+
+
 # Exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
@@ -80,10 +220,38 @@ async def health_check():
     return {"status": "healthy", "service": "speechmate-api"}
 
 
+@app.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving requests"""
+    return {"status": "alive", "service": "speechmate-api"}
+
+
+@app.get("/health/ready")
+async def health_ready():
+    """Readiness probe: models are loaded and warmed up"""
+    return JSONResponse(
+        status_code=200 if readiness.is_ready else 503,
+        content={
+            "service": "speechmate-api",
+            **readiness.to_dict(),
+            "degradation": degradation_policy.to_dict()
+        }
+    )
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
 # Server info endpoint
 @app.get("/api/v1/info")
 async def server_info():
     """Get server information"""
+    from models.backends import backend_capabilities
+    from app.model_benchmark import benchmark_summary
+
     return {
         "success": True,
         "base_url": get_base_url(),
@@ -93,6 +261,8 @@ async def server_info():
             "compute_type": config.model.asr_compute_type
         },
         "available_models": ASR_MODELS,
+        "asr_backends": backend_capabilities(),
+        "model_benchmarks": benchmark_summary(),
         "admin_api_key": config.admin_api_key
     }
 
@@ -107,18 +277,29 @@ async def update_model_config(
     """Update model configuration"""
     from models.asr_model import unload_model
 
+    if asr_compute_type and asr_compute_type not in COMPUTE_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unknown compute type: {asr_compute_type}")
+
+    model_changed = False
     if asr_model and asr_model in ASR_MODELS:
+        model_unloads.inc(labels=(config.model.asr_model,))
+        memory_monitor.forget(config.model.asr_model)
         config.model.asr_model = asr_model
         unload_model()  # Unload current model
+        degradation_policy.reset()
+        model_changed = True
 
     if asr_device in ["cpu", "cuda"]:
         config.model.asr_device = asr_device
 
-    if asr_compute_type in ["float16", "int8", "int8_float16"]:
+    if asr_compute_type:
         config.model.asr_compute_type = asr_compute_type
 
     save_config()
 
+    if model_changed:
+        start_warmup()  # Load and warm up the new model in the background
+
     return {
         "success": True,
         "config": {
@@ -142,4 +323,8 @@ def run_server():
 
 
 if __name__ == "__main__":
-    run_server()
+    if "--import-profile" in sys.argv:
+        from app.startup_profile import print_import_report
+        print_import_report()
+    else:
+        run_server()
@@ -0,0 +1,318 @@
+"""
+SpeechMate Prometheus Metrics
+"""
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 5.0)
+WER_BUCKETS = (0.0, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """Base for metrics whose updates go to a per-thread shard
+
+    Each thread writes only to its own dict, so the hot path takes no lock.
+    The registration lock is only taken the first time a thread touches
+    the metric, and shards are summed when the metric is scraped.
+    """
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+
+    def _shard(self) -> dict:
+        shard = getattr(self._local, "values", None)
+        if shard is None:
+            shard = self._local.values = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _snapshots(self):
+        with self._shards_lock:
+            shards = list(self._shards)
+        return [shard.copy() for shard in shards]
+
+    def header(self) -> list:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_ShardedMetric):
+    """Monotonically increasing counter"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1.0, labels: Tuple = ()):
+        shard = self._shard()
+        shard[labels] = shard.get(labels, 0.0) + amount
+
+    def collect(self) -> list:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, value in shard.items():
+                totals[labels] = totals.get(labels, 0.0) + value
+        lines = self.header()
+        for labels, value in sorted(totals.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_ShardedMetric):
+    """Bucketed distribution of observed values"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, labels: Tuple = ()):
+        shard = self._shard()
+        state = shard.get(labels)
+        if state is None:
+            # [count per bucket..., +Inf count, sum]
+            state = shard[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    @contextmanager
+    def time(self, labels: Tuple = ()):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, labels)
+
+    def collect(self) -> list:
+        totals = {}
+        for shard in self._snapshots():
+            for labels, state in shard.items():
+                total = totals.setdefault(labels, [0] * (len(self.buckets) + 1) + [0.0])
+                for i, value in enumerate(list(state)):
+                    total[i] += value
+
+        lines = self.header()
+        for labels, state in sorted(totals.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), state[:-1]):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Gauge:
+    """Value that can go up and down, set directly or read from a callback"""
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._function = function
+        self._values = {}
+
+    def set(self, value: float, labels: Tuple = ()):
+        self._values[labels] = value
+
+    def inc(self, amount: float = 1.0, labels: Tuple = ()):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, labels: Tuple = ()):
+        self.inc(-amount, labels)
+
+    def collect(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception:
+                return []
+            if value is None:
+                return []
+            lines.append(f"{self.name} {_format_value(value)}")
+            return lines
+        for labels, value in sorted(self._values.copy().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+# HTTP
+http_requests = registry.register(Counter(
+    "speechmate_http_requests_total", "HTTP requests by route, method and status",
+    ("route", "method", "status")
+))
+http_request_duration = registry.register(Histogram(
+    "speechmate_http_request_duration_seconds", "HTTP request latency by route", ("route",)
+))
+in_flight_requests = registry.register(Gauge(
+    "speechmate_in_flight_requests", "Requests currently being handled", ("route",)
+))
+
+# Event loop
+event_loop_lag = registry.register(Histogram(
+    "speechmate_event_loop_lag_seconds", "Delay between when a loop callback was due and when it ran",
+    buckets=LOOP_LAG_BUCKETS
+))
+event_loop_blocks = registry.register(Counter(
+    "speechmate_event_loop_blocked_total", "Times the event loop was blocked past the threshold, by blocking code site",
+    ("site",)
+))
+
+# Rate limiting: requests, audio, daily_quota, monthly_quota
+rate_limited = registry.register(Counter(
+    "speechmate_rate_limited_total", "Requests rejected with 429 by limit", ("limit",)
+))
+
+# Pipeline stages: auth, upload, decode, vad, asr, translation, db
+stage_duration = registry.register(Histogram(
+    "speechmate_stage_duration_seconds", "Time spent per request processing stage", ("stage",)
+))
+
+# Audio and models
+audio_seconds_processed = registry.register(Counter(
+    "speechmate_audio_seconds_processed_total", "Seconds of audio processed", ("endpoint",)
+))
+real_time_factor = registry.register(Histogram(
+    "speechmate_real_time_factor", "ASR processing time divided by audio duration",
+    ("model",), buckets=RTF_BUCKETS
+))
+vad_removed_seconds = registry.register(Counter(
+    "speechmate_vad_removed_audio_seconds_total", "Seconds of silence removed before ASR", ("endpoint",)
+))
+vad_silent_requests = registry.register(Counter(
+    "speechmate_vad_silent_requests_total", "Requests answered without ASR because no speech was found",
+    ("endpoint",)
+))
+model_loads = registry.register(Counter(
+    "speechmate_model_loads_total", "Model load events", ("model",)
+))
+model_unloads = registry.register(Counter(
+    "speechmate_model_unloads_total", "Model unload events", ("model",)
+))
+degraded_requests = registry.register(Counter(
+    "speechmate_degraded_requests_total", "Requests served by the fallback model under load", ("endpoint", "model")
+))
+refine_latency = registry.register(Histogram(
+    "speechmate_refine_latency_seconds", "Time from the request until its refined result is ready"
+))
+draft_word_error_rate = registry.register(Histogram(
+    "speechmate_draft_word_error_rate", "Word error rate of the draft against the refined transcript",
+    ("draft_model", "refine_model"), buckets=WER_BUCKETS
+))
+model_memory = registry.register(Gauge(
+    "speechmate_model_resident_memory_bytes", "Resident memory attributed to each loaded model", ("model",)
+))
+
+
+@contextmanager
+def time_stage(stage: str):
+    """Record the duration of a processing stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stage_duration.observe(time.perf_counter() - start, (stage,))
+
+
+def record_asr(endpoint: str, model: str, audio_duration: float, asr_seconds: float):
+    """Count processed audio and observe the real-time factor of one ASR run"""
+    audio_seconds_processed.inc(audio_duration, (endpoint,))
+    if audio_duration > 0:
+        real_time_factor.observe(asr_seconds / audio_duration, (model,))
+
+
+def register_callback_gauge(name: str, documentation: str, function: Callable[[], float]):
+    """Expose a value computed at scrape time"""
+    return registry.register(Gauge(name, documentation, function=function))
+
+
+def _register_process_metrics():
+    try:
+        import psutil
+    except ImportError:
+        return
+
+    process = psutil.Process()
+    process.cpu_percent(None)  # Prime the CPU percent counter
+
+    register_callback_gauge(
+        "speechmate_process_resident_memory_bytes", "Resident set size of the API process",
+        lambda: process.memory_info().rss
+    )
+    register_callback_gauge(
+        "speechmate_process_cpu_percent", "CPU usage of the API process since the last scrape",
+        lambda: process.cpu_percent(None)
+    )
+    register_callback_gauge(
+        "speechmate_process_cpu_seconds", "Total user and system CPU time of the API process",
+        lambda: sum(process.cpu_times()[:2])
+    )
+    register_callback_gauge(
+        "speechmate_process_threads", "Threads in the API process",
+        process.num_threads
+    )
+
+
+_register_process_metrics()
+
+
+def render_metrics() -> str:
+    """Render all metrics in the Prometheus text exposition format"""
+    return registry.render()
@@ -0,0 +1,309 @@
+"""
+SpeechMate Model Benchmarks
+"""
+import os
+import re
+import sys
+import json
+import time
+import platform
+import threading
+import statistics
+import subprocess
+from datetime import datetime
+from typing import Optional, List, Tuple, Callable
+
+from loguru import logger
+
+from app.config import config, ASR_MODELS, BASE_DIR, DATA_DIR
+
+BENCHMARK_FILE = DATA_DIR / "model_benchmarks.json"
+
+# Compute types measured by default on each device
+DEFAULT_COMPUTE_TYPES = {
+    "cpu": ("int8", "int8_float16", "float32"),
+    "cuda": ("float16", "int8_float16", "int8")
+}
+
+# Compute type recorded for engines that choose their own precision
+NATIVE_COMPUTE_TYPE = "native"
+
+# Seconds one model/compute type may take, including the load
+MEASUREMENT_TIMEOUT = 1800
+
+_SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def model_size(model_name: str) -> float:
+    """Size of a model in bytes from its ASR_MODELS entry, e.g. "1.5GB" """
+    match = re.match(r"([\d.]+)\s*([KMG]B)", ASR_MODELS.get(model_name, {}).get("size", ""))
+    return float(match.group(1)) * _SIZE_UNITS[match.group(2)] if match else 0.0
+
+
+def machine_info() -> dict:
+    """What measured numbers depend on; results from another machine are stale"""
+    from app.tuning import cpu_budget
+
+    return {
+        "cpus": cpu_budget()["cpus"],
+        "processor": platform.processor() or platform.machine(),
+        "platform": platform.platform(terse=True)
+    }
+
+
+def cached_models(device: str = "cpu") -> List[str]:
+    """ASR models whose engine is installed, runs on device and has the weights on disk"""
+    from models.asr_model import resolve_backend
+    from models.backends import get_backend_class
+
+    names = []
+    for model_name in ASR_MODELS:
+        backend_name, model_id, _ = resolve_backend(model_name, device)
+        backend_class = get_backend_class(backend_name)
+        if device in backend_class.devices and backend_class.is_available() and backend_class.is_cached(model_id):
+            names.append(model_name)
+    return names
+
+
+def benchmark_plan(
+    models: Optional[List[str]] = None,
+    compute_types: Optional[List[str]] = None,
+    device: str = "cpu"
+) -> List[Tuple[str, str]]:
+    """(model, compute type) pairs to measure; every cached model by default"""
+    from models.asr_model import resolve_backend
+    from models.backends import get_backend_class
+
+    compute_types = list(compute_types or DEFAULT_COMPUTE_TYPES.get(device, ("int8",)))
+    plan = []
+    for model_name in models or cached_models(device):
+        if model_name not in ASR_MODELS:
+            raise ValueError(f"Unknown ASR model: {model_name}")
+        supported = get_backend_class(resolve_backend(model_name, device)[0]).compute_types
+        if not supported:
+            plan.append((model_name, NATIVE_COMPUTE_TYPE))
+        else:
+            plan.extend((model_name, compute_type) for compute_type in compute_types if compute_type in supported)
+    return plan
+
+
+def _peak_rss() -> Optional[int]:
+    """Peak resident memory of this process in bytes"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss)
+    except ImportError:
+        return None
+
+
+def measure_model(model_name: str, device: str, compute_type: str, seconds: float, rounds: int) -> dict:
+    """Load a model in this process and time it on a synthetic clip
+
+    Meant to run in a fresh process (see run_measurement) so peak RSS covers
+    only this model.
+    """
+    from app.tuning import cpu_options, create_speech_like_audio
+    from models.asr_model import resolve_backend
+    from models.backends import get_backend_class
+
+    backend_name, model_id, options = resolve_backend(model_name, device)
+    options.update(cpu_options(model_name, device, compute_type))
+    options["vad_filter"] = False  # Decode the whole clip every time
+
+    rss_before = _peak_rss()
+    start = time.perf_counter()
+    model = get_backend_class(backend_name)(model_id, device=device, compute_type=compute_type, **options)
+    model.load()
+    load_time = time.perf_counter() - start
+
+    audio_path = create_speech_like_audio(seconds)
+    try:
+        model.transcribe(audio_path)  # First call allocates buffers
+        latencies = []
+        for _ in range(max(1, rounds)):
+            start = time.perf_counter()
+            model.transcribe(audio_path)
+            latencies.append(time.perf_counter() - start)
+    finally:
+        os.unlink(audio_path)
+        model.unload()
+
+    latency = statistics.median(latencies)
+    return {
+        "model": model_name,
+        "backend": backend_name,
+        "device": device,
+        "compute_type": compute_type,
+        "load_time": round(load_time, 2),
+        "latency_ms": round(latency * 1000, 1),
+        "rtf": round(latency / seconds, 4),
+        "peak_rss_bytes": _peak_rss(),
+        "baseline_rss_bytes": rss_before,
+        "sample_seconds": seconds,
+        "measured_at": datetime.utcnow().isoformat()
+    }
+
+
+def run_measurement(model_name: str, device: str, compute_type: str, seconds: float, rounds: int) -> dict:
+    """Run measure_model in a child process and return its result (or the error)"""
+    command = [
+        sys.executable, "-m", "app.model_benchmark",
+        model_name, device, compute_type, str(seconds), str(rounds)
+    ]
+    try:
+        proc = subprocess.run(
+            command, cwd=str(BASE_DIR), capture_output=True, text=True, timeout=MEASUREMENT_TIMEOUT
+        )
+    except subprocess.TimeoutExpired:
+        return {"model": model_name, "device": device, "compute_type": compute_type,
+                "error": f"Timed out after {MEASUREMENT_TIMEOUT}s"}
+
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode == 0 and lines:
+        return json.loads(lines[-1])
+    error = (proc.stderr.strip().splitlines() or [f"exit code {proc.returncode}"])[-1]
+    return {"model": model_name, "device": device, "compute_type": compute_type, "error": error}
+
+
+def _result_key(result: dict) -> str:
+    return f"{result['model']}/{result['device']}/{result['compute_type']}"
+
+
+def load_benchmarks() -> dict:
+    try:
+        return json.loads(BENCHMARK_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_benchmarks(results: List[dict]):
+    """Merge results into the stored ones; results from another machine are dropped"""
+    machine = machine_info()
+    stored = load_benchmarks()
+    previous = stored.get("results", {}) if stored.get("machine") == machine else {}
+    previous.update({_result_key(result): result for result in results})
+    BENCHMARK_FILE.write_text(json.dumps({
+        "machine": machine,
+        "updated_at": datetime.utcnow().isoformat(),
+        "results": previous
+    }, indent=2), encoding="utf-8")
+
+
+def recommend_model(results: List[dict], slo_ms: float) -> Optional[dict]:
+    """The largest model with a compute type meeting the latency SLO (fastest compute type wins ties)"""
+    meeting = [r for r in results if "error" not in r and r["latency_ms"] <= slo_ms]
+    if not meeting:
+        return None
+    best = max(meeting, key=lambda r: (model_size(r["model"]), -r["latency_ms"]))
+    return {
+        "model": best["model"],
+        "compute_type": best["compute_type"],
+        "latency_ms": best["latency_ms"],
+        "rtf": best["rtf"],
+        "slo_ms": slo_ms
+    }
+
+
+def benchmark_summary(device: str = None, slo_ms: float = None) -> dict:
+    """Stored results for device, whether they match this machine, and the recommendation
+
+    Results measured on other hardware are still listed, but no model is
+    recommended from them.
+    """
+    device = device or config.model.asr_device
+    slo_ms = slo_ms or config.tuning.target_latency_ms
+    stored = load_benchmarks()
+    results = [r for r in stored.get("results", {}).values() if r.get("device") == device]
+    stale = bool(stored) and stored.get("machine") != machine_info()
+    return {
+        "machine": stored.get("machine"),
+        "stale": stale,
+        "updated_at": stored.get("updated_at"),
+        "results": sorted(results, key=lambda r: (model_size(r["model"]), r["compute_type"])),
+        "recommendation": None if stale else recommend_model(results, slo_ms)
+    }
+
+
+def run_benchmarks(
+    models: Optional[List[str]] = None,
+    compute_types: Optional[List[str]] = None,
+    device: str = "cpu",
+    seconds: float = None,
+    rounds: int = None,
+    progress: Optional[Callable[[dict], None]] = None
+) -> List[dict]:
+    """Measure every planned model/compute type one at a time and store the results"""
+    seconds = seconds or config.tuning.sample_seconds
+    rounds = rounds or config.tuning.rounds
+    plan = benchmark_plan(models, compute_types, device)
+    if not plan:
+        raise ValueError(f"No cached models to benchmark on {device}")
+
+    results = []
+    for model_name, compute_type in plan:
+        logger.info(f"Benchmarking {model_name} ({device}, {compute_type})...")
+        result = run_measurement(model_name, device, compute_type, seconds, rounds)
+        results.append(result)
+        if progress:
+            progress(result)
+
+    save_benchmarks(results)
+    return results
+
+
+class ModelBenchmarker:
+    """Runs run_benchmarks in a background thread for the admin endpoints"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = "idle"  # idle, running, done, failed
+        self.progress: List[dict] = []
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, **kwargs) -> bool:
+        """Start a run; returns False if one is already in progress"""
+        with self._lock:
+            if self.running:
+                return False
+            self.status = "running"
+            self.progress = []
+            self.error = None
+            self._thread = threading.Thread(target=self._run, kwargs=kwargs, name="model-benchmark", daemon=True)
+            self._thread.start()
+            return True
+
+    def _run(self, **kwargs):
+        try:
+            run_benchmarks(progress=self.progress.append, **kwargs)
+            self.status = "done"
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Model benchmark failed: {e}")
+
+    def to_dict(self) -> dict:
+        return {"status": self.status, "error": self.error, "progress": self.progress}
+
+
+# Global benchmark runner
+model_benchmarker = ModelBenchmarker()
+
+
+if __name__ == "__main__":
+    # Child process of run_measurement: model device compute_type seconds rounds
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    name, device_arg, compute_type_arg, seconds_arg, rounds_arg = sys.argv[1:6]
+    print(json.dumps(measure_model(name, device_arg, compute_type_arg, float(seconds_arg), int(rounds_arg))))
@@ -0,0 +1,358 @@
+"""
+SpeechMate Live Profiling
+"""
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Dict
+
+from loguru import logger
+
+from app.config import config, LOGS_DIR
+from app.metrics import model_memory
+
+PROFILES_DIR = LOGS_DIR / "profiles"
+
+# Only one sampling profile may run at a time
+_sampling_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Sample the stacks of all other threads every interval for the given time
+
+    Returns a Counter of collapsed stacks (root first, frames joined by ';',
+    prefixed with the thread name) suitable for flamegraph tools.
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        raise RuntimeError("A CPU profile is already running")
+
+    try:
+        own_id = threading.get_ident()
+        stacks = Counter()
+        deadline = time.perf_counter() + seconds
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                frames.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(frames))] += 1
+            time.sleep(interval)
+
+        return stacks
+    finally:
+        _sampling_lock.release()
+
+
+def format_collapsed(stacks: Counter) -> str:
+    """Render stacks in the collapsed format read by flamegraph.pl and speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def cprofile_report(profiler: cProfile.Profile, limit: int = 40, sort: str = "cumulative", extra=()) -> str:
+    """Render the top entries of a cProfile run (merged with the extra runs) as text"""
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    for other in extra:
+        stats.add(other)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def save_report(name: str, content: str) -> str:
+    """Write a profile report under logs/profiles and return the file name"""
+    PROFILES_DIR.mkdir(parents=True, exist_ok=True)
+    path = PROFILES_DIR / name
+    path.write_text(content, encoding="utf-8")
+    return path.name
+
+
+_request_profiler: ContextVar[Optional["RequestProfiler"]] = ContextVar("speechmate_request_profiler", default=None)
+
+
+class RequestProfiler:
+    """cProfile session covering one request handled on the event loop thread
+
+    Only one request can be profiled at a time because cProfile hooks the
+    whole thread; other coroutines running meanwhile show up as well. Work
+    the request hands to inference threads is profiled with profile_call()
+    and merged into the report.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self):
+        self.profiler: Optional[cProfile.Profile] = None
+        self.thread_profiles = []
+        self._token = None
+
+    def __enter__(self):
+        if self._lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self._token = _request_profiler.set(self)
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiler is not None:
+            self.profiler.disable()
+            _request_profiler.reset(self._token)
+            self._lock.release()
+        return False
+
+    @property
+    def active(self) -> bool:
+        return self.profiler is not None
+
+    def profile_call(self, func, *args, **kwargs):
+        """Run func under a profile of its own thread, kept for the report"""
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            self.thread_profiles.append(profiler)
+
+    def report(self, limit: int = 40) -> str:
+        if not self.profiler:
+            return ""
+        return cprofile_report(self.profiler, limit=limit, extra=self.thread_profiles)
+
+
+def current_request_profiler() -> Optional[RequestProfiler]:
+    """The profiler of the request being handled, if it is profiled"""
+    return _request_profiler.get()
+
+
+# Memory
+
+_request_memory: ContextVar[Optional["RequestMemory"]] = ContextVar("speechmate_request_memory", default=None)
+
+
+def start_memory_tracing(frames: Optional[int] = None) -> bool:
+    """Start tracemalloc if it is not running; returns True if it was started"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames or config.profiling.tracemalloc_frames)
+    logger.info(f"tracemalloc started ({tracemalloc.get_traceback_limit()} frames)")
+    return True
+
+
+def _stat_to_dict(stat) -> dict:
+    frame = stat.traceback[0]
+    return {
+        "file": frame.filename,
+        "line": frame.lineno,
+        "size_bytes": stat.size,
+        "count": stat.count,
+        "traceback": [f"{f.filename}:{f.lineno}" for f in stat.traceback] if len(stat.traceback) > 1 else None
+    }
+
+
+def _diff_to_dict(diff) -> dict:
+    entry = _stat_to_dict(diff)
+    entry["size_diff_bytes"] = diff.size_diff
+    entry["count_diff"] = diff.count_diff
+    return entry
+
+
+class MemorySnapshots:
+    """tracemalloc snapshots taken on demand, each diffed against the previous one"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._previous_at: Optional[float] = None
+
+    def take(self, limit: int = 25, group_by: str = "lineno") -> dict:
+        started = start_memory_tracing()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+
+        with self._lock:
+            previous, previous_at = self._previous, self._previous_at
+            self._previous, self._previous_at = snapshot, time.time()
+
+        result = {
+            "tracing_started": started,
+            "traced_current_bytes": current,
+            "traced_peak_bytes": peak,
+            "top": [_stat_to_dict(stat) for stat in snapshot.statistics(group_by)[:limit]],
+            "diff": None,
+            "diff_seconds": None
+        }
+        if previous is not None:
+            result["diff"] = [_diff_to_dict(diff) for diff in snapshot.compare_to(previous, group_by)[:limit]]
+            result["diff_seconds"] = round(time.time() - previous_at, 1)
+        return result
+
+    def reset(self):
+        """Drop the stored snapshot and stop tracing unless requests need it"""
+        with self._lock:
+            self._previous = self._previous_at = None
+        if tracemalloc.is_tracing() and not config.profiling.request_memory:
+            tracemalloc.stop()
+
+
+memory_snapshots = MemorySnapshots()
+
+
+class RequestMemory:
+    """Peak traced memory of one request, above what was allocated when it started
+
+    tracemalloc keeps a single process-wide peak, which is only reset when no
+    other measured request is running. Under concurrency the value is
+    therefore an upper bound that may include other requests' allocations.
+    """
+
+    _lock = threading.Lock()
+    _active = 0
+
+    def __init__(self):
+        self.baseline = 0
+
+    def __enter__(self):
+        with RequestMemory._lock:
+            if RequestMemory._active == 0:
+                tracemalloc.reset_peak()
+            RequestMemory._active += 1
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc_info):
+        with RequestMemory._lock:
+            RequestMemory._active -= 1
+        return False
+
+    @property
+    def peak_bytes(self) -> int:
+        return max(0, tracemalloc.get_traced_memory()[1] - self.baseline)
+
+
+@contextmanager
+def measure_request_memory():
+    """Measure peak memory for the current request when request_memory is enabled"""
+    if not (config.profiling.request_memory and tracemalloc.is_tracing()):
+        yield None
+        return
+    with RequestMemory() as measurement:
+        token = _request_memory.set(measurement)
+        try:
+            yield measurement
+        finally:
+            _request_memory.reset(token)
+
+
+def request_peak_memory() -> Optional[int]:
+    """Peak memory of the current request so far, or None if it is not measured"""
+    measurement = _request_memory.get()
+    return measurement.peak_bytes if measurement else None
+
+
+def _process_rss() -> Optional[int]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except Exception:
+        return None
+
+
+class MemoryMonitor:
+    """Attributes RSS growth to model loads and logs a periodic breakdown
+
+    RSS is measured before and after each model load; the difference is
+    charged to that model until it is unloaded.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._models: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    @contextmanager
+    def track_load(self, model: str):
+        """Charge the RSS growth of the block to model"""
+        before = _process_rss()
+        try:
+            yield
+        finally:
+            after = _process_rss()
+            if before is not None and after is not None:
+                with self._lock:
+                    self._models[model] = self._models.get(model, 0) + max(0, after - before)
+                    model_memory.set(self._models[model], (model,))
+
+    def forget(self, model: str):
+        with self._lock:
+            self._models.pop(model, None)
+            model_memory.set(0, (model,))
+
+    def breakdown(self) -> dict:
+        rss = _process_rss()
+        with self._lock:
+            models = dict(self._models)
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+        other = rss - sum(models.values()) - (traced or 0) if rss is not None else None
+        return {
+            "rss_bytes": rss,
+            "models": models,
+            "python_traced_bytes": traced,
+            "other_bytes": max(0, other) if other is not None else None
+        }
+
+    def _log(self):
+        info = self.breakdown()
+        if info["rss_bytes"] is None:
+            return
+        mb = lambda value: f"{value / 1024 / 1024:.0f}MB"
+        parts = [f"{name}={mb(size)}" for name, size in sorted(info["models"].items())]
+        if info["python_traced_bytes"] is not None:
+            parts.append(f"python={mb(info['python_traced_bytes'])}")
+        parts.append(f"other={mb(info['other_bytes'])}")
+        logger.info(f"RSS {mb(info['rss_bytes'])}: {', '.join(parts)}")
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self._log()
+            except Exception as e:
+                logger.error(f"Memory report failed: {e}")
+
+    def start(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-monitor", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+memory_monitor = MemoryMonitor(interval=config.profiling.memory_report_interval)
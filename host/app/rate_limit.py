@@ -0,0 +1,319 @@
+"""
+SpeechMate Rate Limiting and Quotas
+"""
+import math
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Optional, NamedTuple, Dict, Tuple
+
+from loguru import logger
+
+from app.config import config, API_WORKERS
+from app.metrics import rate_limited
+
+
+class Limited(NamedTuple):
+    """Why a request was rejected and the headers to send with the 429"""
+    detail: str
+    headers: dict
+
+
+class TokenBucket:
+    """Refills at rate tokens per second up to capacity"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+
+    def configure(self, rate: float, capacity: float):
+        if rate != self.rate or capacity != self.capacity:
+            self.rate = rate
+            self.capacity = capacity
+            self.tokens = min(self.tokens, capacity)
+
+    def take(self, cost: float, now: float) -> float:
+        """Take cost tokens; returns 0 on success or the seconds until they are available"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        cost = min(cost, self.capacity)  # Anything larger is let through once the bucket is full
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def give(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def _limit(key_info: dict, name: str) -> float:
+    """Per-key limit, falling back to the config default (0 = unlimited)"""
+    value = key_info.get(name)
+    return getattr(config.rate_limit, name) if value is None else value
+
+
+def _utc_periods(now: datetime) -> Tuple[str, str]:
+    day = now.strftime("%Y-%m-%d")
+    return day, day[:8] + "01"
+
+
+def _seconds_until_next_day(now: datetime) -> int:
+    tomorrow = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return math.ceil((tomorrow - now).total_seconds())
+
+
+def _seconds_until_next_month(now: datetime) -> int:
+    first = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    next_month = (first + timedelta(days=32)).replace(day=1)
+    return math.ceil((next_month - now).total_seconds())
+
+
+class QuotaCounters:
+    """Audio seconds used per key today and this month, kept in memory
+
+    Counters are loaded from usage_daily every sync_interval seconds (and
+    when the UTC day changes), which also picks up usage recorded by other
+    worker processes. Usage charged in this process is added locally and
+    stays pending until the usage log writer has committed it to
+    usage_daily, so a reload counts it exactly once.
+
+    Nothing here touches the database: RateLimiter.sync_quotas() queries
+    the totals and hands them to load().
+    """
+
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._usage: Dict[int, list] = {}  # key id -> [day seconds, month seconds]
+        self._pending: Dict[int, float] = {}  # Seconds charged here that usage_daily does not have yet
+        self._day = None
+        self._month_start = None
+        self._synced_at = None
+        self.in_use = False  # Set once a key with a quota is checked; until then there is nothing to load
+
+    def due(self, day: str, now: float) -> bool:
+        return self.in_use and (
+            self._synced_at is None or day != self._day or now - self._synced_at >= self.sync_interval
+        )
+
+    def load(self, day: str, month_start: str, totals: dict, now: float):
+        """Replace the counters with usage_daily totals plus the charges still pending"""
+        usage = {key_id: [day_seconds, month_seconds] for key_id, (day_seconds, month_seconds) in totals.items()}
+        for key_id, seconds in self._pending.items():
+            counters = usage.setdefault(key_id, [0.0, 0.0])
+            counters[0] += seconds
+            counters[1] += seconds
+        self._usage = usage
+        self._day = day
+        self._month_start = month_start
+        self._synced_at = now
+
+    def _roll_over(self, day: str, month_start: str):
+        """Start a new UTC day (and month) from the pending charges until the next load"""
+        new_month = month_start != self._month_start
+        for key_id, counters in self._usage.items():
+            pending = self._pending.get(key_id, 0.0)
+            counters[0] = pending
+            if new_month:
+                counters[1] = pending
+        self._day = day
+        self._month_start = month_start
+
+    def usage(self, key_id: int, day: str, month_start: str) -> list:
+        self.in_use = True
+        if self._day is not None and day != self._day:
+            self._roll_over(day, month_start)
+        return self._usage.setdefault(key_id, [0.0, 0.0])
+
+    def add(self, key_id: int, seconds: float):
+        counters = self._usage.setdefault(key_id, [0.0, 0.0])
+        counters[0] += seconds
+        counters[1] += seconds
+        self._pending[key_id] = self._pending.get(key_id, 0.0) + seconds
+
+    def flushed(self, key_id: int, seconds: float):
+        """Seconds charged here have been written to usage_daily"""
+        pending = self._pending.get(key_id, 0.0) - seconds
+        if pending > 0:
+            self._pending[key_id] = pending
+        else:
+            self._pending.pop(key_id, None)
+
+    def clear(self):
+        self._usage = {}
+        self._pending = {}
+        self._day = None
+        self._month_start = None
+        self._synced_at = None
+        self.in_use = False
+
+
+class RateLimiter:
+    """Per-key token buckets for requests and audio seconds, plus audio quotas
+
+    Everything is checked against in-memory state, so a check costs a dict
+    lookup and a little arithmetic under a lock. With several API workers
+    each one refills its buckets at an equal share of the configured rates;
+    quotas are shared through usage_daily.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._request_buckets: Dict[int, TokenBucket] = {}
+        self._audio_buckets: Dict[int, TokenBucket] = {}
+        self.quotas = QuotaCounters(config.rate_limit.quota_sync_interval)
+        self._day_number = None
+        self._day_periods = None
+
+    def _periods(self) -> Tuple[str, str]:
+        """Current UTC day and month start, formatted only when the day changes"""
+        wall = time.time()
+        day_number = int(wall // 86400)
+        if day_number != self._day_number:
+            self._day_periods = _utc_periods(datetime.utcfromtimestamp(wall))
+            self._day_number = day_number
+        return self._day_periods
+
+    def _bucket(self, buckets: dict, key_id: int, rate: float, capacity: float, now: float) -> TokenBucket:
+        bucket = buckets.get(key_id)
+        if bucket is None:
+            bucket = buckets[key_id] = TokenBucket(rate, capacity, now)
+        else:
+            bucket.configure(rate, capacity)
+        return bucket
+
+    def check_request(self, key_info: dict) -> Optional[Limited]:
+        """Take one token from the key's request bucket"""
+        if not config.rate_limit.enabled:
+            return None
+        per_minute = _limit(key_info, "requests_per_minute")
+        if not per_minute:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._bucket(
+                self._request_buckets, key_info["id"], per_minute / 60 / API_WORKERS,
+                max(1, config.rate_limit.request_burst / API_WORKERS), now
+            )
+            wait = bucket.take(1, now)
+        if not wait:
+            return None
+
+        rate_limited.inc(labels=("requests",))
+        retry_after = str(math.ceil(wait))
+        return Limited(f"Rate limit exceeded: {per_minute:g} requests per minute", {
+            "Retry-After": retry_after,
+            "X-RateLimit-Limit": f"{per_minute:g}",
+            "X-RateLimit-Remaining": "0",
+            "X-RateLimit-Reset": retry_after
+        })
+
+    def check_audio(self, key_info: dict, seconds: float) -> Optional[Limited]:
+        """Charge seconds of audio against the key's quotas and audio bucket"""
+        if not config.rate_limit.enabled:
+            return None
+        key_id = key_info["id"]
+        daily_quota = _limit(key_info, "daily_audio_quota")
+        monthly_quota = _limit(key_info, "monthly_audio_quota")
+        per_minute = _limit(key_info, "audio_seconds_per_minute")
+
+        now = time.monotonic()
+        day, month_start = self._periods()
+
+        with self._lock:
+            # Keys without quotas never need the stored usage
+            used_day = used_month = 0.0
+            if daily_quota or monthly_quota:
+                used_day, used_month = self.quotas.usage(key_id, day, month_start)
+
+            limit_name = None
+            if daily_quota and used_day + seconds > daily_quota:
+                limit_name, wait = "daily_quota", _seconds_until_next_day(datetime.utcnow())
+                detail = f"Daily audio quota exceeded: {daily_quota:g}s per day"
+            elif monthly_quota and used_month + seconds > monthly_quota:
+                limit_name, wait = "monthly_quota", _seconds_until_next_month(datetime.utcnow())
+                detail = f"Monthly audio quota exceeded: {monthly_quota:g}s per month"
+            elif per_minute:
+                bucket = self._bucket(
+                    self._audio_buckets, key_id, per_minute / 60 / API_WORKERS, per_minute / API_WORKERS, now
+                )
+                wait = bucket.take(seconds, now)
+                if wait:
+                    limit_name = "audio"
+                    detail = f"Audio rate limit exceeded: {per_minute:g} audio seconds per minute"
+
+            if limit_name is None:
+                self.quotas.add(key_id, seconds)
+                return None
+
+        rate_limited.inc(labels=(limit_name,))
+        headers = {"Retry-After": str(math.ceil(wait))}
+        if per_minute:
+            headers["X-RateLimit-Audio-Limit"] = f"{per_minute:g}"
+        if daily_quota:
+            headers["X-Quota-Daily-Limit"] = f"{daily_quota:g}"
+            headers["X-Quota-Daily-Remaining"] = f"{max(0.0, daily_quota - used_day):.1f}"
+        if monthly_quota:
+            headers["X-Quota-Monthly-Limit"] = f"{monthly_quota:g}"
+            headers["X-Quota-Monthly-Remaining"] = f"{max(0.0, monthly_quota - used_month):.1f}"
+        return Limited(detail, headers)
+
+    def refund_audio(self, key_info: dict, seconds: float):
+        """Give back audio charged for a request that failed"""
+        if not seconds:
+            return
+        key_id = key_info["id"]
+        with self._lock:
+            self.quotas.add(key_id, -seconds)
+            bucket = self._audio_buckets.get(key_id)
+            if bucket is not None:
+                bucket.give(seconds)
+
+    def sync_quotas(self, force: bool = False):
+        """Reload quota usage from usage_daily when it is due
+
+        Called from the usage log writer's thread between writes, so the
+        query never runs on the event loop and no commit of this process
+        can land between reading the totals and swapping them in.
+        """
+        if not config.rate_limit.enabled and not force:
+            return
+        now = time.monotonic()
+        with self._lock:
+            day, month_start = self._periods()
+            if not force and not self.quotas.due(day, now):
+                return
+
+        from app.database import get_audio_usage_totals
+        try:
+            totals = get_audio_usage_totals(day, month_start)
+        except Exception as e:
+            logger.error(f"Failed to load quota usage: {e}")
+            totals = None
+
+        with self._lock:
+            if totals is None:
+                self.quotas._synced_at = now  # Keep the local counters and retry later
+            else:
+                self.quotas.load(day, month_start, totals, now)
+
+    def usage_flushed(self, records: list):
+        """Called by the usage log writer once records are committed to usage_daily"""
+        with self._lock:
+            for record in records:
+                if record["audio_duration"]:
+                    self.quotas.flushed(record["api_key_id"], record["audio_duration"])
+
+    def reset(self):
+        with self._lock:
+            self._request_buckets.clear()
+            self._audio_buckets.clear()
+            self.quotas.clear()
+
+
+# Global rate limiter
+rate_limiter = RateLimiter()
@@ -0,0 +1,229 @@
+"""
+SpeechMate Readiness and Warmup
+"""
+import os
+import json
+import math
+import time
+import wave
+import array
+import tempfile
+import threading
+from contextlib import contextmanager
+from importlib.util import find_spec
+from typing import Optional
+
+from loguru import logger
+
+from app.config import config
+from app.profiling import memory_monitor
+
+# Set by the start_server.py supervisor, which waits for this worker's warmup outcome in the file
+READY_FILE = os.environ.get("SPEECHMATE_READY_FILE")
+
+# Language pairs supported by the translate endpoint
+LANGUAGE_PAIRS = [("zh", "en"), ("en", "zh")]
+
+# Sample sentences used to warm up the translation models
+WARMUP_TEXTS = {
+    "zh": "你好，这是一个测试。",
+    "en": "Hello, this is a test."
+}
+
+
+def translation_available() -> bool:
+    """Whether the optional translation dependencies are installed"""
+    return find_spec("transformers") is not None
+
+
+class ReadinessState:
+    """Tracks model warmup progress and in-flight requests"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.status = "starting"  # starting, warming, ready, failed
+        self.asr_model: Optional[str] = None
+        self.warmup_started_at: Optional[float] = None
+        self.warmup_duration: Optional[float] = None
+        self.warmup_steps: dict = {}
+        self.error: Optional[str] = None
+        self.in_flight = 0
+
+    @property
+    def is_ready(self) -> bool:
+        return self.status == "ready"
+
+    @contextmanager
+    def track_request(self):
+        """Count a request as in flight for the duration of the block"""
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "ready": self.is_ready,
+            "asr_model": self.asr_model,
+            "device": config.model.asr_device,
+            "compute_type": config.model.asr_compute_type,
+            "queue_depth": self.in_flight,
+            "warmup_duration": self.warmup_duration,
+            "warmup_steps": self.warmup_steps,
+            "error": self.error
+        }
+
+
+# Global readiness state
+readiness = ReadinessState()
+
+
+def publish_readiness():
+    """Write the readiness state to READY_FILE for the supervisor"""
+    if not READY_FILE:
+        return
+    try:
+        with open(READY_FILE, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), **readiness.to_dict()}, f)
+    except OSError as e:
+        logger.warning(f"Could not write readiness file {READY_FILE}: {e}")
+
+
+def create_warmup_audio(duration: float = 1.0, sample_rate: int = 16000) -> str:
+    """Write a short synthetic tone to a temporary wav file and return its path"""
+    samples = array.array("h", (
+        int(math.sin(2 * math.pi * 440 * i / sample_rate) * 3000)
+        for i in range(int(duration * sample_rate))
+    ))
+
+    tmp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    tmp_path = tmp_file.name
+    tmp_file.close()
+
+    with wave.open(tmp_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+
+    return tmp_path
+
+
+def run_warmup():
+    """Load and exercise every configured model so the first request is fast"""
+    readiness.status = "warming"
+    readiness.asr_model = config.model.asr_model
+    readiness.warmup_started_at = time.time()
+    readiness.warmup_duration = None
+    readiness.warmup_steps = {}
+    readiness.error = None
+
+    logger.info(f"Warming up models (asr: {config.model.asr_model})...")
+    tmp_path = create_warmup_audio()
+
+    try:
+        from models.asr_model import transcribe_audio
+
+        # Tune CPU threads before the first load when this machine has no saved result
+        if config.tuning.autotune_on_start and config.model.asr_device == "cpu":
+            from app.tuning import cpu_tuner, tuned_settings
+            if not tuned_settings(config.model.asr_model, "cpu", config.model.asr_compute_type):
+                step_start = time.time()
+                cpu_tuner.run(model_name=config.model.asr_model, compute_type=config.model.asr_compute_type)
+                readiness.warmup_steps["cpu_tuning"] = round(time.time() - step_start, 3)
+
+        # ASR model, once per source language
+        with memory_monitor.track_load(config.model.asr_model):
+            for lang, _ in LANGUAGE_PAIRS:
+                step_start = time.time()
+                transcribe_audio(
+                    tmp_path,
+                    model_name=config.model.asr_model,
+                    device=config.model.asr_device,
+                    language=lang
+                )
+                readiness.warmup_steps[f"asr_{lang}"] = round(time.time() - step_start, 3)
+
+        # Fallback model for load-adaptive degradation; it is only used once resident
+        fallback = config.degradation.fallback_model
+        if config.degradation.enabled and fallback != config.model.asr_model:
+            step_start = time.time()
+            with memory_monitor.track_load(fallback):
+                transcribe_audio(tmp_path, model_name=fallback, device=config.model.asr_device)
+            readiness.warmup_steps["asr_fallback"] = round(time.time() - step_start, 3)
+
+        # Draft model for two-pass transcription
+        if config.two_pass.enabled:
+            step_start = time.time()
+            with memory_monitor.track_load(config.two_pass.draft_model):
+                transcribe_audio(tmp_path, model_name=config.two_pass.draft_model, device=config.model.asr_device)
+            readiness.warmup_steps["asr_draft"] = round(time.time() - step_start, 3)
+
+        warm_up_translation()
+
+        readiness.status = "ready"
+        logger.info(f"Warmup finished in {time.time() - readiness.warmup_started_at:.2f}s")
+
+    except Exception as e:
+        readiness.status = "failed"
+        readiness.error = str(e)
+        logger.error(f"Warmup failed: {e}")
+
+    finally:
+        readiness.warmup_duration = round(time.time() - readiness.warmup_started_at, 3)
+        publish_readiness()
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+
+
+def warm_up_translation():
+    """Load the translation models, once per language pair
+
+    Translation is optional: without transformers, or when a model fails
+    to load, the step is recorded and the server still becomes ready for
+    transcription.
+    """
+    if not translation_available():
+        for source_lang, target_lang in LANGUAGE_PAIRS:
+            readiness.warmup_steps[f"translate_{source_lang}_{target_lang}"] = "skipped"
+        logger.info("Translation warmup skipped: transformers is not installed")
+        return
+
+    from models.translation_model import translate_text
+
+    for source_lang, target_lang in LANGUAGE_PAIRS:
+        step = f"translate_{source_lang}_{target_lang}"
+        model_name = getattr(config.model, f"translation_model_{source_lang}_{target_lang}")
+        step_start = time.time()
+        try:
+            with memory_monitor.track_load(model_name):
+                translate_text(
+                    WARMUP_TEXTS[source_lang],
+                    source_lang=source_lang,
+                    target_lang=target_lang
+                )
+        except Exception as e:
+            readiness.warmup_steps[step] = "failed"
+            logger.warning(f"Translation warmup for {source_lang}->{target_lang} failed: {e}")
+            continue
+        readiness.warmup_steps[step] = round(time.time() - step_start, 3)
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """Run warmup in a background thread so liveness checks answer immediately"""
+    if not config.server.warmup_enabled:
+        readiness.status = "ready"
+        readiness.asr_model = config.model.asr_model
+        publish_readiness()
+        return None
+
+    readiness.status = "warming"
+    thread = threading.Thread(target=run_warmup, name="model-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,205 @@
+"""
+SpeechMate Two-Pass Refinement
+"""
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List
+
+from loguru import logger
+
+from app.config import config
+from app.metrics import record_asr, refine_latency, draft_word_error_rate
+
+# Languages written without spaces are compared character by character
+CHARACTER_LANGUAGES = ("zh", "ja")
+
+
+def _tokens(text: str, language: Optional[str]) -> List[str]:
+    if language in CHARACTER_LANGUAGES:
+        return [char for char in text if not char.isspace()]
+    return text.lower().split()
+
+
+def word_error_rate(hypothesis: str, reference: str, language: Optional[str] = None) -> float:
+    """Edit distance between the token sequences divided by the reference length"""
+    hyp, ref = _tokens(hypothesis, language), _tokens(reference, language)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_token in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_token in enumerate(hyp, 1):
+            current.append(min(
+                previous[j] + 1,  # Deletion
+                current[j - 1] + 1,  # Insertion
+                previous[j - 1] + (ref_token != hyp_token)  # Substitution
+            ))
+        previous = current
+    return previous[-1] / len(ref)
+
+
+class RefineJob:
+    """A background refinement of one draft transcription"""
+
+    def __init__(self, api_key_id: int, audio_path: str, audio_duration: float,
+                 language: Optional[str], model: str, draft: dict, request_start: float):
+        self.id = uuid.uuid4().hex
+        self.api_key_id = api_key_id
+        self.audio_path = audio_path
+        self.audio_duration = audio_duration
+        self.language = language  # As requested; None lets the refine model detect it
+        self.model = model
+        self.draft = draft
+        self.request_start = request_start
+        self.status = "queued"  # queued, running, done, failed
+        self.segments: List[dict] = []
+        self.text = ""
+        self.draft_wer: Optional[float] = None
+        self.error: Optional[str] = None
+        self.queued_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    @property
+    def text_language(self) -> Optional[str]:
+        return self.language or self.draft.get("language")
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def segments_since(self, index: int) -> List[dict]:
+        with self.lock:
+            return self.segments[index:]
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return self._to_dict()
+
+    def _to_dict(self) -> dict:
+        result = {
+            "id": self.id,
+            "status": self.status,
+            "model": self.model,
+            "draft": self.draft,
+            "text": self.text,
+            "language": self.text_language,
+            "segments": list(self.segments),
+            "error": self.error,
+            "queue_time": round(self.started_at - self.queued_at, 3) if self.started_at else None,
+            "processing_time": None,
+            "latency": None,
+            "draft_word_error_rate": None
+        }
+        if self.status == "done":
+            result["processing_time"] = round(self.finished_at - self.started_at, 3)
+            result["latency"] = round(self.finished_at - self.request_start, 3)
+            result["draft_word_error_rate"] = round(self.draft_wer, 4)
+        return result
+
+
+class RefineManager:
+    """Runs refinements on a small thread pool and keeps results for result_ttl seconds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, RefineJob] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def accepting(self) -> bool:
+        """Whether a new refinement fits in the queue"""
+        self._expire()
+        return self.pending < config.two_pass.max_pending
+
+    def _expire(self):
+        cutoff = time.time() - config.two_pass.result_ttl
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished_at < cutoff]:
+                del self._jobs[job_id]
+
+    def submit(self, api_key_id: int, audio_path: str, audio_duration: float, language: Optional[str],
+               draft: dict, request_start: float) -> RefineJob:
+        """Queue a refinement that takes ownership of audio_path"""
+        job = RefineJob(
+            api_key_id, audio_path, audio_duration, language,
+            config.two_pass.refine_model or config.model.asr_model, draft, request_start
+        )
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=config.two_pass.workers, thread_name_prefix="refine")
+            self._jobs[job.id] = job
+            self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[RefineJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: RefineJob):
+        from models.asr_model import get_asr_model
+
+        with job.lock:
+            job.status = "running"
+            job.started_at = time.time()
+
+        try:
+            model = get_asr_model(job.model, config.model.asr_device)
+            asr_start = time.perf_counter()
+            # Segments are published as they are decoded, for the stream endpoint
+            for segment in model.iter_segments(job.audio_path, job.language):
+                with job.lock:
+                    job.segments.append({"start": segment.start, "end": segment.end, "text": segment.text})
+            record_asr("refine", job.model, job.audio_duration, time.perf_counter() - asr_start)
+
+            joiner = "" if job.text_language in CHARACTER_LANGUAGES else " "
+            text = joiner.join(segment["text"] for segment in job.segments if segment["text"])
+            draft_wer = word_error_rate(job.draft["text"], text, job.text_language)
+            with job.lock:
+                job.text = text
+                job.draft_wer = draft_wer
+                job.finished_at = time.time()
+                job.status = "done"
+
+            refine_latency.observe(job.finished_at - job.request_start)
+            draft_word_error_rate.observe(draft_wer, (job.draft["model"], job.model))
+
+        except Exception as e:
+            logger.error(f"Refinement {job.id} failed: {e}")
+            with job.lock:
+                job.error = str(e)
+                job.finished_at = time.time()
+                job.status = "failed"
+
+        finally:
+            try:
+                os.unlink(job.audio_path)
+            except OSError:
+                pass
+
+    def stop(self):
+        """Cancel queued refinements and wait for running ones"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            for job in self._jobs.values():
+                if not job.finished:
+                    try:
+                        os.unlink(job.audio_path)
+                    except OSError:
+                        pass
+
+
+# Global refinement manager
+refine_manager = RefineManager()
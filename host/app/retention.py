@@ -0,0 +1,308 @@
+"""
+SpeechMate Usage Log Retention and Archive
+"""
+import os
+import gzip
+import json
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional, List, Iterator
+
+from loguru import logger
+
+from app.config import config, DATA_DIR, RETENTION_OWNER_FILE
+from app.database import UsageLog, USAGE_LOG_COLUMNS, get_session, usage_engine
+
+# One gzipped, column-oriented JSON file per day of archived usage logs
+ARCHIVE_DIR = DATA_DIR / "archive" / "usage_logs"
+ARCHIVE_VERSION = 1
+
+ARCHIVE_COLUMNS = USAGE_LOG_COLUMNS
+
+# How often a worker that does not own the retention checks whether it was handed over
+OWNER_CHECK_SECONDS = 60
+
+
+def partition_path(day: str) -> Path:
+    return ARCHIVE_DIR / f"day={day}.columns.json.gz"
+
+
+def archived_days() -> List[str]:
+    """List the days that have an archive partition, oldest first"""
+    if not ARCHIVE_DIR.exists():
+        return []
+    return sorted(
+        path.name[len("day="):-len(".columns.json.gz")]
+        for path in ARCHIVE_DIR.glob("day=*.columns.json.gz")
+    )
+
+
+def read_partition(day: str) -> dict:
+    """Return the columns of one archived day ({} if there is none)"""
+    path = partition_path(day)
+    if not path.exists():
+        return {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)["columns"]
+
+
+def _write_partition(day: str, rows: List[dict]):
+    """Merge a day's rows into its partition, replacing the file atomically"""
+    columns = read_partition(day)
+    if columns:
+        known_ids = set(columns["id"])
+        rows = [row for row in rows if row["id"] not in known_ids]
+        # Partitions written before a column existed get it padded with nulls
+        for name in ARCHIVE_COLUMNS:
+            columns.setdefault(name, [None] * len(columns["id"]))
+    else:
+        columns = {name: [] for name in ARCHIVE_COLUMNS}
+
+    for row in rows:
+        for name in ARCHIVE_COLUMNS:
+            columns.setdefault(name, []).append(row.get(name))
+
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    path = partition_path(day)
+    # A temp file of its own, so an archive run in another process cannot write into it
+    fd, tmp_path = tempfile.mkstemp(dir=ARCHIVE_DIR, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8", compresslevel=9) as f:
+            json.dump({"version": ARCHIVE_VERSION, "day": day, "columns": columns}, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _row_to_dict(row: UsageLog) -> dict:
+    return {
+        "id": row.id,
+        "api_key_id": row.api_key_id,
+        "endpoint": row.endpoint,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "audio_duration": row.audio_duration,
+        "processing_time": row.processing_time,
+        "source_lang": row.source_lang,
+        "target_lang": row.target_lang,
+        "success": row.success,
+        "error_message": row.error_message,
+        "model": row.model,
+        "peak_memory_bytes": row.peak_memory_bytes,
+        "degraded": row.degraded
+    }
+
+
+def archive_usage_logs(
+    retention_days: Optional[int] = None,
+    batch_size: Optional[int] = None,
+    convert_vacuum: bool = False
+) -> dict:
+    """Move usage logs older than retention_days into the archive
+
+    Only whole days are archived, one day at a time: the day's rows are read
+    in batches, its partition is written once, and then the rows are
+    deleted. Merging skips ids already archived, so an interrupted run can
+    simply be repeated. A retention of 0 days disables archiving.
+    """
+    from sqlalchemy import func
+
+    retention_days = retention_days if retention_days is not None else config.database.usage_log_retention_days
+    if retention_days <= 0:
+        return {"archived_rows": 0, "days": [], "cutoff": None, "vacuum_pages": 0}
+    batch_size = batch_size or config.database.retention_batch_size
+    cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=retention_days), datetime.min.time())
+
+    day_column = func.strftime("%Y-%m-%d", UsageLog.timestamp)
+    with get_session() as session:
+        days = [day for (day,) in session.query(day_column).filter(
+            UsageLog.timestamp < cutoff
+        ).distinct().order_by(day_column).all()]
+
+    archived = 0
+    for day in days:
+        day_start = datetime.strptime(day, "%Y-%m-%d")
+        day_end = day_start + timedelta(days=1)
+
+        rows = []
+        while True:
+            with get_session() as session:
+                query = session.query(UsageLog).filter(
+                    UsageLog.timestamp >= day_start, UsageLog.timestamp < day_end
+                )
+                if rows:
+                    query = query.filter(UsageLog.id > rows[-1]["id"])
+                batch = [_row_to_dict(row) for row in query.order_by(UsageLog.id).limit(batch_size).all()]
+            if not batch:
+                break
+            rows.extend(batch)
+
+        _write_partition(day, rows)
+
+        ids = [row["id"] for row in rows]
+        for i in range(0, len(ids), batch_size):
+            with get_session() as session:
+                session.query(UsageLog).filter(
+                    UsageLog.id.in_(ids[i:i + batch_size])
+                ).delete(synchronize_session=False)
+
+        archived += len(ids)
+        logger.info(f"Archived {len(ids)} usage logs from {day} (total {archived})")
+
+    reclaimed = incremental_vacuum(convert=convert_vacuum) if archived else 0
+    return {"archived_rows": archived, "days": days, "cutoff": cutoff.isoformat(), "vacuum_pages": reclaimed}
+
+
+def incremental_vacuum(pages: Optional[int] = None, convert: bool = False) -> int:
+    """Return free pages to the filesystem; returns the number reclaimed
+
+    Databases created before auto_vacuum=INCREMENTAL was enabled need a
+    one-off full VACUUM, which blocks writers while it runs. It is only
+    done with convert (manage.py archive-usage-logs); otherwise they are
+    left alone.
+    """
+    with usage_engine.connect() as conn:
+        conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+        mode = conn.exec_driver_sql("PRAGMA auto_vacuum").scalar()
+        if mode != 2 and not convert:  # 2 = INCREMENTAL
+            return 0
+        before = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        if mode != 2:
+            logger.info("Converting usage database to incremental auto_vacuum (full VACUUM)")
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        else:
+            pages = pages if pages is not None else config.database.vacuum_pages
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({int(pages)})")
+        after = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return before - after
+
+
+def iter_archived_rows(start_day: Optional[str] = None, end_day: Optional[str] = None) -> Iterator[dict]:
+    """Yield archived usage rows for days in [start_day, end_day]"""
+    for day in archived_days():
+        if (start_day is None or day >= start_day) and (end_day is None or day <= end_day):
+            columns = read_partition(day)
+            names = [name for name in ARCHIVE_COLUMNS if name in columns]
+            for values in zip(*(columns[name] for name in names)):
+                yield dict(zip(names, values))
+
+
+def aggregate_usage(
+    start_day: Optional[str] = None,
+    end_day: Optional[str] = None,
+    api_key_id: Optional[int] = None
+) -> List[dict]:
+    """Aggregate usage per (day, api_key_id, endpoint) across SQLite and the archive
+
+    start_day and end_day are inclusive YYYY-MM-DD strings; None leaves
+    that end of the range open.
+    """
+    from sqlalchemy import func, case
+
+    totals = {}
+
+    def add(day, key_id, endpoint, count, audio, processing, failures, degraded):
+        row = totals.setdefault((day, key_id, endpoint), {
+            "day": day, "api_key_id": key_id, "endpoint": endpoint, "request_count": 0,
+            "audio_seconds": 0.0, "processing_seconds": 0.0, "failure_count": 0, "degraded_count": 0
+        })
+        row["request_count"] += count
+        row["audio_seconds"] += audio or 0.0
+        row["processing_seconds"] += processing or 0.0
+        row["failure_count"] += failures or 0
+        row["degraded_count"] += degraded or 0
+
+    # Rows still in SQLite
+    day = func.strftime("%Y-%m-%d", UsageLog.timestamp)
+    with get_session() as session:
+        query = session.query(
+            day.label("day"),
+            UsageLog.api_key_id,
+            UsageLog.endpoint,
+            func.count(),
+            func.sum(UsageLog.audio_duration),
+            func.sum(UsageLog.processing_time),
+            func.sum(case((UsageLog.success == False, 1), else_=0)),
+            func.sum(case((UsageLog.degraded == True, 1), else_=0))
+        )
+        if start_day:
+            query = query.filter(UsageLog.timestamp >= datetime.strptime(start_day, "%Y-%m-%d"))
+        if end_day:
+            query = query.filter(UsageLog.timestamp < datetime.strptime(end_day, "%Y-%m-%d") + timedelta(days=1))
+        if api_key_id is not None:
+            query = query.filter(UsageLog.api_key_id == api_key_id)
+        for row in query.group_by(day, UsageLog.api_key_id, UsageLog.endpoint).all():
+            add(*row)
+
+    # Archived partitions
+    for row in iter_archived_rows(start_day, end_day):
+        if api_key_id is not None and row["api_key_id"] != api_key_id:
+            continue
+        add(
+            row["timestamp"][:10], row["api_key_id"], row["endpoint"], 1,
+            row["audio_duration"], row["processing_time"], 0 if row["success"] else 1,
+            1 if row.get("degraded") else 0
+        )
+
+    return [totals[group] for group in sorted(totals, key=lambda g: (g[0], g[1], g[2]))]
+
+
+def retention_owner() -> bool:
+    """Whether this process runs the usage log retention
+
+    start_server.py writes the PID of the one API worker that does to
+    RETENTION_OWNER_FILE, naming a replacement only after the worker it
+    replaces has exited. A server started without the file always does.
+    """
+    if not RETENTION_OWNER_FILE:
+        return True
+    try:
+        return int(Path(RETENTION_OWNER_FILE).read_text(encoding="utf-8")) == os.getpid()
+    except (OSError, ValueError):
+        return False
+
+
+class RetentionWorker:
+    """Runs archive_usage_logs periodically in a background thread
+
+    With several API workers only the owner runs it (retention_owner).
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        # Give startup and warmup a head start before touching the database
+        delay = min(self.interval, 60)
+        while not self._stop.wait(delay):
+            if not retention_owner():
+                delay = min(self.interval, OWNER_CHECK_SECONDS)
+                continue
+            try:
+                archive_usage_logs()
+            except Exception as e:
+                logger.error(f"Usage log retention failed: {e}")
+            delay = self.interval
+
+    def start(self):
+        if config.database.usage_log_retention_days <= 0:
+            return
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="usage-retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+retention_worker = RetentionWorker(interval=config.database.retention_interval_hours * 3600)
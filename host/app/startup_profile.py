@@ -0,0 +1,81 @@
+"""
+SpeechMate Startup Import Profiler
+"""
+import os
+import re
+import sys
+import subprocess
+from pathlib import Path
+from typing import List
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Startup budget from process start to first accepted connection
+STARTUP_BUDGET = 1.0
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def profile_imports(target: str = "app.main") -> List[dict]:
+    """Import target in a fresh interpreter with -X importtime and parse the timings"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=str(BASE_DIR),
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(BASE_DIR), os.getenv("PYTHONPATH")]))}
+    )
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = match.groups()
+        entries.append({
+            "module": module,
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+            "depth": (len(indent) - 1) // 2
+        })
+
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {target} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    return entries
+
+
+def print_import_report(target: str = "app.main", top: int = 20):
+    """Print a per-module breakdown of startup import time"""
+    entries = profile_imports(target)
+
+    total = next((e["cumulative"] for e in entries if e["module"] == target), 0.0)
+
+    # Self time summed per top-level package
+    packages = {}
+    for entry in entries:
+        name = entry["module"].split(".")[0]
+        packages[name] = packages.get(name, 0.0) + entry["self"]
+
+    print("=" * 60)
+    print(f"  Import profile: {target}")
+    print("=" * 60)
+    print(f"  Total import time: {total * 1000:.1f} ms (budget {STARTUP_BUDGET * 1000:.0f} ms)")
+
+    print("\n  By package:")
+    for name, seconds in sorted(packages.items(), key=lambda x: x[1], reverse=True)[:top]:
+        print(f"    {seconds * 1000:8.1f} ms  {name}")
+
+    print(f"\n  Slowest modules (self time, top {top}):")
+    for entry in sorted(entries, key=lambda e: e["self"], reverse=True)[:top]:
+        print(f"    {entry['self'] * 1000:8.1f} ms  {entry['module']}")
+
+    heavy = [e["module"] for e in entries if e["module"].split(".")[0] in ("torch", "ctranslate2", "faster_whisper", "transformers")]
+    if heavy:
+        print(f"\n  [WARN] Heavy inference modules imported at startup: {sorted({m.split('.')[0] for m in heavy})}")
+
+    status = "OK" if total <= STARTUP_BUDGET else "OVER BUDGET"
+    print(f"\n  Status: {status}")
+    print("=" * 60)
+
+    return total
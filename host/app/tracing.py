@@ -0,0 +1,274 @@
+"""
+SpeechMate Request Tracing
+"""
+import os
+import json
+import time
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional, List
+
+from loguru import logger
+
+from app.config import config, LOGS_DIR
+from app.metrics import stage_duration
+
+TRACES_DIR = LOGS_DIR / "traces"
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("speechmate_trace", default=None)
+_current_span: ContextVar[Optional["Span"]] = ContextVar("speechmate_span", default=None)
+
+
+class Span:
+    """A timed operation within a request"""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name: str, parent_id: Optional[str], attributes: dict):
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration_ms(self) -> float:
+        end_ns = self.end_ns or time.time_ns()
+        return (end_ns - self.start_ns) / 1e6
+
+    def to_otlp(self, trace_id: str) -> dict:
+        span = {
+            "traceId": trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 2 if self.parent_id is None else 1,  # SERVER for the root, INTERNAL otherwise
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [_otlp_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class Trace:
+    """All spans recorded for one request"""
+
+    def __init__(self, request_id: str, name: str, attributes: dict):
+        self.trace_id = os.urandom(16).hex()
+        self.request_id = request_id
+        self.root = Span(name, None, {"request.id": request_id, **attributes})
+        self.spans: List[Span] = [self.root]
+        self.force_sample = False
+
+    def server_timing(self) -> str:
+        """Server-Timing header value for the root's direct children and the total"""
+        entries = [
+            f"{span.name};dur={span.duration_ms:.1f}"
+            for span in self.spans if span.parent_id == self.root.span_id and span.end_ns
+        ]
+        entries.append(f"total;dur={self.root.duration_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_otlp(self) -> dict:
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", "speechmate-api")]},
+                "scopeSpans": [{
+                    "scope": {"name": "speechmate.tracing"},
+                    "spans": [span.to_otlp(self.trace_id) for span in self.spans]
+                }]
+            }]
+        }
+
+
+def _otlp_attribute(key: str, value) -> dict:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def new_request_id() -> str:
+    return os.urandom(8).hex()
+
+
+def start_trace(request_id: str, name: str, **attributes) -> Trace:
+    """Begin a trace for the current request context"""
+    trace = Trace(request_id, name, attributes)
+    _current_trace.set(trace)
+    _current_span.set(trace.root)
+    return trace
+
+
+def finish_trace(trace: Trace, status_code: int):
+    """Close the root span and export the trace if it is sampled"""
+    trace.root.end_ns = time.time_ns()
+    trace.root.attributes["http.status_code"] = status_code
+    if status_code >= 500:
+        trace.root.error = f"HTTP {status_code}"
+
+    if should_sample(trace):
+        span_exporter.submit(trace)
+
+
+def should_sample(trace: Trace) -> bool:
+    """Keep forced, failed, slow and a random fraction of other traces"""
+    settings = config.tracing
+    if not settings.export_enabled:
+        return False
+    if trace.force_sample or trace.root.error:
+        return True
+    if settings.slow_threshold_ms and trace.root.duration_ms >= settings.slow_threshold_ms:
+        return True
+    return random.random() < settings.sample_rate
+
+
+@contextmanager
+def span(name: str, stage: bool = False, **attributes):
+    """Record a span under the current request; stage=True also feeds the stage metric"""
+    trace = _current_trace.get()
+    if trace is None:
+        if not stage:
+            yield None
+            return
+        start = time.perf_counter()
+        try:
+            yield None
+        finally:
+            stage_duration.observe(time.perf_counter() - start, (name,))
+        return
+
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else trace.root.span_id, attributes)
+    trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as e:
+        current.error = str(e)
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        if stage:
+            stage_duration.observe((current.end_ns - current.start_ns) / 1e9, (name,))
+
+
+def prune_trace_files(retention_days: Optional[int] = None) -> int:
+    """Delete daily trace files older than retention_days and return how many"""
+    retention_days = retention_days if retention_days is not None else config.tracing.file_retention_days
+    if retention_days <= 0:
+        return 0
+    cutoff = (datetime.utcnow().date() - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+    removed = 0
+    for path in TRACES_DIR.glob("traces-*.jsonl"):
+        if path.name[len("traces-"):-len(".jsonl")] < cutoff:
+            path.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+class SpanExporter:
+    """Writes sampled traces as OTLP/JSON lines and optionally posts them to a collector"""
+
+    def __init__(self, max_queue: int = 1000):
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop = threading.Event()
+        self._thread = None
+        self.dropped = 0
+        self.file_skipped = 0  # Traces left out of a trace file that reached file_max_mb
+        self._day = None
+        self._day_full = False
+
+    def submit(self, trace: Trace):
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1  # Tracing must never slow down requests
+
+    def _export(self, traces: List[Trace]):
+        payloads = [trace.to_otlp() for trace in traces]
+
+        TRACES_DIR.mkdir(parents=True, exist_ok=True)
+        day = datetime.utcnow().strftime("%Y-%m-%d")
+        if day != self._day:
+            self._day = day
+            self._day_full = False
+            prune_trace_files()
+        path = TRACES_DIR / f"traces-{day}.jsonl"
+        max_bytes = config.tracing.file_max_mb * 1024 * 1024
+        if max_bytes and path.exists() and path.stat().st_size >= max_bytes:
+            if not self._day_full:
+                self._day_full = True
+                logger.warning(f"{path.name} reached {config.tracing.file_max_mb}MB, no more traces written today")
+            self.file_skipped += len(payloads)
+        else:
+            with open(path, "a", encoding="utf-8") as f:
+                for payload in payloads:
+                    f.write(json.dumps(payload, separators=(",", ":")) + "\n")
+
+        endpoint = config.tracing.otlp_endpoint
+        if endpoint:
+            import urllib.request
+            body = json.dumps({"resourceSpans": [rs for p in payloads for rs in p["resourceSpans"]]}).encode("utf-8")
+            request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=2).close()
+            except Exception as e:
+                logger.warning(f"Failed to post traces to {endpoint}: {e}")
+
+    def _drain(self) -> List[Trace]:
+        traces = []
+        while len(traces) < 100:
+            try:
+                traces.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return traces
+
+    def _run(self):
+        while not self._stop.wait(1.0):
+            traces = self._drain()
+            if traces:
+                try:
+                    self._export(traces)
+                except Exception as e:
+                    logger.error(f"Failed to export traces: {e}")
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        while True:
+            traces = self._drain()
+            if not traces:
+                break
+            self._export(traces)
+
+
+span_exporter = SpanExporter()
@@ -0,0 +1,378 @@
+"""
+SpeechMate CPU Thread and Worker Tuning
+"""
+import os
+import json
+import math
+import time
+import wave
+import array
+import tempfile
+import threading
+import statistics
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Tuple
+
+from loguru import logger
+
+from app.config import config, DATA_DIR
+
+TUNING_FILE = DATA_DIR / "cpu_tuning.json"
+
+# Largest num_workers tried; more parallel decodes than this rarely pays off on CPU
+MAX_WORKERS = 4
+
+
+def _cgroup_cpu_quota() -> Optional[float]:
+    """CPUs allowed by the cgroup CPU quota (v2, then v1), or None when unlimited"""
+    try:
+        quota, period = open("/sys/fs/cgroup/cpu.max").read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int(open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us").read())
+        period = int(open("/sys/fs/cgroup/cpu/cpu.cfs_period_us").read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def cpu_budget() -> dict:
+    """Cores on the machine, cores this process may run on, and the cgroup quota
+
+    "cpus" is the number of threads inference can keep busy: the smaller of
+    the affinity mask and the quota (rounded down, at least 1).
+    """
+    cores = os.cpu_count() or 1
+    try:
+        affinity = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        affinity = cores
+    quota = _cgroup_cpu_quota()
+
+    cpus = affinity
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota)))
+    return {"cores": cores, "affinity": affinity, "quota": quota, "cpus": cpus}
+
+
+def candidate_settings(cpus: int) -> List[Tuple[int, int]]:
+    """(cpu_threads, num_workers) pairs that do not oversubscribe cpus
+
+    For each worker count the cores are split evenly, and half of that is
+    tried too, leaving room for the event loop, decoding and translation.
+    """
+    candidates = set()
+    workers = 1
+    while workers <= min(cpus, MAX_WORKERS):
+        threads = max(1, cpus // workers)
+        candidates.add((threads, workers))
+        candidates.add((max(1, threads // 2), workers))
+        workers *= 2
+    return sorted(candidates, key=lambda pair: (pair[1], -pair[0]))
+
+
+def create_speech_like_audio(duration: float, sample_rate: int = 16000) -> str:
+    """Write a voiced, syllable-modulated signal to a temporary wav file
+
+    A plain tone is dropped by VAD and decodes to nothing; harmonics with a
+    gliding pitch and a 4 Hz envelope keep the decoder busy like speech.
+    """
+    samples = array.array("h")
+    for i in range(int(duration * sample_rate)):
+        t = i / sample_rate
+        pitch = 140 + 40 * math.sin(2 * math.pi * 0.7 * t)
+        envelope = max(0.0, math.sin(2 * math.pi * 4 * t)) ** 0.5
+        voice = sum(math.sin(2 * math.pi * pitch * k * t) / k for k in (1, 2, 3, 5))
+        samples.append(int(voice * envelope * 6000))
+
+    tmp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    tmp_path = tmp_file.name
+    tmp_file.close()
+
+    with wave.open(tmp_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+
+    return tmp_path
+
+
+def _tuning_key(model_name: str, device: str, compute_type: str) -> str:
+    return f"{model_name}/{device}/{compute_type}"
+
+
+def load_tuning() -> dict:
+    """Saved results by model/device/compute type"""
+    try:
+        return json.loads(TUNING_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_tuning(result: dict):
+    """Store the best setting of a tuning run, replacing the previous one for that model"""
+    saved = load_tuning()
+    saved[_tuning_key(result["model"], result["device"], result["compute_type"])] = {
+        "cpu_threads": result["best"]["cpu_threads"],
+        "num_workers": result["best"]["num_workers"],
+        "latency_ms": result["best"]["latency_ms"],
+        "throughput": result["best"]["throughput"],
+        "cpus": result["cpu_budget"]["cpus"],
+        "target_latency_ms": result["target_latency_ms"],
+        "tuned_at": result["tuned_at"]
+    }
+    TUNING_FILE.write_text(json.dumps(saved, indent=2), encoding="utf-8")
+
+
+def tuned_settings(model_name: str, device: str, compute_type: str) -> Optional[dict]:
+    """Saved setting for a model, if it was tuned with the CPUs available now"""
+    entry = load_tuning().get(_tuning_key(model_name, device, compute_type))
+    if entry and entry.get("cpus") == cpu_budget()["cpus"]:
+        return entry
+    return None
+
+
+def cpu_options(model_name: str, device: str, compute_type: str) -> dict:
+    """cpu_threads/num_workers for loading a model
+
+    Explicit config values win over the saved tuning result; anything left
+    unset falls back to the ASR_MODELS options and then the engine default.
+    """
+    if device != "cpu":
+        return {}
+
+    options = {}
+    tuned = tuned_settings(model_name, device, compute_type)
+    if tuned:
+        options = {"cpu_threads": tuned["cpu_threads"], "num_workers": tuned["num_workers"]}
+    if config.model.asr_cpu_threads:
+        options["cpu_threads"] = config.model.asr_cpu_threads
+    if config.model.asr_num_workers:
+        options["num_workers"] = config.model.asr_num_workers
+    return options
+
+
+def serving_concurrency(model_name: str, num_workers: int) -> int:
+    """Decodes a model runs at once while serving with num_workers
+
+    The inference pool runs num_workers requests in parallel; two-pass
+    refinement workers decode next to them when they refine with the same
+    model.
+    """
+    two_pass = config.two_pass
+    if two_pass.enabled and (two_pass.refine_model or config.model.asr_model) == model_name:
+        return num_workers + max(0, two_pass.workers)
+    return num_workers
+
+
+def _measure(model, audio_path: str, audio_seconds: float, rounds: int, concurrency: int) -> dict:
+    """Idle latency (clips one at a time) and throughput with concurrency clips in flight"""
+    model.transcribe(audio_path)  # First call allocates buffers
+
+    latencies = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        model.transcribe(audio_path)
+        latencies.append(time.perf_counter() - start)
+
+    clips = rounds * concurrency
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda _: model.transcribe(audio_path), range(clips)))
+    elapsed = time.perf_counter() - start
+
+    latency = statistics.median(latencies)
+    return {
+        "latency_ms": round(latency * 1000, 1),
+        "rtf": round(latency / audio_seconds, 4),
+        "throughput": round(clips * audio_seconds / elapsed, 2)  # Audio seconds per second
+    }
+
+
+def pick_best(results: List[dict], target_latency_ms: float) -> dict:
+    """Highest throughput among settings meeting the latency target, else the lowest latency"""
+    meeting = [r for r in results if r["latency_ms"] <= target_latency_ms]
+    if meeting:
+        return max(meeting, key=lambda r: (r["throughput"], -r["latency_ms"]))
+    return min(results, key=lambda r: r["latency_ms"])
+
+
+def tune_cpu(
+    model_name: str = None,
+    compute_type: str = None,
+    target_latency_ms: float = None,
+    sample_seconds: float = None,
+    rounds: int = None,
+    concurrency: int = None
+) -> dict:
+    """Benchmark thread/worker combinations for a model on the CPU and return the results
+
+    Every candidate loads its own copy of the model next to the one serving
+    requests, so tuning needs memory for two copies and competes for CPU with
+    live traffic; run it on an idle server.
+    """
+    from models.asr_model import resolve_backend
+    from models.backends import get_backend_class
+
+    model_name = model_name or config.model.asr_model
+    compute_type = compute_type or config.model.asr_compute_type
+    target_latency_ms = target_latency_ms or config.tuning.target_latency_ms
+    sample_seconds = sample_seconds or config.tuning.sample_seconds
+    rounds = max(1, rounds or config.tuning.rounds)
+
+    budget = cpu_budget()
+    candidates = candidate_settings(budget["cpus"])
+    concurrency = concurrency or config.tuning.concurrency  # 0: each setting at its own serving concurrency
+
+    backend_name, model_id, options = resolve_backend(model_name, "cpu")
+    backend_class = get_backend_class(backend_name)
+    if "cpu" not in backend_class.devices:
+        raise ValueError(f"ASR backend {backend_name} does not run on the CPU")
+    if not backend_class.is_available():
+        raise RuntimeError(f"ASR backend {backend_name} is not installed")
+    options["vad_filter"] = False  # Decode the whole clip every time
+
+    logger.info(
+        f"Tuning {model_name} ({compute_type}) on {budget['cpus']} CPUs: "
+        f"{len(candidates)} settings, {sample_seconds:g}s clips, concurrency {concurrency or 'num_workers'}"
+    )
+    started = time.time()
+    audio_path = create_speech_like_audio(sample_seconds)
+    results = []
+    try:
+        for cpu_threads, num_workers in candidates:
+            model = backend_class(
+                model_id, device="cpu", compute_type=compute_type,
+                **{**options, "cpu_threads": cpu_threads, "num_workers": num_workers}
+            )
+            model.load()
+            try:
+                in_flight = concurrency or serving_concurrency(model_name, num_workers)
+                measured = _measure(model, audio_path, sample_seconds, rounds, in_flight)
+            finally:
+                model.unload()
+            results.append({
+                "cpu_threads": cpu_threads, "num_workers": num_workers, "concurrency": in_flight, **measured
+            })
+            logger.info(
+                f"  cpu_threads={cpu_threads} num_workers={num_workers}: "
+                f"{measured['latency_ms']}ms, {measured['throughput']} audio s/s"
+            )
+    finally:
+        try:
+            os.unlink(audio_path)
+        except OSError:
+            pass
+
+    best = pick_best(results, target_latency_ms)
+    logger.info(f"Best setting for {model_name}: cpu_threads={best['cpu_threads']} num_workers={best['num_workers']}")
+    return {
+        "model": model_name,
+        "device": "cpu",
+        "compute_type": compute_type,
+        "backend": backend_name,
+        "cpu_budget": budget,
+        "target_latency_ms": target_latency_ms,
+        "sample_seconds": sample_seconds,
+        "concurrency": concurrency or None,  # None: each candidate ran at its own serving concurrency
+        "candidates": results,
+        "best": best,
+        "tuned_at": datetime.utcnow().isoformat(),
+        "duration": round(time.time() - started, 2)
+    }
+
+
+class CPUTuner:
+    """Runs tuning in a background thread, saves the result and reloads the model with it"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self.status = "idle"  # idle, running, done, failed
+        self.last_result: Optional[dict] = None
+        self.error: Optional[str] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self, apply: bool = True, **kwargs) -> dict:
+        """Tune in the calling thread; with apply, save the result and reload the model if it is loaded"""
+        from app.inference import inference_pool
+
+        self.status = "running"
+        self.error = None
+        try:
+            result = tune_cpu(**kwargs)
+            if apply:
+                save_tuning(result)
+                self._reload(result["model"], result["compute_type"])
+                inference_pool.refresh()
+            self.last_result = result
+            self.status = "done"
+            return result
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"CPU tuning failed: {e}")
+            raise
+
+    def start(self, apply: bool = True, **kwargs) -> bool:
+        """Start tuning in the background; returns False if a run is already in progress"""
+        with self._lock:
+            if self.running:
+                return False
+            self.status = "running"
+            self._thread = threading.Thread(
+                target=self._run_quietly, args=(apply,), kwargs=kwargs, name="cpu-tuner", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def _run_quietly(self, apply: bool, **kwargs):
+        try:
+            self.run(apply, **kwargs)
+        except Exception:
+            pass  # Already logged and kept in self.error
+
+    def _reload(self, model_name: str, compute_type: str):
+        """Swap a loaded model for one using the saved settings"""
+        from models.asr_model import get_asr_model, unload_model, loaded_models
+        from app.metrics import model_unloads
+        from app.profiling import memory_monitor
+
+        if (model_name, "cpu", compute_type) not in loaded_models():
+            return
+        model_unloads.inc(labels=(model_name,))
+        memory_monitor.forget(model_name)
+        unload_model(model_name)
+        with memory_monitor.track_load(model_name):
+            get_asr_model(model_name, "cpu", compute_type)
+
+    def to_dict(self) -> dict:
+        model = config.model.asr_model
+        compute_type = config.model.asr_compute_type
+        return {
+            "status": self.status,
+            "error": self.error,
+            "cpu_budget": cpu_budget(),
+            "current": {
+                "model": model,
+                "compute_type": compute_type,
+                **cpu_options(model, config.model.asr_device, compute_type)
+            },
+            "saved": load_tuning(),
+            "last_result": self.last_result
+        }
+
+
+# Global CPU tuner
+cpu_tuner = CPUTuner()
@@ -0,0 +1,147 @@
+"""
+SpeechMate Voice Activity Detection
+"""
+import wave
+import tempfile
+from typing import Optional, NamedTuple, Tuple
+
+import numpy as np
+from loguru import logger
+
+from app.config import config
+from app.metrics import vad_removed_seconds, vad_silent_requests
+
+# Percentile of frame energies taken as the background noise level
+NOISE_PERCENTILE = 10
+
+
+class SpeechAudio(NamedTuple):
+    """Audio to send to ASR after silence removal"""
+    audio_path: str  # Trimmed copy, or the input when too little was removed to rewrite it
+    speech: bool  # False when the clip holds no speech and ASR can be skipped
+    duration: float  # Seconds left for ASR
+    removed: float  # Seconds of silence removed
+
+
+def load_audio(audio_path: str) -> Optional[Tuple[np.ndarray, int]]:
+    """Mono float32 samples and the sample rate, or None for formats that cannot be read here"""
+    try:
+        import soundfile
+        samples, sample_rate = soundfile.read(audio_path, dtype="float32", always_2d=True)
+        return samples.mean(axis=1), sample_rate
+    except ImportError:
+        pass
+    except Exception:
+        return None  # Compressed formats are left to the ASR engine's decoder
+
+    try:
+        with wave.open(audio_path, "rb") as wf:
+            if wf.getsampwidth() != 2:
+                return None
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype="<i2").astype(np.float32) / 32768
+            return samples.reshape(-1, wf.getnchannels()).mean(axis=1), wf.getframerate()
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def frame_energy(samples: np.ndarray, frame_length: int) -> np.ndarray:
+    """Energy in dBFS of each whole frame"""
+    frames = len(samples) // frame_length
+    power = np.square(samples[:frames * frame_length].reshape(frames, frame_length)).mean(axis=1)
+    return 10 * np.log10(power + 1e-10)
+
+
+def _runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end (exclusive) indexes of the runs of True in mask"""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+
+def _merge(starts: np.ndarray, ends: np.ndarray, max_gap: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Join runs separated by at most max_gap"""
+    if len(starts) < 2:
+        return starts, ends
+    split = starts[1:] - ends[:-1] > max_gap
+    return starts[np.concatenate(([True], split))], ends[np.concatenate((split, [True]))]
+
+
+def speech_regions(energy: np.ndarray, frame_ms: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Frame ranges to keep: speech plus padding, with long pauses between them cut out
+
+    A frame is speech when it is louder than both threshold_db and the noise
+    floor plus noise_margin_db. Bursts shorter than min_speech_ms (key
+    clicks) are dropped. Clips with no frame standing out from the noise
+    floor, such as steady background noise, are kept whole for the ASR
+    engine to judge.
+    """
+    settings = config.vad
+    frames = len(energy)
+    empty = np.array([], dtype=np.int64)
+    if not frames or energy.max() <= settings.threshold_db:
+        return empty, empty
+
+    noise = np.percentile(energy, NOISE_PERCENTILE)
+    if energy.max() - noise < settings.noise_margin_db:
+        return np.array([0]), np.array([frames])
+
+    starts, ends = _runs(energy > max(settings.threshold_db, noise + settings.noise_margin_db))
+    long_enough = ends - starts >= settings.min_speech_ms / frame_ms
+    starts, ends = starts[long_enough], ends[long_enough]
+    if not len(starts):
+        return empty, empty
+
+    starts, ends = _merge(starts, ends, int(settings.max_pause_ms / frame_ms))
+    padding = int(settings.padding_ms / frame_ms)
+    return _merge(np.maximum(starts - padding, 0), np.minimum(ends + padding, frames), 0)
+
+
+def _write_wav(samples: np.ndarray, sample_rate: int) -> str:
+    tmp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
+    tmp_path = tmp_file.name
+    tmp_file.close()
+
+    with wave.open(tmp_path, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((np.clip(samples, -1, 1) * 32767).astype("<i2").tobytes())
+
+    return tmp_path
+
+
+def trim_silence(audio_path: str, audio_duration: float, endpoint: str) -> SpeechAudio:
+    """Remove leading, trailing and long internal silence before ASR
+
+    The trimmed audio is written to a new temporary wav file that the caller
+    must delete. Timestamps from ASR on trimmed audio are relative to the
+    trimmed clip.
+    """
+    unchanged = SpeechAudio(audio_path, True, audio_duration, 0.0)
+    if not config.vad.enabled:
+        return unchanged
+
+    loaded = load_audio(audio_path)
+    if loaded is None:
+        return unchanged
+    samples, sample_rate = loaded
+
+    frame_length = max(1, int(sample_rate * config.vad.frame_ms / 1000))
+    starts, ends = speech_regions(frame_energy(samples, frame_length), config.vad.frame_ms)
+
+    if not len(starts):
+        vad_removed_seconds.inc(audio_duration, (endpoint,))
+        vad_silent_requests.inc(labels=(endpoint,))
+        logger.info(f"No speech in {audio_duration:.2f}s of audio, skipping ASR")
+        return SpeechAudio(audio_path, False, 0.0, audio_duration)
+
+    starts, ends = starts * frame_length, ends * frame_length
+    if ends[-1] == len(samples) // frame_length * frame_length:
+        ends[-1] = len(samples)  # Keep the partial frame at the end
+    kept = int((ends - starts).sum())
+    removed = (len(samples) - kept) / sample_rate
+    if removed * 1000 < config.vad.min_saving_ms:
+        return unchanged
+
+    trimmed_path = _write_wav(np.concatenate([samples[s:e] for s, e in zip(starts, ends)]), sample_rate)
+    vad_removed_seconds.inc(removed, (endpoint,))
+    return SpeechAudio(trimmed_path, True, kept / sample_rate, removed)
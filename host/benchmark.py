@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+SpeechMate Host Server - Benchmarks
+Usage: python benchmark.py [--backend fake|real] [--profile cpu-small] [--save-baseline]
+
+Runs the API in-process against a throwaway database, so no server, network
+or (with the fake backend) model files are needed. Results are written as
+JSON and compared against benchmarks/baseline.json.
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Add host directory to path
+HOST_DIR = Path(__file__).parent
+sys.path.insert(0, str(HOST_DIR))
+
+BASELINE_PATH = HOST_DIR / "benchmarks" / "baseline.json"
+RESULTS_DIR = HOST_DIR / "logs" / "benchmarks"
+
+ENDPOINTS = ("transcribe", "translate")
+
+# Metrics where larger is better; every other metric is a latency, size or count
+HIGHER_IS_BETTER = ("_rps", "_hit_rate", "_records_per_batch")
+
+# Changes smaller than this are noise regardless of the relative tolerance
+ABSOLUTE_FLOORS = {"_ms": 5.0, "_kb": 64.0, "_mb": 8.0, "_errors": 0.0}
+
+
+def log(message):
+    """Print log message with timestamp"""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] {message}")
+
+
+def percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def latency_summary(prefix: str, latencies) -> dict:
+    """Mean and percentiles in milliseconds"""
+    return {
+        f"{prefix}_mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        f"{prefix}_p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        f"{prefix}_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        f"{prefix}_p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+    }
+
+
+def parse_server_timing(header: str) -> dict:
+    """Server-Timing header -> {stage: milliseconds}"""
+    stages = {}
+    for entry in filter(None, (part.strip() for part in header.split(","))):
+        name, _, params = entry.partition(";")
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                stages[name] = float(value)
+    return stages
+
+
+def setup_environment(args, workdir: Path):
+    """Point the server at a throwaway database and install the backends
+
+    Must run before app.database is imported, because the engines are
+    created at import time.
+    """
+    from loguru import logger
+    from app.config import config, MODELS_DIR
+
+    logger.remove()
+    logger.add(sys.stderr, level="DEBUG" if args.verbose else "ERROR")
+
+    config.database.db_path = str(workdir / "speechmate.db")
+    config.database.usage_db_path = None
+    config.tracing.export_enabled = False
+    config.profiling.memory_report_interval = 0
+    config.rate_limit.enabled = False
+
+    if args.backend == "fake":
+        from benchmarks.fakes import FakeBackends
+        FakeBackends(args.profile, args.seed).install()
+        return
+
+    try:
+        import models.asr_model  # noqa: F401
+        import models.translation_model  # noqa: F401
+    except ImportError as e:
+        raise SystemExit(f"Real backend unavailable: {e}")
+    if not any(MODELS_DIR.iterdir()):
+        raise SystemExit(f"Real backend unavailable: no models cached in {MODELS_DIR}")
+
+
+async def wait_for_warmup(timeout: float):
+    from app.readiness import readiness
+
+    deadline = time.monotonic() + timeout
+    while not readiness.is_ready:
+        if readiness.status == "failed":
+            raise SystemExit(f"Warmup failed: {readiness.error}")
+        if time.monotonic() > deadline:
+            raise SystemExit(f"Warmup did not finish within {timeout:.0f}s")
+        await asyncio.sleep(0.05)
+
+
+async def run_benchmarks(args, audio: bytes) -> dict:
+    """Run every benchmark against the in-process app and return flat metrics"""
+    import httpx
+    from app.main import app
+    from app.database import get_all_api_keys, api_key_cache, usage_log_writer
+
+    metrics = {}
+
+    async with app.router.lifespan_context(app):
+        await wait_for_warmup(args.warmup_timeout)
+        api_key = get_all_api_keys()[0]["key"]
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+
+            async def call(endpoint: str):
+                data = {"source_lang": "zh", "target_lang": "en"} if endpoint == "translate" else {"language": "en"}
+                start = time.perf_counter()
+                response = await client.post(
+                    f"/api/v1/{endpoint}",
+                    files={"audio": ("benchmark.wav", audio, "audio/wav")},
+                    data=data,
+                    headers={"X-API-Key": api_key}
+                )
+                elapsed = time.perf_counter() - start
+                ok = response.status_code == 200 and response.json().get("success", False)
+                return elapsed, ok, response.headers.get("server-timing", "")
+
+            for endpoint in ENDPOINTS:
+                await call(endpoint)  # First request pays for lazy imports
+
+            hits, misses = api_key_cache.hits, api_key_cache.misses
+
+            # Single-request latency, one request at a time
+            for endpoint in ENDPOINTS:
+                latencies, errors, stages = [], 0, {}
+                for _ in range(args.requests):
+                    elapsed, ok, timing = await call(endpoint)
+                    latencies.append(elapsed)
+                    errors += not ok
+                    for stage, ms in parse_server_timing(timing).items():
+                        stages.setdefault(stage, []).append(ms)
+
+                metrics.update(latency_summary(f"{endpoint}.latency", latencies))
+                metrics[f"{endpoint}.errors"] = errors
+                for stage, values in sorted(stages.items()):
+                    if stage != "total":
+                        metrics[f"{endpoint}.stage_{stage}_ms"] = round(statistics.fmean(values), 2)
+                log(f"{endpoint}: p50 {metrics[f'{endpoint}.latency_p50_ms']:.1f}ms, "
+                    f"p95 {metrics[f'{endpoint}.latency_p95_ms']:.1f}ms, {errors} errors")
+
+            # Throughput at increasing concurrency
+            for concurrency in args.concurrency:
+                total = max(args.requests, concurrency * 4)
+                semaphore = asyncio.Semaphore(concurrency)
+                results = []
+
+                async def limited(index: int):
+                    async with semaphore:
+                        results.append(await call(ENDPOINTS[index % len(ENDPOINTS)]))
+
+                start = time.perf_counter()
+                await asyncio.gather(*(limited(i) for i in range(total)))
+                elapsed = time.perf_counter() - start
+
+                latencies = [result[0] for result in results]
+                prefix = f"throughput.c{concurrency}"
+                metrics[f"{prefix}_rps"] = round(total / elapsed, 2)
+                metrics[f"{prefix}.latency_p95_ms"] = round(percentile(latencies, 0.95) * 1000, 2)
+                metrics[f"{prefix}.errors"] = sum(not result[1] for result in results)
+                log(f"concurrency {concurrency}: {metrics[f'{prefix}_rps']:.1f} req/s, "
+                    f"p95 {metrics[f'{prefix}.latency_p95_ms']:.1f}ms")
+
+            # Peak Python allocations per request (tracemalloc slows requests, so measured separately)
+            tracemalloc.start()
+            try:
+                for endpoint in ENDPOINTS:
+                    peaks = []
+                    for _ in range(args.memory_requests):
+                        tracemalloc.reset_peak()
+                        baseline = tracemalloc.get_traced_memory()[0]
+                        await call(endpoint)
+                        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+                    metrics[f"{endpoint}.peak_memory_kb"] = round(statistics.median(peaks) / 1024, 1)
+                    log(f"{endpoint}: peak memory {metrics[f'{endpoint}.peak_memory_kb']:.0f}KB per request")
+            finally:
+                tracemalloc.stop()
+
+            hits, misses = api_key_cache.hits - hits, api_key_cache.misses - misses
+            metrics["cache.api_key_hit_rate"] = round(hits / max(1, hits + misses), 4)
+
+    # The lifespan has stopped the usage log writer, so every batch is counted
+    metrics["usage_log.records_per_batch"] = round(
+        usage_log_writer.records_written / max(1, usage_log_writer.batches_written), 2
+    )
+    log(f"API key cache hit rate {metrics['cache.api_key_hit_rate']:.1%}, "
+        f"{metrics['usage_log.records_per_batch']:.1f} usage logs per batch")
+
+    try:
+        import psutil
+        metrics["process.rss_mb"] = round(psutil.Process().memory_info().rss / 1024 / 1024, 1)
+    except ImportError:
+        pass
+
+    return metrics
+
+
+def baseline_key(meta: dict) -> str:
+    return f"{meta['backend']}/{meta['profile']}"
+
+
+def compare(metrics: dict, baseline: dict, tolerance: float) -> list:
+    """Return the metrics that got worse than baseline by more than the tolerance"""
+    regressions = []
+    for name, value in metrics.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        worse_by = (base - value) if name.endswith(HIGHER_IS_BETTER) else (value - base)
+        floor = next((f for suffix, f in ABSOLUTE_FLOORS.items() if name.endswith(suffix)), 0.0)
+        if worse_by > max(abs(base) * tolerance, floor):
+            regressions.append({"metric": name, "baseline": base, "current": value})
+    return regressions
+
+
+def print_comparison(metrics: dict, baseline: dict, regressions: list):
+    flagged = {r["metric"] for r in regressions}
+    print(f"\n{'metric':<40}{'baseline':>12}{'current':>12}{'change':>10}")
+    for name, value in metrics.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<40}{'-':>12}{value:>12}{'new':>10}")
+            continue
+        change = f"{(value - base) / base:+.1%}" if base else "-"
+        marker = "  REGRESSION" if name in flagged else ""
+        print(f"{name:<40}{base:>12}{value:>12}{change:>10}{marker}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SpeechMate host benchmarks")
+    parser.add_argument("--backend", choices=("fake", "real"), default="fake",
+                        help="Deterministic fake models, or the real ones from model_cache")
+    parser.add_argument("--profile", default="cpu-small", help="Fake backend latency profile")
+    parser.add_argument("--seed", type=int, default=42, help="Seed for fake backend latency jitter")
+    parser.add_argument("--requests", type=int, default=20, help="Sequential requests per endpoint")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma-separated concurrency levels for the throughput benchmark")
+    parser.add_argument("--memory-requests", type=int, default=5, help="Requests per endpoint traced for memory")
+    parser.add_argument("--audio-seconds", type=float, default=2.0, help="Length of the test audio")
+    parser.add_argument("--warmup-timeout", type=float, default=600, help="Seconds to wait for model warmup")
+    parser.add_argument("--output", default=None, help="Results file (default: logs/benchmarks/<time>.json)")
+    parser.add_argument("--baseline", default=str(BASELINE_PATH), help="Baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    return parser
+
+
+def main():
+    """Main entry point"""
+    args = build_parser().parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+
+    with tempfile.TemporaryDirectory(prefix="speechmate-bench-") as workdir:
+        setup_environment(args, Path(workdir))
+
+        from app.readiness import create_warmup_audio
+        audio_path = create_warmup_audio(duration=args.audio_seconds)
+        audio = Path(audio_path).read_bytes()
+        Path(audio_path).unlink()
+
+        log(f"Benchmarking {args.backend} backend"
+            + (f" ({args.profile} profile)" if args.backend == "fake" else ""))
+        metrics = asyncio.run(run_benchmarks(args, audio))
+
+    meta = {
+        "backend": args.backend,
+        "profile": args.profile if args.backend == "fake" else "real",
+        "seed": args.seed,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "audio_seconds": args.audio_seconds,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": datetime.utcnow().isoformat()
+    }
+    results = {"meta": meta, "metrics": metrics}
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    log(f"Results written to {output}")
+
+    baseline_path = Path(args.baseline)
+    baselines = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+    key = baseline_key(meta)
+
+    if args.save_baseline:
+        baselines[key] = results
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+        log(f"Saved baseline {key} to {baseline_path}")
+        return 0
+
+    if key not in baselines:
+        log(f"No baseline for {key} in {baseline_path}; run with --save-baseline to create one")
+        return 0
+
+    baseline = baselines[key]["metrics"]
+    regressions = compare(metrics, baseline, args.tolerance)
+    print_comparison(metrics, baseline, regressions)
+
+    if regressions:
+        print(f"\n[FAILED] {len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+        return 1
+    print(f"\n[SUCCESS] No regressions against baseline {key}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+SpeechMate Fake ASR Backend (tests and benchmarks only)
+"""
+import time
+import zlib
+from typing import Iterator, Optional
+
+from models.backends import ASRBackend, Segment, Transcription, register_backend
+
+FAKE_SENTENCES = {
+    "zh": ["你好，这是一个测试。", "今天天气很好。", "我们开始开会吧。"],
+    "en": ["Hello, this is a test.", "The weather is nice today.", "Let's start the meeting."],
+}
+
+
+class FakeBackend(ASRBackend):
+    """Deterministic engine for tests: the transcript depends only on the file contents
+
+    Options: latency (seconds per call) and rtf (seconds per audio second)
+    simulate inference time.
+    """
+
+    name = "fake"
+    description = "Deterministic fake engine for tests"
+    streaming = True
+    batching = True
+    word_timestamps = True
+    devices = ("cpu", "cuda")
+
+    def load(self):
+        self.loaded = True
+
+    def unload(self):
+        self.loaded = False
+
+    def _segments(self, audio_path: str, language: Optional[str]):
+        from models.asr_model import get_audio_duration
+
+        with open(audio_path, "rb") as f:
+            digest = zlib.crc32(f.read())
+        language = language or "en"
+        sentences = FAKE_SENTENCES.get(language, FAKE_SENTENCES["en"])
+        duration = get_audio_duration(audio_path)
+
+        delay = self.options.get("latency", 0.0) + self.options.get("rtf", 0.0) * duration
+        if delay:
+            time.sleep(delay)
+
+        count = max(1, min(len(sentences), int(duration // 5) + 1))
+        step = duration / count if duration else 0.0
+        segments = [
+            Segment(round(i * step, 2), round((i + 1) * step, 2), sentences[(digest + i) % len(sentences)])
+            for i in range(count)
+        ]
+        return segments, language
+
+    def transcribe(self, audio_path: str, language: Optional[str] = None,
+                   word_timestamps: bool = False) -> Transcription:
+        segments, language = self._segments(audio_path, language)
+        joiner = "" if language in ("zh", "ja") else " "
+        words = None
+        if word_timestamps:
+            words = []
+            for segment in segments:
+                tokens = list(segment.text) if language in ("zh", "ja") else segment.text.split()
+                span = (segment.end - segment.start) / max(1, len(tokens))
+                words.extend(
+                    {"start": round(segment.start + i * span, 2), "end": round(segment.start + (i + 1) * span, 2), "word": token}
+                    for i, token in enumerate(tokens)
+                )
+        return Transcription(joiner.join(segment.text for segment in segments), language, segments, words)
+
+    def iter_segments(self, audio_path: str, language: Optional[str] = None) -> Iterator[Segment]:
+        segments, _ = self._segments(audio_path, language)
+        yield from segments
+
+
+def install_fake_model(name: str = "fake", **options):
+    """Register the fake backend and an ASR_MODELS entry that uses it
+
+    Never part of the shipped model list; tests and local benchmarks call
+    this in their own process. options (latency, rtf) go to the engine.
+    """
+    from app.config import ASR_MODELS
+
+    register_backend(FakeBackend)
+    ASR_MODELS[name] = {
+        "name": name,
+        "backend": FakeBackend.name,
+        "size": "0MB",
+        "speed": "极快",
+        "accuracy": "无",
+        "description": "确定性的假模型，仅用于测试",
+        "options": options
+    }
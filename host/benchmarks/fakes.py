@@ -0,0 +1,102 @@
+"""
+SpeechMate Benchmark Fake Backends
+"""
+import sys
+import time
+import wave
+import random
+import threading
+import types
+from typing import Optional
+
+# Latency profiles for the fake backends, in seconds.
+# ASR takes asr_base + asr_rtf * audio duration, translation takes
+# mt_base + mt_per_char * len(text); both vary by +/- jitter (a fraction).
+LATENCY_PROFILES = {
+    "instant": {"asr_base": 0.0, "asr_rtf": 0.0, "mt_base": 0.0, "mt_per_char": 0.0, "jitter": 0.0},
+    "cpu-small": {"asr_base": 0.03, "asr_rtf": 0.15, "mt_base": 0.02, "mt_per_char": 0.0005, "jitter": 0.1},
+    "cpu-large": {"asr_base": 0.1, "asr_rtf": 0.6, "mt_base": 0.05, "mt_per_char": 0.001, "jitter": 0.1},
+    "gpu": {"asr_base": 0.02, "asr_rtf": 0.04, "mt_base": 0.01, "mt_per_char": 0.0002, "jitter": 0.05},
+}
+
+FAKE_TRANSCRIPTS = {
+    "zh": "你好，这是一个测试。",
+    "en": "Hello, this is a test."
+}
+
+
+class FakeBackends:
+    """Deterministic stand-ins for models.asr_model and models.translation_model
+
+    Latency comes from a seeded RNG, so a run with the same profile, seed
+    and request order sleeps for the same total time. Sleeping blocks the
+    calling thread exactly like real inference does.
+    """
+
+    def __init__(self, profile: str = "cpu-small", seed: int = 42):
+        if profile not in LATENCY_PROFILES:
+            raise ValueError(f"Unknown latency profile: {profile}")
+        self.profile_name = profile
+        self.profile = LATENCY_PROFILES[profile]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.loaded_model: Optional[str] = None
+        self.asr_calls = 0
+        self.mt_calls = 0
+
+    def _sleep(self, seconds: float) -> float:
+        with self._lock:
+            factor = 1 + self._random.uniform(-1, 1) * self.profile["jitter"]
+        seconds = max(0.0, seconds * factor)
+        if seconds:
+            time.sleep(seconds)
+        return seconds
+
+    # models.asr_model
+
+    def get_audio_duration(self, audio_path: str) -> float:
+        with wave.open(audio_path, "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+
+    def get_asr_model(self, model_name: str = "small", device: str = "cpu", compute_type: str = "int8"):
+        self.loaded_model = model_name
+        return self
+
+    def unload_model(self):
+        self.loaded_model = None
+
+    def transcribe_audio(self, audio_path: str, model_name: str = "small", device: str = "cpu",
+                         language: Optional[str] = None):
+        self.get_asr_model(model_name, device)
+        duration = self.get_audio_duration(audio_path)
+        elapsed = self._sleep(self.profile["asr_base"] + self.profile["asr_rtf"] * duration)
+        self.asr_calls += 1
+        language = language or "en"
+        return FAKE_TRANSCRIPTS.get(language, FAKE_TRANSCRIPTS["en"]), language, elapsed
+
+    # models.translation_model
+
+    def translate_text(self, text: str, source_lang: str = "zh", target_lang: str = "en"):
+        elapsed = self._sleep(self.profile["mt_base"] + self.profile["mt_per_char"] * len(text))
+        self.mt_calls += 1
+        return FAKE_TRANSCRIPTS.get(target_lang, text), elapsed
+
+    def install(self):
+        """Register the fakes as the models package used by the API handlers"""
+        package = types.ModuleType("models")
+        package.__path__ = []
+
+        asr = types.ModuleType("models.asr_model")
+        for name in ("get_audio_duration", "get_asr_model", "unload_model", "transcribe_audio"):
+            setattr(asr, name, getattr(self, name))
+
+        translation = types.ModuleType("models.translation_model")
+        translation.translate_text = self.translate_text
+
+        package.asr_model = asr
+        package.translation_model = translation
+        sys.modules.update({
+            "models": package,
+            "models.asr_model": asr,
+            "models.translation_model": translation
+        })
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+SpeechMate Host Server - Maintenance Commands
+Usage: python manage.py <command> [options]
+"""
+import sys
+import time
+import argparse
+from pathlib import Path
+
+# Add host directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def log(message):
+    """Print log message with timestamp"""
+    timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
+    print(f"[{timestamp}] {message}")
+
+
+def cmd_rebuild_usage_daily(args):
+    """Rebuild the usage_daily rollup table from raw usage logs"""
+    from app.database import init_db, rebuild_usage_daily
+
+    init_db()
+    start = time.time()
+    count = rebuild_usage_daily()
+    log(f"usage_daily rebuilt: {count} rows in {time.time() - start:.2f}s")
+
+
+def cmd_archive_usage_logs(args):
+    """Move old usage logs into the compressed archive and vacuum"""
+    from app.config import config
+    from app.database import init_db
+    from app.retention import archive_usage_logs
+
+    days = args.days if args.days is not None else config.database.usage_log_retention_days
+    if days <= 0:
+        log("Usage log retention is disabled (usage_log_retention_days is 0)")
+        return
+
+    init_db()
+    start = time.time()
+    result = archive_usage_logs(retention_days=days, batch_size=args.batch_size, convert_vacuum=True)
+    log(f"Archived {result['archived_rows']} rows older than {result['cutoff']} "
+        f"({len(result['days'])} days, {result['vacuum_pages']} pages freed) in {time.time() - start:.2f}s")
+
+
+def cmd_usage_report(args):
+    """Print usage totals per day across live and archived logs"""
+    from app.database import init_db
+    from app.retention import aggregate_usage
+
+    init_db()
+    rows = aggregate_usage(args.start, args.end, api_key_id=args.key)
+    print(f"{'day':<12}{'key':>6}  {'endpoint':<12}{'requests':>10}{'audio_s':>12}{'proc_s':>12}{'failed':>8}{'degraded':>10}")
+    for row in rows:
+        print(f"{row['day']:<12}{row['api_key_id']:>6}  {row['endpoint']:<12}{row['request_count']:>10}"
+              f"{row['audio_seconds']:>12.1f}{row['processing_seconds']:>12.1f}{row['failure_count']:>8}{row['degraded_count']:>10}")
+
+
+def cmd_benchmark_models(args):
+    """Measure load time, real-time factor and peak RSS of cached ASR models"""
+    from app.config import config
+    from app.model_benchmark import run_benchmarks, benchmark_summary
+
+    def print_result(result):
+        if "error" in result:
+            log(f"{result['model']:<12}{result['compute_type']:<14}failed: {result['error']}")
+            return
+        log(f"{result['model']:<12}{result['compute_type']:<14}load {result['load_time']:>6.2f}s  "
+            f"latency {result['latency_ms']:>8.1f}ms  RTF {result['rtf']:.3f}  "
+            f"peak RSS {(result['peak_rss_bytes'] or 0) / 1024 / 1024:.0f}MB")
+
+    models = args.models.split(",") if args.models else None
+    compute_types = args.compute_types.split(",") if args.compute_types else None
+    run_benchmarks(models, compute_types, device=args.device, seconds=args.seconds,
+                   rounds=args.rounds, progress=print_result)
+
+    slo_ms = args.slo_ms or config.tuning.target_latency_ms
+    recommendation = benchmark_summary(args.device, slo_ms)["recommendation"]
+    if recommendation:
+        log(f"Recommended for a {slo_ms:g}ms SLO: {recommendation['model']} ({recommendation['compute_type']}, "
+            f"{recommendation['latency_ms']}ms)")
+    else:
+        log(f"No measured model meets a {slo_ms:g}ms SLO")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SpeechMate maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    sub = subparsers.add_parser("rebuild-usage-daily", help=cmd_rebuild_usage_daily.__doc__)
+    sub.set_defaults(func=cmd_rebuild_usage_daily)
+
+    sub = subparsers.add_parser("archive-usage-logs", help=cmd_archive_usage_logs.__doc__)
+    sub.add_argument("--days", type=int, default=None, help="Retention in days (default: config)")
+    sub.add_argument("--batch-size", type=int, default=None, help="Rows per transaction")
+    sub.set_defaults(func=cmd_archive_usage_logs)
+
+    sub = subparsers.add_parser("usage-report", help=cmd_usage_report.__doc__)
+    sub.add_argument("--start", default=None, help="First day (YYYY-MM-DD)")
+    sub.add_argument("--end", default=None, help="Last day (YYYY-MM-DD)")
+    sub.add_argument("--key", type=int, default=None, help="Only this API key id")
+    sub.set_defaults(func=cmd_usage_report)
+
+    sub = subparsers.add_parser("benchmark-models", help=cmd_benchmark_models.__doc__)
+    sub.add_argument("--models", default=None, help="Comma-separated models (default: every cached model)")
+    sub.add_argument("--compute-types", default=None, help="Comma-separated compute types (default: int8,int8_float16,float32 on CPU)")
+    sub.add_argument("--device", default="cpu", choices=["cpu", "cuda"])
+    sub.add_argument("--seconds", type=float, default=None, help="Synthetic clip length (default: config)")
+    sub.add_argument("--rounds", type=int, default=None, help="Timed runs per model (default: config)")
+    sub.add_argument("--slo-ms", type=float, default=None, help="Latency SLO for the recommendation (default: config)")
+    sub.set_defaults(func=cmd_benchmark_models)
+
+    return parser
+
+
+def main():
+    """Main entry point"""
+    args = build_parser().parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
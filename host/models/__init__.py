@@ -0,0 +1,3 @@
+"""
+SpeechMate Models
+"""
@@ -0,0 +1,129 @@
+"""
+SpeechMate ASR Model
+"""
+import time
+import wave
+import threading
+from typing import Optional, Tuple
+
+from loguru import logger
+
+from app.config import config, ASR_MODELS
+from app.metrics import model_loads
+from app.tracing import span
+from app.tuning import cpu_options
+from models.backends import ASRBackend, Transcription, get_backend_class
+
+DEFAULT_BACKEND = "faster-whisper"
+
+# Loaded backends by (model name, device, compute type)
+_models = {}
+_models_lock = threading.Lock()
+
+
+def resolve_backend(model_name: str, device: str) -> Tuple[str, str, dict]:
+    """Pick the backend, engine model id and options for an ASR_MODELS entry
+
+    "backend" is either a backend name or a mapping of device to backend
+    name (with an optional "default"), so each hardware profile can use
+    the fastest engine for that model.
+    """
+    entry = ASR_MODELS.get(model_name, {})
+    backend = entry.get("backend", DEFAULT_BACKEND)
+    if isinstance(backend, dict):
+        backend = backend.get(device) or backend.get("default", DEFAULT_BACKEND)
+    return backend, entry.get("model_id", model_name), dict(entry.get("options", {}))
+
+
+def get_asr_model(model_name: str = None, device: str = None, compute_type: str = None) -> ASRBackend:
+    """Return the loaded backend for a model, loading it on first use"""
+    model_name = model_name or config.model.asr_model
+    device = device or config.model.asr_device
+    compute_type = compute_type or config.model.asr_compute_type
+    key = (model_name, device, compute_type)
+
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _models_lock:
+        model = _models.get(key)
+        if model is not None:
+            return model
+
+        backend_name, model_id, options = resolve_backend(model_name, device)
+        options.update(cpu_options(model_name, device, compute_type))
+        backend_class = get_backend_class(backend_name)
+        if not backend_class.is_available():
+            raise RuntimeError(
+                f"ASR backend {backend_name} for model {model_name} is not installed "
+                f"(needs {', '.join(backend_class.requires)})"
+            )
+
+        threads = "".join(f", {name}={options[name]}" for name in ("cpu_threads", "num_workers") if name in options)
+        logger.info(f"Loading ASR model {model_name} with {backend_name} ({device}, {compute_type}{threads})...")
+        start = time.time()
+        with span("model_load", model=model_name, backend=backend_name):
+            model = backend_class(model_id, device=device, compute_type=compute_type, **options)
+            model.load()
+        model_loads.inc(labels=(model_name,))
+        logger.info(f"ASR model {model_name} loaded in {time.time() - start:.2f}s")
+
+        _models[key] = model
+        return model
+
+
+def unload_model(model_name: Optional[str] = None):
+    """Unload one model (every device/compute type), or all models"""
+    with _models_lock:
+        for key in [key for key in _models if model_name is None or key[0] == model_name]:
+            model = _models.pop(key)
+            try:
+                model.unload()
+            except Exception as e:
+                logger.warning(f"Failed to unload ASR model {key[0]}: {e}")
+            logger.info(f"Unloaded ASR model {key[0]} ({key[1]}, {key[2]})")
+
+    import gc
+    gc.collect()
+
+
+def loaded_models() -> list:
+    """Currently loaded models as (model name, device, compute type)"""
+    return list(_models)
+
+
+def get_audio_duration(audio_path: str) -> float:
+    """Get audio duration in seconds"""
+    try:
+        import soundfile
+        return float(soundfile.info(audio_path).duration)
+    except ImportError:
+        with wave.open(audio_path, "rb") as wf:
+            return wf.getnframes() / wf.getframerate()
+
+
+def transcribe(
+    audio_path: str,
+    model_name: str = None,
+    device: str = None,
+    language: Optional[str] = None,
+    word_timestamps: bool = False
+) -> Transcription:
+    """Transcribe audio with the backend configured for model_name"""
+    model = get_asr_model(model_name, device)
+    if word_timestamps and not model.word_timestamps:
+        word_timestamps = False  # Callers get words=None from engines without them
+    return model.transcribe(audio_path, language=language, word_timestamps=word_timestamps)
+
+
+def transcribe_audio(
+    audio_path: str,
+    model_name: str = None,
+    device: str = None,
+    language: Optional[str] = None
+) -> Tuple[str, str, float]:
+    """Transcribe audio and return (text, detected language, processing seconds)"""
+    start = time.time()
+    result = transcribe(audio_path, model_name=model_name, device=device, language=language)
+    return result.text, result.language, time.time() - start
@@ -0,0 +1,111 @@
+"""
+SpeechMate ASR Backends
+"""
+from abc import ABC, abstractmethod
+from importlib.util import find_spec
+from typing import Dict, Iterator, List, NamedTuple, Optional, Type
+
+
+class Segment(NamedTuple):
+    """A piece of transcribed speech with its position in seconds"""
+    start: float
+    end: float
+    text: str
+
+
+class Transcription(NamedTuple):
+    """Result of transcribing one audio file"""
+    text: str
+    language: str
+    segments: List[Segment] = []
+    words: Optional[list] = None  # [{"start", "end", "word"}] when word timestamps were requested
+
+
+class ASRBackend(ABC):
+    """Base class for speech recognition engines
+
+    Capability flags tell callers what an engine can do:
+    - streaming: iter_segments() yields segments while decoding continues
+    - batching: long audio is decoded as parallel chunks (options["batch_size"])
+    - word_timestamps: transcribe(word_timestamps=True) fills Transcription.words
+    """
+
+    name = ""
+    description = ""
+    streaming = False
+    batching = False
+    word_timestamps = False
+    requires: tuple = ()  # Modules that must be importable
+    devices: tuple = ("cpu",)
+    compute_types: tuple = ()  # Selectable precisions; empty when the engine picks its own
+
+    def __init__(self, model_id: str, device: str = "cpu", compute_type: str = "int8", **options):
+        self.model_id = model_id
+        self.device = device
+        self.compute_type = compute_type
+        self.options = options
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return all(find_spec(module) is not None for module in cls.requires)
+
+    @classmethod
+    def is_cached(cls, model_id: str) -> bool:
+        """Whether the weights for model_id are already on disk"""
+        return False
+
+    @classmethod
+    def capabilities(cls) -> dict:
+        return {
+            "description": cls.description,
+            "available": cls.is_available(),
+            "devices": list(cls.devices),
+            "compute_types": list(cls.compute_types),
+            "streaming": cls.streaming,
+            "batching": cls.batching,
+            "word_timestamps": cls.word_timestamps
+        }
+
+    @abstractmethod
+    def load(self):
+        """Load the model weights (called once before the first transcription)"""
+
+    def unload(self):
+        """Release the model"""
+
+    @abstractmethod
+    def transcribe(self, audio_path: str, language: Optional[str] = None,
+                   word_timestamps: bool = False) -> Transcription:
+        """Transcribe a whole file"""
+
+    def iter_segments(self, audio_path: str, language: Optional[str] = None) -> Iterator[Segment]:
+        """Yield segments as they are decoded; non-streaming engines yield them at the end"""
+        yield from self.transcribe(audio_path, language).segments
+
+
+# Registered backends by name
+BACKENDS: Dict[str, Type[ASRBackend]] = {}
+
+
+def register_backend(cls: Type[ASRBackend]) -> Type[ASRBackend]:
+    """Class decorator adding a backend to the registry"""
+    if cls.__abstractmethods__:
+        raise TypeError(f"ASR backend {cls.__name__} does not implement: "
+                        f"{', '.join(sorted(cls.__abstractmethods__))}")
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def get_backend_class(name: str) -> Type[ASRBackend]:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown ASR backend: {name} (known: {', '.join(sorted(BACKENDS))})")
+    return BACKENDS[name]
+
+
+def backend_capabilities() -> dict:
+    """Capabilities of every registered backend"""
+    return {name: cls.capabilities() for name, cls in sorted(BACKENDS.items())}
+
+
+# Importing the modules registers the backends; engines are imported on load()
+from models.backends import faster_whisper_backend, whisper_cpp_backend  # noqa: E402,F401
@@ -0,0 +1,81 @@
+"""
+SpeechMate faster-whisper Backend
+"""
+from typing import Iterator, Optional
+
+from app.config import MODELS_DIR
+from models.backends import ASRBackend, Segment, Transcription, register_backend
+
+
+@register_backend
+class FasterWhisperBackend(ASRBackend):
+    """Whisper on CTranslate2; the fastest choice on CUDA and good on AVX2 CPUs"""
+
+    name = "faster-whisper"
+    description = "Whisper on CTranslate2 (CPU and CUDA)"
+    streaming = True
+    batching = True
+    word_timestamps = True
+    requires = ("faster_whisper",)
+    devices = ("cpu", "cuda")
+    compute_types = ("int8", "int8_float16", "int8_float32", "int16", "float16", "float32")
+
+    @classmethod
+    def is_cached(cls, model_id: str) -> bool:
+        # Hugging Face hub layout under download_root, e.g. models--Systran--faster-whisper-small
+        pattern = f"models--*--faster-whisper-{model_id}/snapshots/*/model.bin"
+        return any(MODELS_DIR.glob(pattern))
+
+    def load(self):
+        from faster_whisper import WhisperModel
+
+        self.model = WhisperModel(
+            self.model_id,
+            device=self.device,
+            compute_type=self.compute_type,
+            cpu_threads=self.options.get("cpu_threads", 0),
+            num_workers=self.options.get("num_workers", 1),
+            download_root=str(MODELS_DIR)
+        )
+        self.pipeline = self.model
+        if self.options.get("batch_size", 1) > 1:
+            from faster_whisper import BatchedInferencePipeline
+            self.pipeline = BatchedInferencePipeline(model=self.model)
+
+    def unload(self):
+        self.model = self.pipeline = None
+
+    def _transcribe(self, audio_path: str, language: Optional[str], word_timestamps: bool = False):
+        kwargs = {
+            "language": language,
+            "beam_size": self.options.get("beam_size", 5),
+            "vad_filter": self.options.get("vad_filter", True),
+            "word_timestamps": word_timestamps
+        }
+        if self.pipeline is not self.model:
+            kwargs["batch_size"] = self.options["batch_size"]
+        return self.pipeline.transcribe(audio_path, **kwargs)
+
+    def transcribe(self, audio_path: str, language: Optional[str] = None,
+                   word_timestamps: bool = False) -> Transcription:
+        raw_segments, info = self._transcribe(audio_path, language, word_timestamps)
+
+        segments, words = [], [] if word_timestamps else None
+        for segment in raw_segments:
+            segments.append(Segment(segment.start, segment.end, segment.text.strip()))
+            if word_timestamps:
+                words.extend(
+                    {"start": word.start, "end": word.end, "word": word.word.strip()}
+                    for word in segment.words or ()
+                )
+
+        text = " ".join(segment.text for segment in segments if segment.text)
+        if info.language in ("zh", "ja"):
+            text = "".join(segment.text for segment in segments)
+        return Transcription(text, info.language, segments, words)
+
+    def iter_segments(self, audio_path: str, language: Optional[str] = None) -> Iterator[Segment]:
+        # faster-whisper decodes lazily, so segments arrive as they are produced
+        raw_segments, _ = self._transcribe(audio_path, language)
+        for segment in raw_segments:
+            yield Segment(segment.start, segment.end, segment.text.strip())
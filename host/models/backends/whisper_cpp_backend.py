@@ -0,0 +1,53 @@
+"""
+SpeechMate whisper.cpp Backend
+"""
+import os
+from typing import Optional
+
+from app.config import MODELS_DIR
+from models.backends import ASRBackend, Segment, Transcription, register_backend
+
+
+@register_backend
+class WhisperCppBackend(ASRBackend):
+    """Whisper in plain C/C++ (via pywhispercpp) for CPUs without fast CTranslate2 kernels
+
+    Needs no PyTorch or CTranslate2 and has a small memory footprint, which
+    suits low-end and ARM machines.
+    """
+
+    name = "whisper-cpp"
+    description = "whisper.cpp, lightweight CPU engine (ggml models)"
+    requires = ("pywhispercpp",)
+    devices = ("cpu",)
+
+    @classmethod
+    def is_cached(cls, model_id: str) -> bool:
+        return (MODELS_DIR / "whisper-cpp" / f"ggml-{model_id}.bin").exists()
+
+    def load(self):
+        from pywhispercpp.model import Model
+
+        models_dir = MODELS_DIR / "whisper-cpp"
+        models_dir.mkdir(parents=True, exist_ok=True)
+        self.model = Model(
+            self.model_id,
+            models_dir=str(models_dir),
+            n_threads=self.options.get("cpu_threads") or os.cpu_count() or 4,
+            print_realtime=False,
+            print_progress=False
+        )
+
+    def unload(self):
+        self.model = None
+
+    def transcribe(self, audio_path: str, language: Optional[str] = None,
+                   word_timestamps: bool = False) -> Transcription:
+        raw_segments = self.model.transcribe(audio_path, language=language or "auto")
+
+        # whisper.cpp reports times in centiseconds
+        segments = [Segment(s.t0 / 100, s.t1 / 100, s.text.strip()) for s in raw_segments]
+        text = " ".join(segment.text for segment in segments if segment.text)
+        if language in ("zh", "ja"):
+            text = "".join(segment.text for segment in segments)
+        return Transcription(text, language or "auto", segments)
@@ -0,0 +1,77 @@
+"""
+SpeechMate Translation Model
+"""
+import time
+import threading
+from typing import Tuple
+
+from loguru import logger
+
+from app.config import config, MODELS_DIR
+from app.metrics import model_loads
+from app.tracing import span
+
+# Loaded (tokenizer, model) pairs by model name
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model_name(source_lang: str, target_lang: str) -> str:
+    name = getattr(config.model, f"translation_model_{source_lang}_{target_lang}", None)
+    if not name:
+        raise ValueError(f"No translation model for {source_lang}->{target_lang}")
+    return name
+
+
+def get_translation_model(source_lang: str, target_lang: str):
+    """Return the (tokenizer, model) for a language pair, loading it on first use"""
+    model_name = get_model_name(source_lang, target_lang)
+
+    loaded = _models.get(model_name)
+    if loaded is not None:
+        return loaded
+
+    with _models_lock:
+        loaded = _models.get(model_name)
+        if loaded is not None:
+            return loaded
+
+        from transformers import MarianMTModel, MarianTokenizer
+
+        logger.info(f"Loading translation model {model_name}...")
+        start = time.time()
+        with span("model_load", model=model_name):
+            tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=str(MODELS_DIR))
+            model = MarianMTModel.from_pretrained(model_name, cache_dir=str(MODELS_DIR))
+            model.eval()
+        model_loads.inc(labels=(model_name,))
+        logger.info(f"Translation model {model_name} loaded in {time.time() - start:.2f}s")
+
+        _models[model_name] = loaded = (tokenizer, model)
+        return loaded
+
+
+def translate_text(text: str, source_lang: str = "zh", target_lang: str = "en") -> Tuple[str, float]:
+    """Translate text and return (translated text, processing seconds)"""
+    start = time.time()
+    if not text.strip():
+        return "", 0.0
+
+    tokenizer, model = get_translation_model(source_lang, target_lang)
+
+    import torch
+    with torch.inference_mode():
+        inputs = tokenizer([text], return_tensors="pt", padding=True, truncation=True, max_length=512)
+        outputs = model.generate(**inputs, max_new_tokens=512)
+    translated = tokenizer.decode(outputs[0], skip_special_tokens=True)
+
+    return translated, time.time() - start
+
+
+def unload_translation_models():
+    """Unload all translation models"""
+    with _models_lock:
+        _models.clear()
+
+    import gc
+    gc.collect()
@@ -10,6 +10,9 @@ import signal
 import threading
 import time
 import platform
+import json
+import hashlib
+from contextlib import contextmanager
 from pathlib import Path
 
 # Configure HuggingFace mirror for better connectivity (China users)
@@ -24,9 +27,28 @@ BASE_DIR = Path(__file__).parent.absolute()
 VENV_DIR = BASE_DIR / "venv"
 LOGS_DIR = BASE_DIR / "logs"
 PID_FILE = BASE_DIR / "data" / "server.pid"
-
-# Process list for cleanup
-processes = []
+REQUIREMENTS_FILE = BASE_DIR / "requirements.txt"
+DEPS_STAMP = VENV_DIR / ".speechmate-deps.json"  # Fingerprint of the last successful install
+MODEL_CACHE_DIR = BASE_DIR / "model_cache"
+MODEL_MANIFEST = MODEL_CACHE_DIR / "manifest.json"
+DEFAULT_MODEL = "small"
+RUN_DIR = BASE_DIR / "data" / "run"  # Readiness files written by API workers
+RETENTION_FILE = RUN_DIR / "retention.pid"  # The API worker that archives usage logs
+API_HOST = "0.0.0.0"
+API_PORT = 8000
+WEB_PORT = 5000
+READY_TIMEOUT = 600  # Model download and warmup can take several minutes
+STOP_TIMEOUT = 30  # Time a service gets to finish in-flight requests before it is killed
+LISTEN_BACKLOG = 2048
+
+# Child output logs
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUPS = 5
+
+# Crashed services are restarted after 1s, 2s, 4s... up to a minute; running this long resets the delay
+RESTART_BACKOFF_BASE = 1
+RESTART_BACKOFF_MAX = 60
+STABLE_SECONDS = 60
 
 
 def log(message):
@@ -51,6 +73,127 @@ def get_pip_executable():
         return str(VENV_DIR / "bin" / "pip")
 
 
+class StartupReport:
+    """Time spent in each startup phase, printed once the services are up"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.phases = []  # (name, seconds or None when skipped, note)
+
+    @contextmanager
+    def phase(self, name, note=""):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.time() - start, note))
+
+    def skip(self, name, reason):
+        self.phases.append((name, None, reason))
+
+    def add(self, name, seconds, note=""):
+        self.phases.append((name, seconds, note))
+
+    def print(self):
+        print("\n  Startup timing:")
+        for name, seconds, note in self.phases:
+            duration = "skipped" if seconds is None else f"{seconds:.2f}s"
+            print(f"    {name:<14} {duration:>9}  {note}".rstrip())
+        print(f"    {'total':<14} {time.time() - self.started_at:>8.2f}s")
+
+
+report = StartupReport()
+
+
+def file_digest(path):
+    """SHA-256 of a file's contents, or None if it does not exist"""
+    try:
+        return hashlib.sha256(path.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def site_packages_dir():
+    if platform.system() == "Windows":
+        return VENV_DIR / "Lib" / "site-packages"
+    return next(VENV_DIR.glob("lib/python*/site-packages"), VENV_DIR / "lib" / "site-packages")
+
+
+def dependency_fingerprint():
+    """What the installed packages depend on: the requirements, the venv's Python,
+    and the site-packages directory (its mtime changes when packages are added or removed)"""
+    try:
+        site_packages_mtime = site_packages_dir().stat().st_mtime
+    except OSError:
+        site_packages_mtime = None
+    return {
+        "requirements": file_digest(REQUIREMENTS_FILE),
+        "python": file_digest(VENV_DIR / "pyvenv.cfg"),
+        "site_packages_mtime": site_packages_mtime
+    }
+
+
+def read_json(path):
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def dependencies_satisfied():
+    """Whether requirements were installed into this venv and nothing changed since"""
+    return read_json(DEPS_STAMP) == dependency_fingerprint()
+
+
+def model_files(model_name):
+    """Files of a faster-whisper model in the Hugging Face cache layout, with their sizes"""
+    files = {}
+    for snapshot in MODEL_CACHE_DIR.glob(f"models--*--faster-whisper-{model_name}/snapshots/*"):
+        for path in snapshot.iterdir():
+            if path.is_file():
+                files[str(path.relative_to(MODEL_CACHE_DIR))] = path.stat().st_size
+    return files
+
+
+def record_model(model_name):
+    """Add a downloaded model's files to the model_cache manifest"""
+    manifest = read_json(MODEL_MANIFEST) or {}
+    manifest[model_name] = {"files": model_files(model_name), "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    MODEL_MANIFEST.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+
+
+def model_cached(model_name):
+    """Whether the manifest lists the model and its files are all present at the recorded sizes
+
+    A model without a manifest entry that the server already downloaded on
+    its own (it has model.bin) is recorded and counts as cached.
+    """
+    entry = (read_json(MODEL_MANIFEST) or {}).get(model_name)
+    if entry and entry.get("files"):
+        for name, size in entry["files"].items():
+            try:
+                if (MODEL_CACHE_DIR / name).stat().st_size != size:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    if any(name.endswith("model.bin") for name in model_files(model_name)):
+        record_model(model_name)
+        return True
+    return False
+
+
+def plan_startup(skip_models=False):
+    """Setup steps this run needs; satisfied ones are skipped"""
+    venv_exists = VENV_DIR.exists()
+    return {
+        "venv": not venv_exists,
+        "dependencies": not venv_exists or not dependencies_satisfied(),
+        "models": not skip_models and not model_cached(DEFAULT_MODEL)
+    }
+
+
 def create_virtual_environment():
     """Create Python virtual environment"""
     if VENV_DIR.exists():
@@ -62,104 +205,478 @@ def create_virtual_environment():
     log("Virtual environment created")
 
 
-def install_dependencies():
-    """Install required dependencies"""
+def install_dependencies(upgrade_pip=True):
+    """Install required dependencies and remember what they were installed from"""
     log("Installing dependencies...")
     pip_exe = get_pip_executable()
 
     # Upgrade pip first
-    subprocess.run([pip_exe, "install", "--upgrade", "pip"], check=True)
+    if upgrade_pip:
+        subprocess.run([pip_exe, "install", "--upgrade", "pip"], check=True)
 
     # Install requirements
-    requirements_file = BASE_DIR / "requirements.txt"
-    subprocess.run([pip_exe, "install", "-r", str(requirements_file)], check=True)
+    subprocess.run([pip_exe, "install", "-r", str(REQUIREMENTS_FILE)], check=True)
+    DEPS_STAMP.write_text(json.dumps(dependency_fingerprint(), indent=2), encoding="utf-8")
     log("Dependencies installed")
 
 
 def download_models():
-    """Pre-download models (optional)"""
+    """Pre-download models (optional); returns whether the default model is cached"""
     log("Pre-downloading models (this may take a while)...")
 
     python_exe = get_python_executable()
 
-    # Download a small model by default
-    download_script = '''
+    # Download a small model by default (files only; loading it here would only slow startup)
+    download_script = f'''
 import sys
 sys.path.insert(0, ".")
-from faster_whisper import WhisperModel
-print("Downloading faster-whisper-small model...")
-model = WhisperModel("small", device="cpu", compute_type="int8", download_root="./model_cache")
+from faster_whisper import download_model
+print("Downloading faster-whisper-{DEFAULT_MODEL} model...")
+download_model("{DEFAULT_MODEL}", cache_dir="./model_cache")
 print("Model downloaded successfully")
 '''
 
     try:
-        subprocess.run(
+        result = subprocess.run(
             [python_exe, "-c", download_script],
             cwd=str(BASE_DIR),
             timeout=600  # 10 minutes timeout
         )
+        if result.returncode == 0:
+            record_model(DEFAULT_MODEL)
+            return True
+        log("Model download failed - will download on first use")
     except subprocess.TimeoutExpired:
         log("Model download timeout - will download on first use")
     except Exception as e:
         log(f"Model download skipped: {e}")
+    return False
 
 
-def start_api_server():
-    """Start FastAPI server"""
-    log("Starting API server...")
-    python_exe = get_python_executable()
+def download_models_in_background():
+    """Download models while the web admin starts; the API workers wait for the thread"""
+    def run():
+        start = time.time()
+        downloaded = download_models()
+        note = f"downloaded {DEFAULT_MODEL}" if downloaded else "failed, will download on first use"
+        report.add("models", time.time() - start, note)
+
+    thread = threading.Thread(target=run, name="model-download", daemon=True)
+    thread.start()
+    return thread
+
 
-    proc = subprocess.Popen(
-        [python_exe, "-m", "uvicorn", "app.main:app",
-         "--host", "0.0.0.0", "--port", "8000"],
-        cwd=str(BASE_DIR),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT
+def two_pass_enabled():
+    """Whether the saved config turns on two-pass transcription (read with the venv's Python)"""
+    result = subprocess.run(
+        [get_python_executable(), "-c", "from app.config import config; print(config.two_pass.enabled)"],
+        cwd=str(BASE_DIR), capture_output=True, text=True
     )
-    processes.append(proc)
-    log(f"API server started (PID: {proc.pid})")
-    return proc
+    return result.stdout.strip().endswith("True")
 
 
-def start_web_server():
-    """Start Flask web admin server"""
-    log("Starting web admin server...")
+def run_import_profile():
+    """Print a per-module breakdown of API server import time"""
     python_exe = get_python_executable()
+    subprocess.run([python_exe, "-m", "app.main", "--import-profile"], cwd=str(BASE_DIR))
 
-    proc = subprocess.Popen(
-        [python_exe, "-m", "web.app"],
-        cwd=str(BASE_DIR),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.STDOUT
-    )
-    processes.append(proc)
-    log(f"Web admin server started (PID: {proc.pid})")
-    return proc
 
+def child_log(name):
+    """Rotating log file that a child process's output is drained into"""
+    import logging
+    from logging.handlers import RotatingFileHandler
+
+    child_logger = logging.getLogger(f"speechmate.{name}")
+    if not child_logger.handlers:
+        handler = RotatingFileHandler(
+            LOGS_DIR / f"{name}.log", maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8"
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        child_logger.addHandler(handler)
+        child_logger.setLevel(logging.INFO)
+        child_logger.propagate = False
+    return child_logger
+
+
+class ChildProcess:
+    """One supervised service process
+
+    Output is read continuously by a thread so the child never blocks on a
+    full pipe, and written to a rotating log under logs/.
+    """
+
+    def __init__(self, name, command, ready_check, env=None, pass_fds=()):
+        self.name = name
+        self.command = command
+        self.ready_check = ready_check
+        self.env = env
+        self.pass_fds = pass_fds
+        self.proc = None
+        self.started_at = None
+        self.ready = False
+        self.ready_at = None
+        self.stop_deadline = None
+
+    def start(self):
+        self.proc = subprocess.Popen(
+            self.command,
+            cwd=str(BASE_DIR),
+            env={**os.environ, **(self.env or {})},
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            pass_fds=self.pass_fds
+        )
+        self.started_at = time.time()
+        self.ready = False
+        threading.Thread(target=self._drain, args=(self.proc,), name=f"drain-{self.name}", daemon=True).start()
+        log(f"{self.name} started (PID: {self.proc.pid})")
+
+    def _drain(self, proc):
+        output = child_log(self.name)
+        for line in iter(proc.stdout.readline, b""):
+            output.info(line.decode("utf-8", errors="replace").rstrip())
+        proc.stdout.close()
+
+    @property
+    def pid(self):
+        return self.proc.pid if self.proc else None
+
+    def running(self):
+        return self.proc is not None and self.proc.poll() is None
+
+    def check_ready(self):
+        """Probe once; stays True after the first success"""
+        if not self.ready and self.running():
+            try:
+                self.ready = self.ready_check()
+            except Exception:
+                self.ready = False
+            if self.ready:
+                self.ready_at = time.time()
+        return self.ready
+
+    def terminate(self):
+        """Ask the process to finish its requests and exit without waiting; poll stopped()"""
+        if self.running():
+            self.proc.terminate()
+            self.stop_deadline = time.time() + STOP_TIMEOUT
+
+    def stopped(self):
+        """Whether the process has exited, killing it once a terminate() has run out of time"""
+        if self.running():
+            if self.stop_deadline is None or time.time() < self.stop_deadline:
+                return False
+            self.proc.kill()
+            self.proc.wait()
+            log(f"{self.name} killed (PID: {self.proc.pid})")
+        elif self.stop_deadline is not None:
+            log(f"{self.name} stopped (PID: {self.proc.pid})")
+        self.stop_deadline = None
+        return True
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        """Ask the process to finish its requests and exit, killing it after timeout"""
+        if not self.running():
+            return
+        try:
+            self.proc.terminate()
+            self.proc.wait(timeout=timeout)
+            log(f"{self.name} stopped (PID: {self.proc.pid})")
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            self.proc.wait()
+            log(f"{self.name} killed (PID: {self.proc.pid})")
+
+
+def wait_until_ready(children, timeout=READY_TIMEOUT):
+    """Probe starting children together until each is ready, has exited, or timeout passes"""
+    deadline = time.time() + timeout
+    pending = list(children)
+    while pending and time.time() < deadline:
+        for child in list(pending):
+            if child.check_ready():
+                log(f"{child.name} ready in {time.time() - child.started_at:.1f}s")
+                pending.remove(child)
+            elif not child.running():
+                log(f"{child.name} exited during startup (code {child.proc.returncode}), see logs/{child.name}.log")
+                pending.remove(child)
+        time.sleep(0.5)
+
+    for child in pending:
+        log(f"{child.name} not ready after {timeout}s - continuing anyway")
+    return all(child.ready for child in children)
+
+
+def read_ready_file(path):
+    """Whether an API worker has finished warmup (a failed warmup still serves, loading models on use)"""
+    try:
+        status = json.loads(path.read_text(encoding="utf-8")).get("status")
+    except (OSError, ValueError):
+        return False
+    if status == "failed":
+        log("API worker warmup failed - models will load on first use")
+    return status in ("ready", "failed")
+
+
+def port_open(port):
+    """Whether something accepts connections on a local port"""
+    import socket
+
+    with socket.create_connection(("127.0.0.1", port), timeout=1):
+        return True
 
-def save_pids():
-    """Save process PIDs to file"""
-    PID_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(PID_FILE, "w") as f:
-        for proc in processes:
-            f.write(f"{proc.pid}\n")
+
+def listen_socket(host, port):
+    """Bind the API port once so every worker accepts from the same socket"""
+    import socket
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    """Starts the API workers and the web admin, restarts them when they crash and on SIGHUP
+
+    On POSIX the supervisor owns the API listening socket and workers serve
+    it with uvicorn --fd, so a replacement worker can come up next to the
+    one it replaces. Windows cannot pass sockets to children and runs a
+    single worker that binds the port itself.
+    """
+
+    def __init__(self, api_workers=1):
+        self.shared_socket = platform.system() != "Windows"
+        if not self.shared_socket and api_workers > 1:
+            log("Multiple API workers need a shared socket, which Windows does not support - using 1")
+            api_workers = 1
+        self.api_workers = api_workers
+        self.socket = None
+        self.children = []
+        self.failures = {}  # Consecutive quick crashes by child name
+        self.restart_at = {}  # When a crashed child is due to be started again
+        self.generation = 0
+        self.stopping = False
+        self.restart_requested = False
+        self.rollout = None  # Names still to replace in a rolling restart, None when there is none
+        self.rollout_step = None  # The replacement in progress
+        self.retiring = []  # Replacements given up on, polled until they exit
+
+    def api_worker(self, index):
+        """A new API worker process for slot index"""
+        self.generation += 1
+        ready_file = RUN_DIR / f"api-{index}.{self.generation}.json"
+        python_exe = get_python_executable()
+        if self.shared_socket:
+            fd = self.socket.fileno()
+            command = [python_exe, "-m", "uvicorn", "app.main:app", "--fd", str(fd)]
+            pass_fds = (fd,)
+        else:
+            command = [python_exe, "-m", "uvicorn", "app.main:app", "--host", API_HOST, "--port", str(API_PORT)]
+            pass_fds = ()
+        env = {
+            "SPEECHMATE_READY_FILE": str(ready_file),
+            "SPEECHMATE_API_WORKERS": str(self.api_workers)
+        }
+        if self.shared_socket:
+            # Workers can overlap during a rolling restart; only the one named in the file archives usage logs
+            env["SPEECHMATE_RETENTION_FILE"] = str(RETENTION_FILE)
+        return ChildProcess(
+            f"api-{index}", command, lambda: read_ready_file(ready_file), env=env, pass_fds=pass_fds
+        )
+
+    def web_server(self):
+        return ChildProcess("web", [get_python_executable(), "-m", "web.app"], lambda: port_open(WEB_PORT))
+
+    def new_child(self, name):
+        if name == "web":
+            return self.web_server()
+        return self.api_worker(int(name.split("-")[1]))
+
+    def start(self, prerequisite=None):
+        """Start every service at once and wait for all of them to be ready
+
+        The web admin starts first; API workers wait for prerequisite (a
+        thread, such as the model download) to finish.
+        """
+        RUN_DIR.mkdir(parents=True, exist_ok=True)
+        for stale in RUN_DIR.glob("api-*.json"):
+            stale.unlink()
+        if self.shared_socket:
+            self.socket = listen_socket(API_HOST, API_PORT)
+
+        web = self.web_server()
+        web.start()
+        if prerequisite is not None:
+            prerequisite.join()
+        self.children = [self.api_worker(i) for i in range(1, self.api_workers + 1)] + [web]
+        for child in self.children[:-1]:
+            child.start()
+        self.save_pids()
+        self.save_retention_owner()
+
+        ready = wait_until_ready(self.children)
+        for child in self.children:
+            if child.ready:
+                report.add(child.name, child.ready_at - child.started_at, "until ready")
+        return ready
+
+    def save_pids(self):
+        """Supervisor first, so stop_server.py stops it before it can restart the children"""
+        PID_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(PID_FILE, "w") as f:
+            f.write(f"{os.getpid()}\n")
+            for child in self.children:
+                if child.pid:
+                    f.write(f"{child.pid}\n")
+
+    def save_retention_owner(self):
+        """Name the API worker in slot 1 as the one that archives usage logs
+
+        Only called once the worker it replaced has exited, so two processes
+        never archive (and delete) the same day at once.
+        """
+        owner = next((c for c in self.children if c.name == "api-1"), None)
+        RETENTION_FILE.write_text(f"{owner.pid}\n" if owner and owner.pid else "")
+
+    def child(self, name):
+        return next(c for c in self.children if c.name == name)
+
+    def replace(self, old, new):
+        """Put new in the slot of old, which must have exited"""
+        self.children[self.children.index(old)] = new
+        self.restart_at.pop(old.name, None)
+        self.save_pids()
+        self.save_retention_owner()
+
+    def check_children(self):
+        """Restart children that exited, backing off while they keep crashing"""
+        now = time.time()
+        draining = self.rollout_step["old"] if self.rollout_step and self.rollout_step["phase"] == "draining" else None
+        for child in list(self.children):
+            if child is draining:
+                continue  # Stopped on purpose; the rolling restart replaces it once it has exited
+            if child.running():
+                child.check_ready()
+                if now - child.started_at > STABLE_SECONDS:
+                    self.failures.pop(child.name, None)
+                continue
+
+            if child.name not in self.restart_at:
+                failures = self.failures.get(child.name, 0)
+                delay = min(RESTART_BACKOFF_MAX, RESTART_BACKOFF_BASE * 2 ** failures)
+                self.failures[child.name] = failures + 1
+                self.restart_at[child.name] = now + delay
+                log(f"{child.name} exited (code {child.proc.returncode}), restarting in {delay:.0f}s")
+            elif now >= self.restart_at[child.name]:
+                del self.restart_at[child.name]
+                replacement = self.new_child(child.name)
+                replacement.start()
+                self.replace(child, replacement)
+
+    def begin_rolling_restart(self):
+        """Queue the API workers, then the web admin, to be replaced one at a time"""
+        if self.rollout is not None:
+            log("Rolling restart already in progress")
+            return
+        log("Rolling restart...")
+        self.rollout = [c.name for c in self.children if c.name.startswith("api-")] + ["web"]
+
+    def advance_rolling_restart(self):
+        """Move the rolling restart on by one poll of the supervision loop
+
+        Crashed services keep being restarted while a replacement warms up.
+        Each new API worker must be ready before the worker it replaces is
+        asked to finish its requests and exit; if it is not, the restart
+        stops there. The replacement takes over the slot once the old
+        process has exited.
+        """
+        now = time.time()
+        step = self.rollout_step
+        if step is None:
+            if not self.rollout:
+                self.rollout = None
+                log("Rolling restart finished")
+                return
+            name = self.rollout.pop(0)
+            step = self.rollout_step = {"old": self.child(name), "new": None, "started_at": now}
+            if self.shared_socket and name != "web" and step["old"].running():
+                step["new"] = self.new_child(name)
+                step["new"].start()
+                step["phase"] = "warming"
+            else:
+                step["old"].terminate()  # The port is not shared (or nothing to keep serving), so stop first
+                step["phase"] = "draining"
+            return
+
+        old, new = step["old"], step["new"]
+        if step["phase"] == "warming":
+            if new.check_ready():
+                log(f"{new.name} ready in {now - new.started_at:.1f}s")
+                old.terminate()
+                step["phase"] = "draining"
+            elif not old.running():
+                self.replace(old, new)  # The old worker crashed meanwhile; the replacement serves from now on
+                step["phase"] = "starting"
+            elif not new.running() or now - new.started_at > READY_TIMEOUT:
+                log(f"Replacement {new.name} did not become ready - rolling restart aborted")
+                new.terminate()
+                self.retiring.append(new)
+                self.rollout = self.rollout_step = None
+        elif step["phase"] == "draining":
+            if old.stopped():
+                if new is None:
+                    new = step["new"] = self.new_child(old.name)
+                    new.start()
+                self.replace(old, new)
+                self.failures.pop(old.name, None)
+                step["phase"] = "starting"
+                if new.ready:
+                    self.rollout_step = None
+        else:
+            current = self.child(old.name)  # check_children restarts it if it crashes
+            if current.check_ready():
+                log(f"{current.name} ready in {now - current.started_at:.1f}s")
+                self.rollout_step = None
+            elif now - step["started_at"] > READY_TIMEOUT:
+                log(f"{current.name} not ready after {READY_TIMEOUT}s - continuing anyway")
+                self.rollout_step = None
+
+    def run(self):
+        """Supervise until stopped"""
+        while not self.stopping:
+            if self.restart_requested:
+                self.restart_requested = False
+                self.begin_rolling_restart()
+            if self.rollout is not None:
+                self.advance_rolling_restart()
+            self.retiring = [child for child in self.retiring if not child.stopped()]
+            self.check_children()
+            time.sleep(0.5)
+
+    def stop(self):
+        self.stopping = True
+        pending = [self.rollout_step["new"]] if self.rollout_step and self.rollout_step["new"] else []
+        for child in self.children + pending + self.retiring:
+            child.stop()
+        if self.socket is not None:
+            self.socket.close()
+        for ready_file in RUN_DIR.glob("api-*.json"):
+            ready_file.unlink()
+        RETENTION_FILE.unlink(missing_ok=True)
+
+
+supervisor = None
 
 
 def cleanup(signum=None, frame=None):
     """Cleanup function to stop all services"""
     log("\nShutting down services...")
 
-    for proc in processes:
-        try:
-            proc.terminate()
-            proc.wait(timeout=5)
-            log(f"Process {proc.pid} terminated")
-        except:
-            try:
-                proc.kill()
-                log(f"Process {proc.pid} killed")
-            except:
-                pass
+    if supervisor is not None:
+        supervisor.stop()
 
     # Remove PID file
     if PID_FILE.exists():
@@ -169,6 +686,24 @@ def cleanup(signum=None, frame=None):
     sys.exit(0)
 
 
+def request_rolling_restart(signum=None, frame=None):
+    """SIGHUP: restart the services one by one without dropping the API"""
+    if supervisor is not None:
+        supervisor.restart_requested = True
+
+
+def send_rolling_restart():
+    """Ask a running supervisor (the first PID in the PID file) for a rolling restart"""
+    try:
+        pid = int(PID_FILE.read_text().split()[0])
+    except (OSError, ValueError, IndexError):
+        log("No running server found")
+        return False
+    os.kill(pid, signal.SIGHUP)
+    log(f"Rolling restart requested (supervisor PID: {pid})")
+    return True
+
+
 def print_server_info():
     """Print server information"""
     import socket
@@ -188,58 +723,99 @@ def print_server_info():
     print("\n" + "=" * 60)
     print("  SpeechMate Host Server Started Successfully!")
     print("=" * 60)
-    print(f"\n  API Server:    http://{local_ip}:8000")
-    print(f"  API Docs:      http://{local_ip}:8000/docs")
-    print(f"  Web Admin:     http://{local_ip}:5000")
+    print(f"\n  API Server:    http://{local_ip}:{API_PORT}")
+    print(f"  API Docs:      http://{local_ip}:{API_PORT}/docs")
+    print(f"  Web Admin:     http://{local_ip}:{WEB_PORT}")
     print("\n  Press Ctrl+C to stop all services")
     print("=" * 60 + "\n")
 
 
+def parse_args():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Set up and start the SpeechMate host server")
+    parser.add_argument("--skip-models", action="store_true", help="Do not pre-download models")
+    parser.add_argument("--import-profile", action="store_true", help="Print API server import times and exit")
+    parser.add_argument(
+        "--api-workers", type=int, default=int(os.environ.get("SPEECHMATE_API_WORKERS", 1)),
+        help="API server processes sharing the API port (default: 1)"
+    )
+    parser.add_argument(
+        "--rolling-restart", action="store_true",
+        help="Restart the services of a running server one by one and exit"
+    )
+    return parser.parse_args()
+
+
 def main():
     """Main entry point"""
+    global supervisor
+    args = parse_args()
+
+    if args.rolling_restart:
+        sys.exit(0 if send_rolling_restart() else 1)
+
     log("SpeechMate Host Server - Starting...")
 
     # Create logs directory
     LOGS_DIR.mkdir(parents=True, exist_ok=True)
 
+    # Work out which setup steps are already satisfied
+    with report.phase("plan"):
+        plan = plan_startup(skip_models=args.skip_models or args.import_profile)
+
     # Setup virtual environment
-    create_virtual_environment()
-    install_dependencies()
+    if plan["venv"]:
+        with report.phase("venv"):
+            create_virtual_environment()
+    else:
+        report.skip("venv", "already exists")
 
-    # Download models (optional, can be skipped)
-    if "--skip-models" not in sys.argv:
-        try:
-            download_models()
-        except Exception as e:
-            log(f"Model download failed: {e}")
-            log("Models will be downloaded on first use")
+    if plan["dependencies"]:
+        with report.phase("dependencies", "installed"):
+            install_dependencies(upgrade_pip=plan["venv"])
+    else:
+        log("Dependencies up to date")
+        report.skip("dependencies", "requirements and venv unchanged")
+
+    if args.import_profile:
+        run_import_profile()
+        return
+
+    # Download models (optional, can be skipped) while the web admin starts
+    model_download = None
+    if plan["models"]:
+        model_download = download_models_in_background()
+    elif args.skip_models:
+        report.skip("models", "--skip-models")
+    else:
+        log(f"Model {DEFAULT_MODEL} already in model_cache")
+        report.skip("models", f"{DEFAULT_MODEL} in model_cache")
 
     # Register signal handlers
     signal.signal(signal.SIGINT, cleanup)
     signal.signal(signal.SIGTERM, cleanup)
     if platform.system() != "Windows":
         signal.signal(signal.SIGQUIT, cleanup)
-
-    # Start services
-    start_api_server()
-    time.sleep(2)  # Wait for API server to start
-    start_web_server()
-
-    # Save PIDs
-    save_pids()
+        signal.signal(signal.SIGHUP, request_rolling_restart)
+
+    # Start services in parallel and wait for their readiness probes
+    supervisor = Supervisor(api_workers=max(1, args.api_workers))
+    if supervisor.api_workers > 1:
+        if two_pass_enabled():
+            log("two_pass is enabled, which needs a single API worker (refinement results stay in the worker "
+                "that made them) - disable it or start without --api-workers")
+            sys.exit(1)
+        log(f"Running {supervisor.api_workers} API workers; each enforces an equal share of the rate limits")
+    supervisor.start(prerequisite=model_download)
 
     # Print server info
+    report.print()
     print_server_info()
 
-    # Wait for processes
+    # Restart crashed services until stopped
     try:
-        while True:
-            # Check if processes are still running
-            for proc in processes:
-                if proc.poll() is not None:
-                    log(f"Process {proc.pid} exited unexpectedly")
-                    cleanup()
-            time.sleep(1)
+        supervisor.run()
     except KeyboardInterrupt:
         cleanup()
 
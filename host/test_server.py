@@ -105,21 +105,815 @@ def test_asr_model():
         return False
 
 
+def test_asr_backends():
+    """Test the ASR backend registry with the fake engine"""
+    print("\nTesting ASR backends...")
+
+    try:
+        import os
+        from app.readiness import create_warmup_audio
+        from models.backends import ASRBackend, BACKENDS, backend_capabilities, register_backend
+        from models.asr_model import transcribe, transcribe_audio, resolve_backend, unload_model, loaded_models
+
+        capabilities = backend_capabilities()
+        for name in ("faster-whisper", "whisper-cpp", "fake"):
+            assert name in capabilities, f"{name} not registered"
+        print(f"  [OK] Registered backends: {', '.join(capabilities)}")
+
+        class IncompleteBackend(ASRBackend):
+            name = "incomplete"
+
+            def load(self):
+                pass
+
+        try:
+            register_backend(IncompleteBackend)
+            raise AssertionError("backend without transcribe() should not register")
+        except TypeError:
+            pass
+        assert "incomplete" not in BACKENDS
+        print("  [OK] Incomplete backend rejected at registration")
+
+        assert resolve_backend("small", "cpu")[0] == "faster-whisper"
+        assert resolve_backend("fake", "cpu")[0] == "fake"
+
+        audio_path = create_warmup_audio(duration=2.0)
+        try:
+            first = transcribe_audio(audio_path, model_name="fake", device="cpu", language="en")
+            second = transcribe_audio(audio_path, model_name="fake", device="cpu", language="en")
+            assert first[0] == second[0] and first[1] == "en", "fake backend should be deterministic"
+            result = transcribe(audio_path, model_name="fake", device="cpu", language="zh", word_timestamps=True)
+            assert result.words and result.segments
+        finally:
+            os.unlink(audio_path)
+        print(f"  [OK] Fake backend: '{first[0]}' ({len(result.words)} words with timestamps)")
+
+        unload_model("fake")
+        assert not any(key[0] == "fake" for key in loaded_models())
+        print("  [OK] Unloaded fake backend")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] ASR backend error: {e}")
+        return False
+
+
 def test_config():
     """Test configuration"""
     print("\nTesting configuration...")
 
+    from app.config import config
+    saved = config.model_copy(deep=True)
     try:
-        from app.config import config, detect_gpu
+        import tempfile
+        from pathlib import Path
+        from app.config import detect_gpu, load_config_from_file
+        from app import rate_limit
 
         device, compute_type = detect_gpu()
         print(f"  [OK] Detected device: {device}, compute_type: {compute_type}")
         print(f"  [OK] Current config - model: {config.model.asr_model}, device: {config.model.asr_device}")
 
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config_path = Path(tmp_dir) / "config.yaml"
+            config_path.write_text("rate_limit:\n  enabled: true\ntracing:\n  sample_rate: 0.5\n", encoding="utf-8")
+            assert load_config_from_file(config_path)
+            assert rate_limit.config.rate_limit.enabled, "modules holding config should see saved settings"
+            assert config.tracing.sample_rate == 0.5 and config.tracing.export_enabled
+            config_path.write_text("rate_limit: [not, a, mapping]\n", encoding="utf-8")
+            assert not load_config_from_file(config_path) and config.rate_limit.enabled
+        print("  [OK] Saved settings apply to the running config")
+
+        import asyncio
+        from fastapi import HTTPException
+        from app import main
+        main.save_config = lambda: None
+        config.model.asr_compute_type = "int8"
+        try:
+            asyncio.run(main.update_model_config(asr_compute_type="float64"))
+            raise AssertionError("unknown compute type accepted")
+        except HTTPException as e:
+            assert e.status_code == 400 and config.model.asr_compute_type == "int8", e
+        result = asyncio.run(main.update_model_config(asr_compute_type="float32"))
+        assert result["config"]["asr_compute_type"] == "float32", result
+        print("  [OK] float32 accepted, unknown compute types rejected")
+
         return True
     except Exception as e:
         print(f"  [FAIL] Config error: {e}")
         return False
+    finally:
+        for name in type(config).model_fields:
+            setattr(config, name, getattr(saved, name))
+        from app import main
+        from app.config import save_config
+        main.save_config = save_config
+
+
+def test_api_key_cache():
+    """Test API key caching and invalidation"""
+    print("\nTesting API key cache...")
+
+    try:
+        from app.database import (
+            init_db, create_api_key, toggle_api_key, delete_api_key,
+            verify_api_key, get_all_api_keys, api_key_cache, last_used_writer
+        )
+
+        init_db()
+        key = create_api_key("cache-test")
+        key_id = verify_api_key(key)["id"]
+        assert api_key_cache.get(key) is not None
+        print("  [OK] Verified key is cached")
+
+        last_used_writer.flush()
+        key_info = next(k for k in get_all_api_keys() if k["id"] == key_id)
+        assert key_info["last_used_at"] is not None
+        print("  [OK] last_used_at flushed in batch")
+
+        toggle_api_key(key_id)
+        assert verify_api_key(key) is None
+        print("  [OK] Disabled key rejected after invalidation")
+
+        delete_api_key(key_id)
+        return True
+    except Exception as e:
+        print(f"  [FAIL] API key cache error: {e}")
+        return False
+
+
+def test_usage_log_writer():
+    """Test batched usage logging"""
+    print("\nTesting usage log writer...")
+
+    from app import database
+    saved = (database.get_session, database.USAGE_RETRY_BACKOFF)
+    try:
+        from datetime import datetime
+        from sqlalchemy.exc import OperationalError
+        from app.database import init_db, log_usage, get_stats, usage_log_writer, UsageLogWriter
+
+        init_db()
+        before = sum(s["total_transcribe"] for s in get_stats(days=1).values())
+
+        usage_log_writer.start()
+        for _ in range(5):
+            log_usage(api_key_id=0, endpoint="transcribe", audio_duration=1.0)
+        usage_log_writer.stop()
+
+        after = sum(s["total_transcribe"] for s in get_stats(days=1).values())
+        assert after - before == 5, f"expected 5 new logs, got {after - before}"
+        print("  [OK] Queued usage logs flushed on stop")
+
+        # A batch that fails to commit is retried instead of dropped
+        attempts = []
+
+        def flaky_session():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise OperationalError("INSERT", {}, Exception("database is locked"))
+            return saved[0]()
+
+        database.get_session, database.USAGE_RETRY_BACKOFF = flaky_session, 0.01
+        writer = UsageLogWriter(batch_size=10, flush_interval=0.05, max_queue=10)
+        writer.submit({
+            "api_key_id": 0, "endpoint": "transcribe", "timestamp": datetime.utcnow(), "audio_duration": 1.0,
+            "processing_time": 0.1, "source_lang": None, "target_lang": None, "success": True,
+            "error_message": None
+        })
+        writer.flush()
+        assert attempts == [1, 1, 1] and writer.records_written == 1 and writer.records_dropped == 0, attempts
+        print(f"  [OK] Failed batch written on attempt {len(attempts)}")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Usage log writer error: {e}")
+        return False
+    finally:
+        database.get_session, database.USAGE_RETRY_BACKOFF = saved
+
+
+def test_usage_retention():
+    """Test archiving old usage logs, aggregating across the archive and rebuilding the rollup"""
+    print("\nTesting usage log retention...")
+
+    import os
+    import tempfile
+    from datetime import datetime, date
+    from pathlib import Path
+    from concurrent.futures import ThreadPoolExecutor
+    from app import retention
+    from app.database import init_db, get_session, UsageLog, UsageDaily, rebuild_usage_daily
+
+    saved = (retention.ARCHIVE_DIR, retention._write_partition, retention.RETENTION_OWNER_FILE)
+    try:
+        init_db()
+        # Rows from two days in 2000 for key 0; a retention reaching back to 2000-01-10 archives only them
+        with get_session() as session:
+            for i in range(12):
+                session.add(UsageLog(
+                    api_key_id=0, endpoint="transcribe", timestamp=datetime(2000, 1, 1 + i % 2, 12, i),
+                    audio_duration=1.5, processing_time=0.5, success=i != 3, model="small", degraded=i == 5
+                ))
+        before = retention.aggregate_usage("2000-01-01", "2000-01-02", api_key_id=0)
+        assert sum(row["request_count"] for row in before) == 12, before
+
+        writes = []
+        retention._write_partition = lambda day, rows: (writes.append(day), saved[1](day, rows))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            retention.ARCHIVE_DIR = Path(tmp_dir)
+            result = retention.archive_usage_logs(retention_days=(date.today() - date(2000, 1, 10)).days, batch_size=5)
+            assert result["archived_rows"] >= 12 and {"2000-01-01", "2000-01-02"} <= set(result["days"]), result
+            assert len(writes) == len(set(writes)), f"partitions rewritten: {writes}"
+            with get_session() as session:
+                assert session.query(UsageLog).filter(UsageLog.timestamp < datetime(2000, 1, 10)).count() == 0
+            print(f"  [OK] Archived {result['archived_rows']} rows, one partition write per day")
+
+            after = retention.aggregate_usage("2000-01-01", "2000-01-02", api_key_id=0)
+            assert after == before, f"{after} != {before}"
+            print("  [OK] Aggregates match across SQLite and the archive")
+
+            rebuild_usage_daily()
+            with get_session() as session:
+                daily = session.query(UsageDaily).filter(UsageDaily.day < "2000-01-10").order_by(UsageDaily.day).all()
+                rollup = [(row.day, row.request_count, row.failure_count, row.degraded_count) for row in daily]
+            assert rollup == [(row["day"], row["request_count"], row["failure_count"], row["degraded_count"])
+                              for row in before], rollup
+            print("  [OK] Rebuilt usage_daily includes archived days")
+
+        # Archive runs in separate processes (manage.py next to the server) must not share a temp file
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            retention.ARCHIVE_DIR = Path(tmp_dir)
+            batches = [[{"id": i * 100 + j, "endpoint": "transcribe"} for j in range(50)] for i in range(8)]
+            with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+                list(pool.map(lambda rows: saved[1]("2000-01-03", rows), batches))
+            assert not list(Path(tmp_dir).glob("*.tmp")), "temp files left behind"
+            assert len(retention.read_partition("2000-01-03")["id"]) >= 50
+        print("  [OK] Concurrent partition writes use their own temp files")
+
+        # Only the worker the supervisor names archives; a server started on its own always does
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            owner_file = Path(tmp_dir) / "retention.pid"
+            retention.RETENTION_OWNER_FILE = str(owner_file)
+            assert not retention.retention_owner(), "owner without a file"
+            owner_file.write_text(f"{os.getpid() + 1}\n")
+            assert not retention.retention_owner(), "another worker's PID"
+            owner_file.write_text(f"{os.getpid()}\n")
+            assert retention.retention_owner()
+            retention.RETENTION_OWNER_FILE = None
+            assert retention.retention_owner()
+        print("  [OK] Retention runs only in the worker named as owner")
+
+        with get_session() as session:
+            session.query(UsageDaily).filter(UsageDaily.day < "2000-01-10").delete()
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Usage retention error: {e}")
+        return False
+    finally:
+        retention.ARCHIVE_DIR, retention._write_partition, retention.RETENTION_OWNER_FILE = saved
+
+
+def test_latency_sketch():
+    """Test quantile sketch accuracy and merging"""
+    print("\nTesting latency sketch...")
+
+    try:
+        from app.sketch import LatencySketch
+
+        first, second = LatencySketch(), LatencySketch()
+        for i in range(1, 501):
+            first.add(i / 100)
+        for i in range(501, 1001):
+            second.add(i / 100)
+        first.merge(LatencySketch.from_json(second.to_json()))
+
+        p99 = first.quantile(0.99)
+        assert first.count == 1000 and abs(p99 - 9.9) / 9.9 < 0.02, f"p99={p99}"
+        print(f"  [OK] Merged sketch p50={first.quantile(0.5):.2f} p99={p99:.2f}")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Latency sketch error: {e}")
+        return False
+
+
+def test_metrics():
+    """Test metric collection and exposition format"""
+    print("\nTesting metrics...")
+
+    try:
+        import threading
+        from app.metrics import Counter, Histogram
+
+        counter = Counter("test_requests_total", "Test counter", ("route",))
+        histogram = Histogram("test_latency_seconds", "Test histogram", buckets=(0.1, 1.0))
+
+        def work():
+            for _ in range(100):
+                counter.inc(labels=("/a",))
+                histogram.observe(0.5)
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        lines = counter.collect() + histogram.collect()
+        assert 'test_requests_total{route="/a"} 400.0' in lines
+        assert 'test_latency_seconds_bucket{le="1.0"} 400' in lines
+        assert "test_latency_seconds_count 400" in lines
+        print("  [OK] Per-thread shards merged on collect")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Metrics error: {e}")
+        return False
+
+
+def test_trace_files():
+    """Test that exported trace files are pruned and capped"""
+    print("\nTesting trace files...")
+
+    import tempfile
+    from datetime import datetime, timedelta
+    from pathlib import Path
+    from app import tracing
+    from app.config import config
+
+    saved = (tracing.TRACES_DIR, config.tracing.file_retention_days, config.tracing.file_max_mb)
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tracing.TRACES_DIR = Path(tmp_dir)
+            today = datetime.utcnow().date()
+            for age in (0, 7, 8, 30):
+                (Path(tmp_dir) / f"traces-{today - timedelta(days=age)}.jsonl").write_text("{}\n")
+            config.tracing.file_retention_days = 7
+            config.tracing.file_max_mb = 1
+
+            exporter = tracing.SpanExporter()
+            trace = tracing.Trace("test", "POST /test", {})
+            trace.root.end_ns = trace.root.start_ns
+            exporter._export([trace])
+            days = sorted(path.name for path in Path(tmp_dir).glob("traces-*.jsonl"))
+            assert days == [f"traces-{today - timedelta(days=7)}.jsonl", f"traces-{today}.jsonl"], days
+            print("  [OK] Trace files older than the retention are deleted")
+
+            current = Path(tmp_dir) / f"traces-{today}.jsonl"
+            current.write_text("x" * (1024 * 1024))
+            exporter._export([trace])
+            assert current.stat().st_size == 1024 * 1024 and exporter.file_skipped == 1
+            print("  [OK] A full day's trace file stops growing")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Trace files error: {e}")
+        return False
+    finally:
+        tracing.TRACES_DIR = saved[0]
+        config.tracing.file_retention_days, config.tracing.file_max_mb = saved[1:]
+
+
+def test_rate_limiter():
+    """Test per-key token buckets and quota accounting"""
+    print("\nTesting rate limiter...")
+
+    from app.config import config
+    saved = config.rate_limit.model_copy()
+    try:
+        from app.rate_limit import RateLimiter, TokenBucket, rate_limiter
+        from app.database import init_db, log_usage, get_audio_usage_totals
+
+        config.rate_limit.enabled = True
+        bucket = TokenBucket(rate=1.0, capacity=2, now=0.0)
+        assert bucket.take(1, 0.0) == 0 and bucket.take(1, 0.0) == 0
+        assert bucket.take(1, 0.0) == 1.0, "empty bucket should ask to wait 1s"
+        assert bucket.take(1, 1.0) == 0, "bucket should refill at its rate"
+        print("  [OK] Token bucket refills at its rate")
+
+        limiter = RateLimiter()
+        key = {"id": 1, "requests_per_minute": 60}
+        results = [limiter.check_request(key) for _ in range(config.rate_limit.request_burst + 1)]
+        assert all(result is None for result in results[:-1])
+        limited = results[-1]
+        assert limited is not None and limited.headers["Retry-After"] == "1"
+        assert limiter.check_request({"id": 2, "requests_per_minute": 0}) is None, "0 should mean unlimited"
+        print(f"  [OK] 429 after a burst of {config.rate_limit.request_burst} ({limited.detail})")
+
+        from app import rate_limit
+        saved_workers = rate_limit.API_WORKERS
+        rate_limit.API_WORKERS = 2
+        try:
+            limiter = RateLimiter()
+            burst = config.rate_limit.request_burst // 2
+            results = [limiter.check_request({"id": 3, "requests_per_minute": 60}) for _ in range(burst + 1)]
+            assert all(result is None for result in results[:-1]) and results[-1] is not None
+            assert results[-1].headers["Retry-After"] == "2", "each of 2 workers refills at half the rate"
+        finally:
+            rate_limit.API_WORKERS = saved_workers
+        print("  [OK] Each of 2 API workers enforces half the limit")
+
+        # Charges flushed to usage_daily are counted once after a reload
+        init_db()
+        key = {"id": 990042, "daily_audio_quota": 1e9, "audio_seconds_per_minute": 0}
+        limiter = rate_limiter  # The one the usage log writer reports flushes to
+        limiter.reset()
+        day, month_start = limiter._periods()
+        stored = get_audio_usage_totals(day, month_start).get(key["id"], (0.0, 0.0))[0]
+        assert limiter.check_audio(key, 10.0) is None and limiter.check_audio(key, 5.0) is None
+        log_usage(api_key_id=key["id"], endpoint="transcribe", audio_duration=10.0)  # Written directly
+        limiter.sync_quotas(force=True)
+        used_day = limiter.quotas.usage(key["id"], day, month_start)[0]
+        assert abs(used_day - (stored + 15.0)) < 1e-6, f"expected {stored + 15.0}, got {used_day}"
+        print("  [OK] Quota usage counts flushed and pending charges once")
+
+        # A batch that fails to commit leaves its seconds pending
+        from app.database import UsageLogWriter
+        writer = UsageLogWriter(batch_size=10, flush_interval=0.05, max_queue=10)
+        writer._write([{"api_key_id": key["id"], "audio_duration": 5.0}])  # No timestamp: the insert fails
+        limiter.sync_quotas(force=True)
+        used_day = limiter.quotas.usage(key["id"], day, month_start)[0]
+        assert abs(used_day - (stored + 15.0)) < 1e-6, f"failed write dropped pending seconds: {used_day}"
+        assert writer.records_written == 0
+        print("  [OK] Charges stay pending when a usage write fails")
+        limiter.reset()
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Rate limiter error: {e}")
+        return False
+    finally:
+        config.rate_limit = saved
+
+
+def test_loop_monitor():
+    """Test that a blocking call on the event loop is detected"""
+    print("\nTesting event loop monitor...")
+
+    try:
+        import time
+        import asyncio
+        from app.loop_monitor import LoopMonitor
+
+        monitor = LoopMonitor(interval=0.02, threshold=0.1)
+
+        def blocking_handler():
+            time.sleep(0.3)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.1)
+            blocking_handler()
+            await asyncio.sleep(0.1)
+            monitor.stop()
+
+        asyncio.run(run())
+
+        assert monitor.stalls, "no stall recorded"
+        stall = monitor.stalls[0]
+        assert stall["site"] == "test_server.py:blocking_handler", stall["site"]
+        assert stall["duration_ms"] >= 250
+        print(f"  [OK] Stall of {stall['duration_ms']:.0f}ms attributed to {stall['site']}")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Loop monitor error: {e}")
+        return False
+
+
+def test_cpu_tuning():
+    """Test CPU budget detection and thread/worker tuning with the fake engine"""
+    print("\nTesting CPU tuning...")
+
+    try:
+        import tempfile
+        from pathlib import Path
+        from app import tuning
+
+        budget = tuning.cpu_budget()
+        assert budget["cpus"] >= 1
+        for cpus in (1, 2, 6, 16):
+            for threads, workers in tuning.candidate_settings(cpus):
+                assert threads * workers <= cpus, f"{threads}x{workers} oversubscribes {cpus} CPUs"
+        print(f"  [OK] CPU budget: {budget['cpus']} of {budget['cores']} cores (quota: {budget['quota']})")
+
+        result = tuning.cpu_tuner.run(apply=False, model_name="fake", compute_type="int8", sample_seconds=0.5, rounds=1)
+        assert result["candidates"] and result["best"] in result["candidates"]
+        for candidate in result["candidates"]:
+            assert candidate["concurrency"] == tuning.serving_concurrency("fake", candidate["num_workers"]), candidate
+        print(f"  [OK] Tuned {len(result['candidates'])} settings in {result['duration']}s")
+
+        saved_file = tuning.TUNING_FILE
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tuning.TUNING_FILE = Path(tmp_dir) / "cpu_tuning.json"
+            try:
+                tuning.save_tuning(result)
+                options = tuning.cpu_options("fake", "cpu", "int8")
+                assert options["cpu_threads"] == result["best"]["cpu_threads"]
+                assert tuning.cpu_options("fake", "cuda", "int8") == {}
+            finally:
+                tuning.TUNING_FILE = saved_file
+        print(f"  [OK] Saved setting applied: {options}")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] CPU tuning error: {e}")
+        return False
+
+
+def test_model_benchmarks():
+    """Test model benchmark planning, measurement and the SLO recommendation"""
+    print("\nTesting model benchmarks...")
+
+    try:
+        from app.model_benchmark import model_size, benchmark_plan, measure_model, recommend_model
+
+        assert model_size("large-v3") > model_size("small") > model_size("tiny") > 0
+        assert benchmark_plan(["fake"]) == [("fake", "native")], "fake engine has no compute types"
+        assert benchmark_plan(["small"], ["int8", "float32", "bogus"]) == [("small", "int8"), ("small", "float32")]
+        print("  [OK] Plan covers each model's supported compute types")
+
+        result = measure_model("fake", "cpu", "native", seconds=0.5, rounds=1)
+        assert result["latency_ms"] >= 0 and result["peak_rss_bytes"]
+        print(f"  [OK] Measured fake model: {result['latency_ms']}ms, RTF {result['rtf']}")
+
+        results = [
+            {"model": "tiny", "compute_type": "int8", "latency_ms": 300, "rtf": 0.06},
+            {"model": "small", "compute_type": "int8", "latency_ms": 1200, "rtf": 0.24},
+            {"model": "small", "compute_type": "float32", "latency_ms": 2500, "rtf": 0.5},
+            {"model": "medium", "compute_type": "int8", "latency_ms": 4000, "rtf": 0.8},
+            {"model": "large-v3", "compute_type": "int8", "error": "out of memory"}
+        ]
+        recommendation = recommend_model(results, slo_ms=1500)
+        assert (recommendation["model"], recommendation["compute_type"]) == ("small", "int8"), recommendation
+        assert recommend_model(results, slo_ms=100) is None
+        print(f"  [OK] Recommended {recommendation['model']} ({recommendation['compute_type']}) for a 1500ms SLO")
+
+        import json
+        import tempfile
+        from pathlib import Path
+        from app import model_benchmark
+
+        saved_file = model_benchmark.BENCHMARK_FILE
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model_benchmark.BENCHMARK_FILE = Path(tmp_dir) / "model_benchmarks.json"
+            try:
+                stored = {"updated_at": "2000-01-01T00:00:00",
+                          "results": {f"{r['model']}/cpu/{r['compute_type']}": {**r, "device": "cpu"} for r in results}}
+                model_benchmark.BENCHMARK_FILE.write_text(json.dumps({**stored, "machine": model_benchmark.machine_info()}))
+                assert model_benchmark.benchmark_summary("cpu", 1500)["recommendation"]["model"] == "small"
+                model_benchmark.BENCHMARK_FILE.write_text(json.dumps({**stored, "machine": {"cpu": "elsewhere"}}))
+                summary = model_benchmark.benchmark_summary("cpu", 1500)
+                assert summary["stale"] and summary["results"] and summary["recommendation"] is None
+            finally:
+                model_benchmark.BENCHMARK_FILE = saved_file
+        print("  [OK] No recommendation from results measured on other hardware")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Model benchmark error: {e}")
+        return False
+
+
+def test_degradation():
+    """Test routing short requests to the fallback model under load"""
+    print("\nTesting load-adaptive degradation...")
+
+    from app.config import config
+    saved = (config.model.asr_model, config.degradation.model_copy())
+    try:
+        from contextlib import ExitStack
+        from app.readiness import readiness
+        from app.degradation import DegradationPolicy
+        from models.asr_model import get_asr_model, unload_model
+
+        config.model.asr_model = "small"
+        config.degradation.enabled = True
+        config.degradation.fallback_model = "fake"
+        config.degradation.queue_depth_threshold = 3
+        config.degradation.min_degraded_seconds = 0
+        policy = DegradationPolicy()
+
+        with ExitStack() as stack:
+            for _ in range(3):
+                stack.enter_context(readiness.track_request())
+            assert policy.choose_model(5.0, "transcribe") == ("small", False), "fallback is not resident yet"
+            get_asr_model("fake", config.model.asr_device, config.model.asr_compute_type)
+            assert policy.choose_model(5.0, "transcribe") == ("fake", True)
+            assert policy.choose_model(120.0, "transcribe") == ("small", False), "long clips keep the main model"
+        print(f"  [OK] Degraded to fake at {config.degradation.queue_depth_threshold} requests in flight")
+
+        assert policy.choose_model(5.0, "transcribe") == ("small", False)
+        assert policy.episodes == 1
+        print("  [OK] Recovered once the queue drained")
+
+        unload_model("fake")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Degradation error: {e}")
+        return False
+    finally:
+        config.model.asr_model, config.degradation = saved
+
+
+def test_inference_dispatch():
+    """Test that concurrent requests queue for inference threads instead of the event loop"""
+    print("\nTesting inference dispatch...")
+
+    from app.config import config
+    saved = config.model.asr_model
+    key_id = None
+    audio_path = None
+    try:
+        import os
+        import time
+        import asyncio
+        import httpx
+        from benchmarks.fake_backend import install_fake_model
+        from app.main import app
+        from app.readiness import readiness
+        from app.inference import inference_pool
+        from app.tuning import create_speech_like_audio
+        from app.database import init_db, create_api_key, verify_api_key, delete_api_key
+        from models.asr_model import unload_model
+
+        init_db()
+        install_fake_model("fake-pool", latency=0.3, num_workers=2)
+        config.model.asr_model = "fake-pool"
+        api_key = create_api_key("dispatch-test")
+        key_id = verify_api_key(api_key)["id"]
+        audio_path = create_speech_like_audio(1.0)
+        with open(audio_path, "rb") as f:
+            audio = f.read()
+
+        async def run():
+            depth = 0
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                async def request():
+                    return await client.post(
+                        "/api/v1/transcribe", files={"audio": ("clip.wav", audio, "audio/wav")},
+                        headers={"X-API-Key": api_key}
+                    )
+
+                tasks = [asyncio.create_task(request()) for _ in range(4)]
+                while not all(task.done() for task in tasks):
+                    depth = max(depth, readiness.in_flight)
+                    await asyncio.sleep(0.01)
+                return [task.result() for task in tasks], depth
+
+        start = time.perf_counter()
+        responses, depth = asyncio.run(run())
+        elapsed = time.perf_counter() - start
+        assert all(r.status_code == 200 and r.json()["success"] for r in responses), [r.text for r in responses]
+        assert inference_pool.size == 2, inference_pool.size
+        assert depth == 4, f"in flight peaked at {depth}"
+        assert elapsed < 1.1, f"4 clips on 2 inference threads took {elapsed:.2f}s"
+        print(f"  [OK] 4 requests in flight on {inference_pool.size} inference threads ({elapsed:.2f}s)")
+
+        unload_model("fake-pool")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Inference dispatch error: {e}")
+        return False
+    finally:
+        config.model.asr_model = saved
+        if key_id is not None:
+            delete_api_key(key_id)
+        if audio_path:
+            os.unlink(audio_path)
+
+
+def test_refinement():
+    """Test two-pass refinement jobs and the draft word error rate"""
+    print("\nTesting two-pass refinement...")
+
+    import os
+    import time
+    from app.config import config
+    saved = config.two_pass.model_copy()
+    try:
+        from app.readiness import create_warmup_audio
+        from app.refine import RefineManager, word_error_rate
+
+        assert word_error_rate("hello world", "hello world") == 0.0
+        assert word_error_rate("hello word", "hello world") == 0.5
+        assert abs(word_error_rate("你好世间", "你好世界", "zh") - 0.25) < 1e-9
+        print("  [OK] Word error rate (words and characters)")
+
+        config.two_pass.refine_model = "fake"
+        manager = RefineManager()
+        audio_path = create_warmup_audio(duration=6.0)
+        draft = {"text": "Hello, this is a test.", "language": "en", "model": "tiny", "processing_time": 0.1}
+        job = manager.submit(1, audio_path, 6.0, "en", draft, request_start=time.time())
+        deadline = time.time() + 5
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+
+        result = job.to_dict()
+        assert result["status"] == "done", result
+        assert len(result["segments"]) == 2 and result["latency"] is not None
+        assert result["draft_word_error_rate"] is not None
+        assert not os.path.exists(audio_path), "refinement should delete its audio"
+        assert manager.get(job.id) is job
+        manager.stop()
+        print(f"  [OK] Refined '{result['text']}' in {result['processing_time']}s "
+              f"(draft WER {result['draft_word_error_rate']})")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Refinement error: {e}")
+        return False
+    finally:
+        config.two_pass = saved
+
+
+def test_vad():
+    """Test silence trimming and the no-speech short-circuit"""
+    print("\nTesting voice activity detection...")
+
+    import os
+    try:
+        import numpy as np
+        from app.tuning import create_speech_like_audio
+        from app.vad import load_audio, trim_silence, _write_wav
+
+        speech_path = create_speech_like_audio(1.0)
+        voice, sample_rate = load_audio(speech_path)
+        os.unlink(speech_path)
+        rng = np.random.default_rng(0)
+        silence = lambda seconds: rng.normal(0, 3e-4, int(seconds * sample_rate)).astype(np.float32)
+
+        click = np.concatenate([silence(1.0), np.full(320, 0.5, dtype=np.float32), silence(1.0)])
+        click_path = _write_wav(click, sample_rate)
+        try:
+            result = trim_silence(click_path, len(click) / sample_rate, "transcribe")
+            assert not result.speech and result.audio_path == click_path, result
+        finally:
+            os.unlink(click_path)
+        print("  [OK] Silence with a key click skips ASR")
+
+        clip = np.concatenate([silence(1.0), voice, voice, silence(2.0), voice, silence(1.0)])
+        clip_path = _write_wav(clip, sample_rate)
+        try:
+            result = trim_silence(clip_path, len(clip) / sample_rate, "transcribe")
+            assert result.speech and result.audio_path != clip_path
+            assert 2.5 < result.removed < 4.0, result
+            trimmed = load_audio(result.audio_path)[0]
+            assert abs(len(trimmed) / sample_rate - result.duration) < 0.01
+            os.unlink(result.audio_path)
+        finally:
+            os.unlink(clip_path)
+        print(f"  [OK] Trimmed {result.removed:.2f}s of silence, {result.duration:.2f}s left")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] VAD error: {e}")
+        return False
+
+
+def test_readiness():
+    """Test warmup audio generation and readiness tracking"""
+    print("\nTesting readiness...")
+
+    from app import readiness as readiness_module
+    from app.config import config
+    saved = (readiness_module.translation_available, config.model.asr_model, readiness_module.readiness.status)
+    try:
+        import wave
+        from app.readiness import ReadinessState, create_warmup_audio
+
+        audio_path = create_warmup_audio(duration=0.5)
+        with wave.open(audio_path, "rb") as wf:
+            frames = wf.getnframes()
+        os.unlink(audio_path)
+        print(f"  [OK] Warmup audio created ({frames} frames)")
+
+        state = ReadinessState()
+        with state.track_request():
+            assert state.to_dict()["queue_depth"] == 1
+        assert state.in_flight == 0 and not state.is_ready
+        print("  [OK] Readiness state tracks in-flight requests")
+
+        # Translation is optional: warmup without it still ends ready; an ASR failure does not
+        readiness_module.translation_available = lambda: False
+        config.model.asr_model = "fake"
+        readiness_module.run_warmup()
+        assert readiness_module.readiness.status == "ready", readiness_module.readiness.error
+        assert readiness_module.readiness.warmup_steps["translate_zh_en"] == "skipped"
+        config.model.asr_model = "no-such-model"
+        readiness_module.run_warmup()
+        assert readiness_module.readiness.status == "failed"
+        print("  [OK] Ready without translation, failed on an ASR error")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Readiness error: {e}")
+        return False
+    finally:
+        readiness_module.translation_available = saved[0]
+        config.model.asr_model = saved[1]
+        readiness_module.readiness.status = saved[2]
 
 
 def main():
@@ -128,11 +922,31 @@ def main():
     print("SpeechMate Host Server Tests")
     print("=" * 50)
 
+    # The deterministic "fake" ASR model exists only in test processes
+    from benchmarks.fake_backend import install_fake_model
+    install_fake_model()
+
     results = []
 
     results.append(("Imports", test_imports()))
     results.append(("Config", test_config()))
     results.append(("Database", test_database()))
+    results.append(("API Key Cache", test_api_key_cache()))
+    results.append(("Usage Log Writer", test_usage_log_writer()))
+    results.append(("Usage Retention", test_usage_retention()))
+    results.append(("Latency Sketch", test_latency_sketch()))
+    results.append(("Metrics", test_metrics()))
+    results.append(("Trace Files", test_trace_files()))
+    results.append(("Loop Monitor", test_loop_monitor()))
+    results.append(("Rate Limiter", test_rate_limiter()))
+    results.append(("Readiness", test_readiness()))
+    results.append(("ASR Backends", test_asr_backends()))
+    results.append(("CPU Tuning", test_cpu_tuning()))
+    results.append(("Model Benchmarks", test_model_benchmarks()))
+    results.append(("Degradation", test_degradation()))
+    results.append(("Inference Dispatch", test_inference_dispatch()))
+    results.append(("Two-Pass Refinement", test_refinement()))
+    results.append(("VAD", test_vad()))
     results.append(("Translation", test_translation()))
     results.append(("ASR Model", test_asr_model()))
 
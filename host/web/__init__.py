@@ -8,19 +8,29 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from app.config import config, ASR_MODELS, get_base_url, get_local_ip, save_config
+from app.config import config, ASR_MODELS, COMPUTE_TYPES, get_base_url, get_local_ip, save_config
 from app.database import (
     get_all_api_keys, create_api_key, delete_api_key, toggle_api_key,
     get_stats, init_db
 )
+from app.model_benchmark import model_benchmarker, benchmark_summary
 
 app = Flask(__name__)
 app.secret_key = config.jwt_secret
 
 
+def _measured_by_model(summary: dict) -> dict:
+    """Benchmark results grouped by model for the model cards"""
+    measured = {}
+    for result in summary["results"]:
+        measured.setdefault(result["model"], []).append(result)
+    return measured
+
+
 @app.route("/")
 def index():
     """Main page"""
+    benchmarks = benchmark_summary()
     return render_template(
         "index.html",
         base_url=get_base_url(),
@@ -28,6 +38,8 @@ def index():
         current_model=config.model.asr_model,
         current_device=config.model.asr_device,
         available_models=ASR_MODELS,
+        measured=_measured_by_model(benchmarks),
+        benchmarks=benchmarks,
         api_keys=get_all_api_keys()
     )
 
@@ -79,13 +91,16 @@ def update_model():
     asr_device = data.get("asr_device")
     asr_compute_type = data.get("asr_compute_type")
 
+    if asr_compute_type and asr_compute_type not in COMPUTE_TYPES:
+        return jsonify({"success": False, "error": f"Unknown compute type: {asr_compute_type}"}), 400
+
     if asr_model and asr_model in ASR_MODELS:
         config.model.asr_model = asr_model
 
     if asr_device in ["cpu", "cuda"]:
         config.model.asr_device = asr_device
 
-    if asr_compute_type in ["float16", "int8", "int8_float16"]:
+    if asr_compute_type:
         config.model.asr_compute_type = asr_compute_type
 
     save_config()
@@ -113,10 +128,29 @@ def server_info():
             "device": config.model.asr_device,
             "compute_type": config.model.asr_compute_type
         },
-        "available_models": ASR_MODELS
+        "available_models": ASR_MODELS,
+        "model_benchmarks": benchmark_summary()
     })
 
 
+@app.route("/api/benchmark/models", methods=["GET"])
+def model_benchmark_status():
+    """Benchmark progress, stored results and the recommended model"""
+    return jsonify({"success": True, **model_benchmarker.to_dict(), **benchmark_summary()})
+
+
+@app.route("/api/benchmark/models", methods=["POST"])
+def start_model_benchmark():
+    """Measure every cached model and compute type on this machine"""
+    data = request.get_json(silent=True) or {}
+    started = model_benchmarker.start(
+        models=data.get("models"),
+        compute_types=data.get("compute_types"),
+        device=data.get("device", config.model.asr_device)
+    )
+    return jsonify({"success": started, "status": model_benchmarker.status})
+
+
 def run_web_server():
     """Run the web admin server"""
     init_db()
@@ -1,14 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-SpeechMate Integration Test Script
-Runs full integration tests with the server running
+SpeechMate Load Test Script
+Drives a running server with concurrent transcribe/translate requests
+
+Usage:
+    python integration_test.py                                  # closed loop, 4 clients, 60s
+    python integration_test.py --mode open --rate 5             # Poisson arrivals at 5 req/s
+    python integration_test.py --mix transcribe=3,translate=1 --clips 1,5,15 --ramp 30
 """
 import sys
 import os
+import json
+import math
 import time
-import subprocess
-import signal
+import random
+import asyncio
+import argparse
 import tempfile
 import wave
 import numpy as np
@@ -19,23 +27,23 @@ if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8', errors='replace')
     sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
-# Configure HuggingFace mirror
-os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
-
 BASE_DIR = Path(__file__).parent
 HOST_DIR = BASE_DIR / "host"
-TEST_ITERATIONS = 10
+
+REQUEST_TIMEOUT = 120
+
+# Latency histogram bucket upper bounds in seconds
+HISTOGRAM_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
 
 
 def create_test_audio(duration=2.0, sample_rate=16000):
-    """Create a simple test audio file (sine wave)"""
+    """Create a simple test audio file (sine wave) and return its bytes"""
     t = np.linspace(0, duration, int(sample_rate * duration), False)
     # Create a 440Hz sine wave
     audio = np.sin(440 * 2 * np.pi * t) * 0.5
     # Convert to 16-bit PCM
     audio = (audio * 32767).astype(np.int16)
 
-    # Save to temp file
     temp_file = tempfile.NamedTemporaryFile(suffix=".wav", delete=False)
     temp_path = temp_file.name
     temp_file.close()
@@ -46,113 +54,297 @@ def create_test_audio(duration=2.0, sample_rate=16000):
         wf.setframerate(sample_rate)
         wf.writeframes(audio.tobytes())
 
-    return temp_path
+    try:
+        return Path(temp_path).read_bytes()
+    finally:
+        os.unlink(temp_path)
 
 
-def test_health_check(base_url):
-    """Test server health endpoint"""
-    import requests
-    try:
-        response = requests.get(f"{base_url}/health", timeout=5)
-        return response.status_code == 200
-    except:
-        return False
+def parse_weights(value):
+    """'transcribe=3,translate=1' -> {'transcribe': 3.0, 'translate': 1.0}"""
+    weights = {}
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        name, _, weight = part.partition("=")
+        weights[name] = float(weight or 1)
+    return weights
 
 
-def test_transcribe_api(base_url, api_key, audio_path):
-    """Test transcribe API"""
-    import requests
-    try:
-        with open(audio_path, "rb") as f:
-            files = {"audio": ("test.wav", f, "audio/wav")}
-            headers = {"X-API-Key": api_key}
-            response = requests.post(
-                f"{base_url}/api/v1/transcribe",
-                files=files,
-                headers=headers,
-                timeout=60
-            )
-        return response.status_code == 200, response.json()
-    except Exception as e:
-        return False, {"error": str(e)}
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))]
 
 
-def test_translate_api(base_url, api_key, audio_path, source="zh", target="en"):
-    """Test translate API"""
-    import requests
-    try:
-        with open(audio_path, "rb") as f:
-            files = {"audio": ("test.wav", f, "audio/wav")}
-            data = {"source_lang": source, "target_lang": target}
-            headers = {"X-API-Key": api_key}
-            response = requests.post(
-                f"{base_url}/api/v1/translate",
+class Stats:
+    """Results collected during the measured phase"""
+
+    def __init__(self):
+        self.latencies = {}  # endpoint -> [seconds]
+        self.errors = {}  # endpoint -> {reason: count}
+        self.dropped = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def record(self, endpoint, latency, error=None):
+        if error is None:
+            self.latencies.setdefault(endpoint, []).append(latency)
+        else:
+            reasons = self.errors.setdefault(endpoint, {})
+            reasons[error] = reasons.get(error, 0) + 1
+
+    def error_count(self, endpoint=None):
+        endpoints = [endpoint] if endpoint else list(self.errors)
+        return sum(sum(self.errors.get(e, {}).values()) for e in endpoints)
+
+    def request_count(self, endpoint=None):
+        endpoints = [endpoint] if endpoint else set(self.latencies) | set(self.errors)
+        return sum(len(self.latencies.get(e, [])) for e in endpoints) + self.error_count(endpoint)
+
+
+class LoadGenerator:
+    """Issues requests against the API and records their outcome"""
+
+    def __init__(self, args, api_key):
+        self.args = args
+        self.api_key = api_key
+        self.random = random.Random(args.seed)
+        self.mix = parse_weights(args.mix)
+        self.clips = {seconds: create_test_audio(seconds) for seconds in args.clips}
+        self.stats = Stats()
+        self.measuring = False
+        self.client = None
+
+    def next_request(self):
+        endpoint = self.random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        clip = self.random.choice(list(self.clips))
+        return endpoint, clip
+
+    async def send(self, endpoint, clip):
+        files = {"audio": (f"load_{clip:g}s.wav", self.clips[clip], "audio/wav")}
+        data = {"source_lang": "zh", "target_lang": "en"} if endpoint == "translate" else {}
+        measured = self.measuring
+
+        self.stats.in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self.stats.in_flight)
+        start = time.perf_counter()
+        error = None
+        try:
+            response = await self.client.post(
+                f"/api/v1/{endpoint}",
                 files=files,
                 data=data,
-                headers=headers,
-                timeout=60
+                headers={"X-API-Key": self.api_key}
             )
-        return response.status_code == 200, response.json()
-    except Exception as e:
-        return False, {"error": str(e)}
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}"
+            elif not response.json().get("success", False):
+                error = "success=false"
+        except Exception as e:
+            error = type(e).__name__
+        finally:
+            self.stats.in_flight -= 1
+
+        if measured:
+            self.stats.record(endpoint, time.perf_counter() - start, error)
+
+    def rate_at(self, elapsed):
+        """Target arrival rate, ramping linearly from zero after warmup"""
+        ramp_end = self.args.warmup + self.args.ramp
+        if self.args.ramp > 0 and self.args.warmup <= elapsed < ramp_end:
+            return max(self.args.rate * (elapsed - self.args.warmup) / self.args.ramp, self.args.rate / 20)
+        return self.args.rate
+
+    async def run_open_loop(self, total_time):
+        """Poisson arrivals; requests are sent on schedule regardless of responses"""
+        tasks = set()
+        start = time.monotonic()
+        while (elapsed := time.monotonic() - start) < total_time:
+            self.update_phase(elapsed)
+            if self.stats.in_flight >= self.args.max_in_flight:
+                if self.measuring:
+                    self.stats.dropped += 1
+            else:
+                task = asyncio.create_task(self.send(*self.next_request()))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            await asyncio.sleep(self.random.expovariate(self.rate_at(elapsed)))
+        self.measuring = False
+        if tasks:
+            await asyncio.wait(tasks)
+
+    async def run_closed_loop(self, total_time):
+        """A fixed number of clients, each sending its next request when the last completes"""
+        start = time.monotonic()
+
+        async def client(index):
+            # With a ramp, one client warms up and the rest start spread over the ramp phase
+            if self.args.ramp > 0 and index > 0:
+                await asyncio.sleep(self.args.warmup + self.args.ramp * index / self.args.concurrency)
+            while time.monotonic() - start < total_time:
+                await self.send(*self.next_request())
+
+        async def phase_clock():
+            while (elapsed := time.monotonic() - start) < total_time:
+                self.update_phase(elapsed)
+                await asyncio.sleep(0.1)
+            self.measuring = False
+
+        await asyncio.gather(phase_clock(), *(client(i) for i in range(self.args.concurrency)))
+
+    def update_phase(self, elapsed):
+        measuring = elapsed >= self.args.warmup + self.args.ramp
+        if measuring and not self.measuring:
+            self.measure_start = time.monotonic()
+            print(f"  Measuring for {self.args.duration:.0f}s...")
+        self.measuring = measuring
+
+    async def run(self, base_url):
+        import httpx
+
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        async with httpx.AsyncClient(base_url=base_url, timeout=REQUEST_TIMEOUT, limits=limits) as client:
+            self.client = client
+            total_time = self.args.warmup + self.args.ramp + self.args.duration
+            if self.args.warmup or self.args.ramp:
+                print(f"  Warmup {self.args.warmup:.0f}s, ramp {self.args.ramp:.0f}s...")
+            self.measure_start = time.monotonic()
+            if self.args.mode == "open":
+                await self.run_open_loop(total_time)
+            else:
+                await self.run_closed_loop(total_time)
+        # Requests still in flight at the end are included, so use the real elapsed time
+        return time.monotonic() - self.measure_start
+
+
+def format_latencies(latencies):
+    return (f"p50 {percentile(latencies, 0.50) * 1000:8.0f}ms  p90 {percentile(latencies, 0.90) * 1000:8.0f}ms  "
+            f"p99 {percentile(latencies, 0.99) * 1000:8.0f}ms  max {max(latencies, default=0) * 1000:8.0f}ms")
+
+
+def print_histogram(latencies):
+    counts = [0] * len(HISTOGRAM_BUCKETS)
+    for latency in latencies:
+        counts[next(i for i, bound in enumerate(HISTOGRAM_BUCKETS) if latency <= bound)] += 1
+    peak = max(counts, default=0) or 1
+    lower = 0.0
+    for bound, count in zip(HISTOGRAM_BUCKETS, counts):
+        label = f"{lower * 1000:>6.0f}-{bound * 1000:.0f}ms" if bound != float("inf") else f"{lower * 1000:>6.0f}ms+"
+        print(f"    {label:<16}{count:>7}  {'#' * round(40 * count / peak)}")
+        lower = bound
+
+
+def build_report(args, stats, elapsed):
+    endpoints = sorted(set(stats.latencies) | set(stats.errors))
+    all_latencies = [latency for values in stats.latencies.values() for latency in values]
+    total = stats.request_count()
+    report = {
+        "mode": args.mode,
+        "duration": round(elapsed, 2),
+        "requests": total,
+        "errors": stats.error_count(),
+        "error_rate": round(stats.error_count() / total, 4) if total else 0.0,
+        "dropped": stats.dropped,
+        "throughput_rps": round(len(all_latencies) / elapsed, 2) if elapsed else 0.0,
+        "max_in_flight": stats.max_in_flight,
+        "endpoints": {}
+    }
+    if args.mode == "open":
+        report["offered_rps"] = args.rate
+    else:
+        report["concurrency"] = args.concurrency
+
+    for endpoint in endpoints + ["all"]:
+        latencies = all_latencies if endpoint == "all" else stats.latencies.get(endpoint, [])
+        report["endpoints"][endpoint] = {
+            "requests": total if endpoint == "all" else stats.request_count(endpoint),
+            "errors": stats.error_count(None if endpoint == "all" else endpoint),
+            "error_reasons": stats.errors.get(endpoint, {}) if endpoint != "all" else {},
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p90_ms": round(percentile(latencies, 0.90) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+            "max_ms": round(max(latencies, default=0) * 1000, 1),
+        }
+    return report, all_latencies
+
+
+def print_report(report, stats, all_latencies):
+    print("\n" + "=" * 60)
+    print("Load Test Summary")
+    print("=" * 60)
+    if report["mode"] == "open":
+        print(f"  Mode: open loop, offered {report['offered_rps']:.1f} req/s")
+    else:
+        print(f"  Mode: closed loop, {report['concurrency']} clients")
+    print(f"  Measured: {report['duration']:.1f}s")
+    print(f"  Requests: {report['requests']}  Errors: {report['errors']} ({report['error_rate']:.1%})"
+          + (f"  Dropped: {report['dropped']}" if report["dropped"] else ""))
+    print(f"  Achieved throughput: {report['throughput_rps']:.2f} req/s (max in flight: {report['max_in_flight']})")
 
+    print("\n  Latency:")
+    for endpoint in sorted(stats.latencies):
+        print(f"    {endpoint:<12}{format_latencies(stats.latencies[endpoint])}")
+    print(f"    {'all':<12}{format_latencies(all_latencies)}")
 
-def run_single_test(iteration, base_url, api_key, audio_path):
-    """Run a single test iteration"""
-    print(f"\n--- Test Iteration {iteration} ---")
+    for endpoint, reasons in sorted(stats.errors.items()):
+        print(f"\n  {endpoint} errors: " + ", ".join(f"{reason} x{count}" for reason, count in reasons.items()))
 
-    results = {
-        "health": False,
-        "transcribe": False,
-        "translate": False
-    }
+    print("\n  Histogram (all successful requests):")
+    print_histogram(all_latencies)
 
-    # Test health check
-    print("  Testing health check...")
-    results["health"] = test_health_check(base_url)
-    print(f"    Health check: {'PASS' if results['health'] else 'FAIL'}")
-
-    # Test transcribe
-    print("  Testing transcribe API...")
-    success, response = test_transcribe_api(base_url, api_key, audio_path)
-    results["transcribe"] = success
-    if success:
-        print(f"    Transcribe: PASS (text: '{response.get('text', '')[:30]}...')")
-    else:
-        print(f"    Transcribe: FAIL ({response.get('error', 'Unknown error')})")
-
-    # Test translate
-    print("  Testing translate API...")
-    success, response = test_translate_api(base_url, api_key, audio_path, "zh", "en")
-    results["translate"] = success
-    if success:
-        orig = response.get('original_text', '')[:20]
-        trans = response.get('translated_text', '')[:20]
-        print(f"    Translate: PASS ('{orig}...' -> '{trans}...')")
-    else:
-        print(f"    Translate: FAIL ({response.get('error', 'Unknown error')})")
 
-    return all(results.values())
+async def check_health(base_url):
+    """Test server health endpoint"""
+    import httpx
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+            response = await client.get("/health")
+        return response.status_code == 200
+    except Exception:
+        return False
 
 
-def main():
-    """Main test runner"""
+async def discover_api_key(base_url):
+    """Use the admin key from /api/v1/info to pick the first API key"""
+    import httpx
+    async with httpx.AsyncClient(base_url=base_url, timeout=5) as client:
+        response = await client.get("/api/v1/info")
+        admin_key = response.json().get("admin_api_key", "")
+        response = await client.get("/api/v1/api-keys", headers={"X-API-Key": admin_key})
+        keys = response.json().get("api_keys", []) if response.status_code == 200 else []
+        active = [key for key in keys if key.get("is_active", True)]
+        return active[0]["key"] if active else ""
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="SpeechMate load generator")
+    parser.add_argument("--url", default="http://localhost:8000", help="Server base URL")
+    parser.add_argument("--api-key", default=os.environ.get("TEST_API_KEY", ""),
+                        help="API key (default: $TEST_API_KEY, else the first active key)")
+    parser.add_argument("--mode", choices=("closed", "open"), default="closed",
+                        help="closed: fixed number of clients; open: Poisson arrivals")
+    parser.add_argument("--concurrency", type=int, default=4, help="Clients in closed-loop mode")
+    parser.add_argument("--rate", type=float, default=2.0, help="Mean arrivals per second in open-loop mode")
+    parser.add_argument("--max-in-flight", type=int, default=256,
+                        help="Open loop: drop arrivals beyond this many outstanding requests")
+    parser.add_argument("--mix", default="transcribe=1,translate=1", help="Endpoint weights")
+    parser.add_argument("--clips", default="2", help="Comma-separated clip lengths in seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="Seconds of unmeasured warmup")
+    parser.add_argument("--ramp", type=float, default=0, help="Seconds to ramp up to full load")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of measured load")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for arrivals and mix")
+    parser.add_argument("--max-error-rate", type=float, default=0.0, help="Fail if the error rate is above this")
+    parser.add_argument("--json", default=None, help="Also write the report to this file")
+    return parser
+
+
+async def async_main(args):
     print("=" * 60)
-    print("SpeechMate Integration Tests")
-    print(f"Running {TEST_ITERATIONS} iterations")
+    print("SpeechMate Load Test")
     print("=" * 60)
 
-    base_url = "http://localhost:8000"
-    api_key = os.environ.get("TEST_API_KEY", "")
-
-    # Create test audio
-    print("\nCreating test audio file...")
-    audio_path = create_test_audio(duration=2.0)
-    print(f"  Created: {audio_path}")
-
-    # Check server status
-    print(f"\nChecking server at {base_url}...")
-    if not test_health_check(base_url):
+    print(f"\nChecking server at {args.url}...")
+    if not await check_health(args.url):
         print("  [ERROR] Server is not running!")
         print("  Please start the server first:")
         print(f"    cd {HOST_DIR}")
@@ -160,81 +352,44 @@ def main():
         return 1
     print("  [OK] Server is running")
 
-    # Get API key from server info if not provided
-    if not api_key:
-        try:
-            import requests
-            # Get the actual API key from database
-            response = requests.get(f"{base_url}/api/v1/info", timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                # Note: admin_api_key is for admin operations, need actual API key
-                # For testing, we'll get it from a separate endpoint
-                print("  [INFO] Getting API key from server...")
-        except:
-            pass
-
-    # Get actual API key from database via a test request
+    api_key = args.api_key
     if not api_key:
         try:
-            # First try with admin key to list API keys
-            response = requests.get(f"{base_url}/api/v1/info", timeout=5)
-            if response.status_code == 200:
-                admin_key = response.json().get("admin_api_key", "")
-                response = requests.get(
-                    f"{base_url}/api/v1/api-keys",
-                    headers={"X-API-Key": admin_key},
-                    timeout=5
-                )
-                if response.status_code == 200:
-                    keys = response.json().get("api_keys", [])
-                    if keys:
-                        api_key = keys[0]["key"]
-                        print(f"  [OK] Using API key: {api_key[:8]}...")
+            api_key = await discover_api_key(args.url)
+            if api_key:
+                print(f"  [OK] Using API key: {api_key[:8]}...")
         except Exception as e:
             print(f"  [WARN] Could not get API key: {e}")
-
     if not api_key:
         print("  [ERROR] Could not get API key")
         return 1
 
-    # Run tests
-    passed = 0
-    failed = 0
-    start_time = time.time()
-
-    for i in range(1, TEST_ITERATIONS + 1):
-        success = run_single_test(i, base_url, api_key, audio_path)
-        if success:
-            passed += 1
-        else:
-            failed += 1
+    args.clips = [float(c) for c in args.clips.split(",") if c.strip()]
+    generator = LoadGenerator(args, api_key)
+    print(f"\nRunning {args.mode}-loop load ({args.mix}, clips {', '.join(f'{c:g}s' for c in args.clips)})")
+    elapsed = await generator.run(args.url)
 
-    total_time = time.time() - start_time
+    report, all_latencies = build_report(args, generator.stats, elapsed)
+    print_report(report, generator.stats, all_latencies)
 
-    # Clean up
-    try:
-        os.unlink(audio_path)
-    except:
-        pass
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\n  Report written to {args.json}")
 
-    # Print results
-    print("\n" + "=" * 60)
-    print("Test Summary")
-    print("=" * 60)
-    print(f"  Total iterations: {TEST_ITERATIONS}")
-    print(f"  Passed: {passed}")
-    print(f"  Failed: {failed}")
-    print(f"  Success rate: {passed/TEST_ITERATIONS*100:.1f}%")
-    print(f"  Total time: {total_time:.2f}s")
-    print(f"  Average time per iteration: {total_time/TEST_ITERATIONS:.2f}s")
-
-    if failed == 0:
-        print("\n[SUCCESS] All integration tests passed!")
-        return 0
-    else:
-        print(f"\n[FAILED] {failed} iterations failed")
+    if report["requests"] == 0:
+        print("\n[FAILED] No requests completed during the measured phase")
+        return 1
+    if report["error_rate"] > args.max_error_rate:
+        print(f"\n[FAILED] Error rate {report['error_rate']:.1%} is above {args.max_error_rate:.1%}")
         return 1
+    print("\n[SUCCESS] Load test passed")
+    return 0
+
+
+def main():
+    """Main test runner"""
+    args = build_parser().parse_args()
+    return asyncio.run(async_main(args))
 
 
 if __name__ == "__main__":